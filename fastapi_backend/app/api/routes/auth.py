@@ -16,17 +16,22 @@ from app.utils.security import verify_password, get_password_hash
 from app.config import (
     get_secret_key, get_jwt_algorithm, get_access_token_expire_minutes,
     get_refresh_token_expire_days, get_super_user_email, get_super_user_password_hashed,
-    get_cookie_secure, get_cookie_samesite, get_cookie_httponly
+    get_cookie_secure, get_cookie_samesite, get_cookie_httponly,
+    get_auth_token_cache_size, get_auth_user_cache_ttl
 )
+from app.middleware.auth_cache import TokenClaimsCache, UserCache
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 logger = logging.getLogger(__name__)
 
+# Verified access token claims and users looked up for them, see app.middleware.auth_cache
+token_claims_cache = TokenClaimsCache(max_size=get_auth_token_cache_size())
+user_cache = UserCache(ttl=get_auth_user_cache_ttl(), max_size=get_auth_token_cache_size())
+
 
 def get_token_from_cookie(request: Request) -> str:
     """Extract token from HttpOnly cookie."""
-    logger.info("Extract token from HttpOnly cookie.")
     token = request.cookies.get("access_token")
     if not token:
         logger.error("Token not found")
@@ -64,6 +69,20 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Decode and verify a JWT, reusing the claims of a token verified before.
+
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    payload = token_claims_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        token_claims_cache.put(token, payload)
+    return payload
+
+
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email from database."""
     result = await db.execute(
@@ -112,7 +131,7 @@ async def get_current_user(
     
     try:
         token = get_token_from_cookie(request)
-        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         role: str = payload.get("role")
@@ -146,10 +165,13 @@ async def get_current_user(
             "verify_status": VerifyStatus.ADMINVERIFIED.value
         }
     
-    # Regular user - look up in database
-    user = await get_user_by_email(db, email=token_data.email)
+    # Regular user - look up in database unless looked up moments ago
+    user = user_cache.get(token_data.email)
     if user is None:
-        raise credentials_exception
+        user = await get_user_by_email(db, email=token_data.email)
+        if user is None:
+            raise credentials_exception
+        user_cache.put(token_data.email, user)
     
     return user
 
@@ -164,7 +186,7 @@ def get_user_id_from_token(request: Request) -> int:
     """Extract user_id from JWT token without database call."""
     try:
         token = get_token_from_cookie(request)
-        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        payload = decode_token(token)
         user_id: int = payload.get("user_id")
         token_type: str = payload.get("type")
         
@@ -187,7 +209,7 @@ def get_user_role_from_token(request: Request) -> str:
     """Extract user role from JWT token without database call."""
     try:
         token = get_token_from_cookie(request)
-        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        payload = decode_token(token)
         role: str = payload.get("role")
         token_type: str = payload.get("type")
         
@@ -210,7 +232,7 @@ def get_user_verify_status_from_token(request: Request) -> str:
     """Extract user verify status from JWT token without database call."""
     try:
         token = get_token_from_cookie(request)
-        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        payload = decode_token(token)
         verify_status: str = payload.get("verify_status")
         token_type: str = payload.get("type")
         
@@ -233,7 +255,7 @@ def get_user_from_token(request: Request) -> Dict[str, Any]:
     """Extract all user information from JWT token without database call."""
     try:
         token = get_token_from_cookie(request)
-        payload = jwt.decode(token, get_secret_key(), algorithms=[get_jwt_algorithm()])
+        payload = decode_token(token)
         
         user_id: int = payload.get("user_id")
         email: str = payload.get("sub")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, case, cast
+from sqlalchemy import select, func, case, cast, literal, and_
+from sqlalchemy.orm import aliased
 from sqlalchemy.types import TIMESTAMP
+from types import SimpleNamespace
 from typing import List
 import logging
 from datetime import datetime
@@ -19,10 +21,99 @@ from app.schemas.dashboard import (
     UserActivityResponse
 )
 from app.middleware.authorization import require_basic_or_higher
+from app.config import get_dashboard_cache_ttl
+from app.utils.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 logger = logging.getLogger(__name__)
 
+# Dashboards are polled; each user's statistics are reused for a few seconds
+dashboard_cache = TTLCache(ttl=get_dashboard_cache_ttl(), max_size=10000)
+
+# Statistics of a config type the user has no templates of
+_NO_CONFIG_TYPE_STATS = SimpleNamespace(
+    template_count=0,
+    active_templates=0,
+    job_count=0,
+    completed_jobs=0,
+    failed_jobs=0,
+    cancelled_jobs=0,
+    total_time=None,
+    total_sheets=None,
+)
+
+
+def _faculty_user_count():
+    """Number of users in the faculty of the selected user, as a correlated subquery."""
+    faculty_user = aliased(User)
+    return (
+        select(func.count(faculty_user.id))
+        .where(faculty_user.faculty_id == User.faculty_id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+
+
+def _config_type_stats_query(user_id: int):
+    """
+    Template and marking job counts of a user per config type in a single statement.
+
+    Templates and jobs are aggregated separately, so joining them does not
+    multiply rows, and full-outer-joined on config type.
+    """
+    templates = (
+        select(
+            Template.config_type.label("config_type"),
+            func.count().label("template_count"),
+            func.count().filter(Template.status == TemplateConfigStatus.COMPLETED).label("active_templates"),
+        )
+        .where(Template.created_by == user_id)
+        .group_by(Template.config_type)
+        .subquery()
+    )
+
+    # Completed jobs whose duration and answer sheets count towards the average time per sheet
+    timed = and_(
+        MarkingJob.status == MarkingJobStatus.COMPLETED,
+        MarkingJob.processing_started_at.isnot(None),
+        MarkingJob.processing_completed_at.isnot(None),
+        MarkingJob.processed_answer_sheets.isnot(None),
+        MarkingJob.processed_answer_sheets > 0,
+    )
+    duration = (
+        func.extract('epoch', cast(MarkingJob.processing_completed_at, TIMESTAMP))
+        - func.extract('epoch', cast(MarkingJob.processing_started_at, TIMESTAMP))
+    )
+    jobs = (
+        select(
+            Template.config_type.label("config_type"),
+            func.count().label("job_count"),
+            func.count().filter(MarkingJob.status == MarkingJobStatus.COMPLETED).label("completed_jobs"),
+            func.count().filter(MarkingJob.status == MarkingJobStatus.FAILED).label("failed_jobs"),
+            func.count().filter(MarkingJob.status == MarkingJobStatus.CANCELLED).label("cancelled_jobs"),
+            func.sum(duration).filter(timed).label("total_time"),
+            func.sum(MarkingJob.processed_answer_sheets).filter(timed).label("total_sheets"),
+        )
+        .join(Template, MarkingJob.template_id == Template.id)
+        .where(MarkingJob.created_by == user_id)
+        .group_by(Template.config_type)
+        .subquery()
+    )
+
+    return select(
+        func.coalesce(templates.c.config_type, jobs.c.config_type).label("config_type"),
+        func.coalesce(templates.c.template_count, 0).label("template_count"),
+        func.coalesce(templates.c.active_templates, 0).label("active_templates"),
+        func.coalesce(jobs.c.job_count, 0).label("job_count"),
+        func.coalesce(jobs.c.completed_jobs, 0).label("completed_jobs"),
+        func.coalesce(jobs.c.failed_jobs, 0).label("failed_jobs"),
+        func.coalesce(jobs.c.cancelled_jobs, 0).label("cancelled_jobs"),
+        jobs.c.total_time,
+        jobs.c.total_sheets,
+    ).select_from(
+        templates.join(jobs, templates.c.config_type == jobs.c.config_type, full=True)
+    )
+
 
 @router.get("/stats", response_model=DashboardStatsResponse)
 @require_basic_or_higher(require_admin_verified=True)
@@ -79,69 +170,71 @@ async def get_dashboard_stats(
                 user_activities=[]
             )
         
-        # Regular user processing
-        user_result = await db.execute(
-            select(User).where(User.id == user_id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
+        cached = dashboard_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        # Regular user processing; faculty admins see the users of their faculty, basic users only themselves
+        is_faculty_admin = user_role == UserRoles.FACULTYADMIN.value
+        user_query = select(User, _faculty_user_count() if is_faculty_admin else literal(1)).where(User.id == user_id)
+        user_row = (await db.execute(user_query)).first()
+
+        if not user_row:
             raise HTTPException(status_code=404, detail="User not found")
-        
+        user, total_users = user_row
+
         user_name = f"{user.first_name} {user.last_name}" if user.first_name and user.last_name else user.email
-        
-        # 2. Get key statistics (filtered by user)
-        # Total users count (only count users in the same faculty for faculty admins, or just 1 for basic users)
-        if user_role == UserRoles.FACULTYADMIN.value:
-            # Count users in the same faculty
-            total_users_result = await db.execute(
-                select(func.count(User.id)).where(User.faculty_id == user.faculty_id)
-            )
-            total_users = total_users_result.scalar() or 0
-        else:
-            # Basic users only see themselves
-            total_users = 1
-        
-        # Active templates count (only user's templates)
-        active_templates_result = await db.execute(
-            select(func.count(Template.id)).where(
-                Template.status == TemplateConfigStatus.COMPLETED,
-                Template.created_by == user_id
-            )
-        )
-        active_templates = active_templates_result.scalar() or 0
-        
-        # Completed marking jobs count (only user's jobs)
-        completed_jobs_result = await db.execute(
-            select(func.count(MarkingJob.id)).where(
-                MarkingJob.status == MarkingJobStatus.COMPLETED,
-                MarkingJob.created_by == user_id
-            )
-        )
-        completed_jobs = completed_jobs_result.scalar() or 0
-        
-        # Overall completion rate (only user's jobs)
-        total_jobs_result = await db.execute(
-            select(func.count(MarkingJob.id)).where(
-                MarkingJob.status.in_([
-                    MarkingJobStatus.COMPLETED,
-                    MarkingJobStatus.FAILED,
-                    MarkingJobStatus.CANCELLED
-                ]),
-                MarkingJob.created_by == user_id
+
+        # 2. Template and marking job statistics per config type in one statement
+        config_type_stats = {
+            row.config_type: row
+            for row in (await db.execute(_config_type_stats_query(user_id))).all()
+        }
+
+        active_templates = 0
+        completed_jobs = 0
+        total_finished_jobs = 0
+        config_type_comparison = []
+        for config_type in TemplateConfigType:
+            row = config_type_stats.get(config_type, _NO_CONFIG_TYPE_STATS)
+            completed_jobs_count = row.completed_jobs
+            failed_jobs_count = row.failed_jobs
+
+            active_templates += row.active_templates
+            completed_jobs += completed_jobs_count
+            total_finished_jobs += completed_jobs_count + failed_jobs_count + row.cancelled_jobs
+
+            # Completion rate for this type
+            total_finished = completed_jobs_count + failed_jobs_count
+            type_completion_rate = (completed_jobs_count / total_finished * 100) if total_finished > 0 else 0
+
+            # Average time per answer sheet over the user's timed completed jobs
+            total_time = row.total_time
+            total_sheets = row.total_sheets
+            avg_time = (total_time / total_sheets) if (total_time and total_sheets and total_sheets > 0) else None
+
+            config_type_comparison.append(
+                ConfigTypeComparison(
+                    config_type=config_type.value,
+                    template_count=row.template_count,
+                    marking_job_count=row.job_count,
+                    completed_jobs=completed_jobs_count,
+                    failed_jobs=failed_jobs_count,
+                    completion_rate=round(type_completion_rate, 2),
+                    avg_completion_time_seconds=round(avg_time, 2) if avg_time else None
+                )
             )
-        )
-        total_finished_jobs = total_jobs_result.scalar() or 0
+
         completion_rate = (completed_jobs / total_finished_jobs * 100) if total_finished_jobs > 0 else 0
-        
+
         key_stats = KeyStatsResponse(
             total_users=total_users,
             active_templates=active_templates,
             completed_marking_jobs=completed_jobs,
             completion_rate=round(completion_rate, 2)
         )
-        
-        # 3. Get recent marking jobs (last 5) - only user's jobs
+
+        # 3. Get recent marking jobs (last 5) - only user's jobs, also used for the activities
         recent_jobs_result = await db.execute(
             select(MarkingJob, Template.name.label('template_name'))
             .join(Template, MarkingJob.template_id == Template.id)
@@ -150,13 +243,13 @@ async def get_dashboard_stats(
             .limit(5)
         )
         recent_jobs_data = recent_jobs_result.all()
-        
+
         recent_marking_jobs = []
         for job, template_name in recent_jobs_data:
             total = job.total_answer_sheets or 0
             processed = job.processed_answer_sheets or 0
             progress = (processed / total * 100) if total > 0 else 0
-            
+
             recent_marking_jobs.append(
                 RecentMarkingJobResponse(
                     id=job.id,
@@ -171,16 +264,16 @@ async def get_dashboard_stats(
                     template_name=template_name
                 )
             )
-        
-        # 4. Get recent templates (last 3) - only user's templates
+
+        # 4. Get recent templates (last 5) - only user's templates; the last 3 are shown, all 5 are activities
         recent_templates_result = await db.execute(
             select(Template)
             .where(Template.created_by == user_id)
             .order_by(Template.created_at.desc())
-            .limit(3)
+            .limit(5)
         )
-        recent_templates_data = recent_templates_result.scalars().all()
-        
+        user_templates = recent_templates_result.scalars().all()
+
         recent_templates = [
             RecentTemplateResponse(
                 id=template.id,
@@ -191,119 +284,12 @@ async def get_dashboard_stats(
                 num_questions=template.num_questions,
                 created_at=template.created_at
             )
-            for template in recent_templates_data
+            for template in user_templates[:3]
         ]
-        
-        # 5. Config type comparison (grid_based vs cluster_based) - only user's data
-        config_type_comparison = []
-        
-        for config_type in [TemplateConfigType.GRID_BASED, TemplateConfigType.CLUSTER_BASED]:
-            # Count templates by type (only user's templates)
-            template_count_result = await db.execute(
-                select(func.count(Template.id)).where(
-                    Template.config_type == config_type,
-                    Template.created_by == user_id
-                )
-            )
-            template_count = template_count_result.scalar() or 0
-            
-            # Count marking jobs by template type (only user's jobs)
-            job_count_result = await db.execute(
-                select(func.count(MarkingJob.id))
-                .join(Template, MarkingJob.template_id == Template.id)
-                .where(
-                    Template.config_type == config_type,
-                    MarkingJob.created_by == user_id
-                )
-            )
-            job_count = job_count_result.scalar() or 0
-            
-            # Count completed jobs (only user's jobs)
-            completed_jobs_result = await db.execute(
-                select(func.count(MarkingJob.id))
-                .join(Template, MarkingJob.template_id == Template.id)
-                .where(
-                    Template.config_type == config_type,
-                    MarkingJob.status == MarkingJobStatus.COMPLETED,
-                    MarkingJob.created_by == user_id
-                )
-            )
-            completed_jobs_count = completed_jobs_result.scalar() or 0
-            
-            # Count failed jobs (only user's jobs)
-            failed_jobs_result = await db.execute(
-                select(func.count(MarkingJob.id))
-                .join(Template, MarkingJob.template_id == Template.id)
-                .where(
-                    Template.config_type == config_type,
-                    MarkingJob.status == MarkingJobStatus.FAILED,
-                    MarkingJob.created_by == user_id
-                )
-            )
-            failed_jobs_count = failed_jobs_result.scalar() or 0
-            
-            # Calculate completion rate for this type
-            total_finished = completed_jobs_count + failed_jobs_count
-            type_completion_rate = (completed_jobs_count / total_finished * 100) if total_finished > 0 else 0
-            
-            # Calculate average completion time per answer sheet (only user's jobs)
-            # Get total time consumed and total processed answer sheets for fair average
-            time_and_sheets_result = await db.execute(
-                select(
-                    func.sum(
-                        func.extract(
-                            'epoch',
-                            cast(MarkingJob.processing_completed_at, TIMESTAMP)
-                        ) - 
-                        func.extract(
-                            'epoch',
-                            cast(MarkingJob.processing_started_at, TIMESTAMP)
-                        )
-                    ).label('total_time'),
-                    func.sum(MarkingJob.processed_answer_sheets).label('total_sheets')
-                )
-                .join(Template, MarkingJob.template_id == Template.id)
-                .where(
-                    Template.config_type == config_type,
-                    MarkingJob.status == MarkingJobStatus.COMPLETED,
-                    MarkingJob.created_by == user_id,
-                    MarkingJob.processing_started_at.isnot(None),
-                    MarkingJob.processing_completed_at.isnot(None),
-                    MarkingJob.processed_answer_sheets.isnot(None),
-                    MarkingJob.processed_answer_sheets > 0
-                )
-            )
-            result = time_and_sheets_result.first()
-            total_time = result.total_time if result else None
-            total_sheets = result.total_sheets if result else None
-            
-            # Calculate average time per answer sheet
-            avg_time = (total_time / total_sheets) if (total_time and total_sheets and total_sheets > 0) else None
-            
-            config_type_comparison.append(
-                ConfigTypeComparison(
-                    config_type=config_type.value,
-                    template_count=template_count,
-                    marking_job_count=job_count,
-                    completed_jobs=completed_jobs_count,
-                    failed_jobs=failed_jobs_count,
-                    completion_rate=round(type_completion_rate, 2),
-                    avg_completion_time_seconds=round(avg_time, 2) if avg_time else None
-                )
-            )
-        
-        # 6. User recent activities (last 10 activities)
+
+        # 5. User recent activities (last 10 activities)
         user_activities = []
-        
-        # Get user's recent templates
-        user_templates_result = await db.execute(
-            select(Template)
-            .where(Template.created_by == user_id)
-            .order_by(Template.created_at.desc())
-            .limit(5)
-        )
-        user_templates = user_templates_result.scalars().all()
-        
+
         for template in user_templates:
             user_activities.append(
                 UserActivityResponse(
@@ -314,24 +300,15 @@ async def get_dashboard_stats(
                     related_name=template.name
                 )
             )
-        
-        # Get user's recent marking jobs
-        user_jobs_result = await db.execute(
-            select(MarkingJob)
-            .where(MarkingJob.created_by == user_id)
-            .order_by(MarkingJob.created_at.desc())
-            .limit(5)
-        )
-        user_jobs = user_jobs_result.scalars().all()
-        
-        for job in user_jobs:
+
+        for job, _ in recent_jobs_data:
             if job.status == MarkingJobStatus.COMPLETED:
                 activity_type = "marking_job_completed"
                 description = f"Completed marking job: {job.name}"
             else:
                 activity_type = "marking_job_created"
                 description = f"Created marking job: {job.name}"
-            
+
             user_activities.append(
                 UserActivityResponse(
                     activity_type=activity_type,
@@ -341,12 +318,12 @@ async def get_dashboard_stats(
                     related_name=job.name
                 )
             )
-        
+
         # Sort activities by timestamp and limit to 10
         user_activities.sort(key=lambda x: x.timestamp, reverse=True)
         user_activities = user_activities[:10]
-        
-        return DashboardStatsResponse(
+
+        stats = DashboardStatsResponse(
             user_name=user_name,
             key_stats=key_stats,
             recent_marking_jobs=recent_marking_jobs,
@@ -354,7 +331,9 @@ async def get_dashboard_stats(
             config_type_comparison=config_type_comparison,
             user_activities=user_activities
         )
-        
+        dashboard_cache.put(user_id, stats)
+        return stats
+
     except HTTPException:
         raise
     except Exception as e:
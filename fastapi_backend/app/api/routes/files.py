@@ -1,20 +1,25 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, BackgroundTasks, Form, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
 import uuid
+import base64
 from pathlib import Path
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.schemas.file import DownloadType, FileResponse, FileResponse
-from app.storage.shared_storage import SharedStorage
+from app.schemas.file import DownloadType, FileResponse, FileResponse, FilesPage, IngestStatus, UploadSessionStatus
+from app.storage.shared_storage import SharedStorage, UploadTooLargeError, UnsafeArchiveError, ChunkMismatchError, IMAGE_EXTENSIONS, DEFAULT_CHUNK_SIZE
+from app.config import get_max_upload_size, get_max_chunked_upload_size, get_upload_session_ttl
 import logging
 import json
+import threading
+import time
 
 from app.models.file import FileOrFolder, FileOrFolderStatus, FileOrFolderType
-from app.database import get_async_db
+from app.database import get_async_db, AsyncSessionLocal
 from app.middleware.authorization import require_basic_or_higher, require_non_super_admin
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, next_cursor
 
 router = APIRouter(prefix="/api/files", tags=["files"])
 
@@ -23,10 +28,103 @@ storage_service = SharedStorage()
 
 logger = logging.getLogger(__name__)
 
+# Seconds between progress updates of an archive being extracted
+INGEST_PROGRESS_INTERVAL = 1.0
+
+def _ingest_progress_writer(storage: SharedStorage, user_id: int, ingest_id: int):
+    """Progress callback for extraction threads, writes at most every INGEST_PROGRESS_INTERVAL seconds."""
+    last_write = 0.0
+    lock = threading.Lock()
+
+    def write(extracted: int, total: int, skipped: int):
+        nonlocal last_write
+        with lock:
+            now = time.monotonic()
+            if extracted < total and now - last_write < INGEST_PROGRESS_INTERVAL:
+                return
+            last_write = now
+            storage.write_ingest_progress(user_id, ingest_id, {
+                "status": FileOrFolderStatus.UPLOADING.value,
+                "extracted_files": extracted,
+                "total_files": total,
+                "skipped_files": skipped,
+            })
+    return write
+
+
+async def _ingest_archive(ingest_id: int, user_id: int, zip_path: str, allowed_extensions):
+    """Extract an uploaded ZIP and mark its record uploaded, or failed with the reason."""
+    storage = SharedStorage()
+    try:
+        logger.info(f"Unzipping file: {zip_path}")
+        folder_path = await storage.unzip_file(zip_path, allowed_extensions, _ingest_progress_writer(storage, user_id, ingest_id))
+        logger.info(f"Unzipped file: {folder_path}")
+        status, error = FileOrFolderStatus.UPLOADED, None
+    except UnsafeArchiveError as e:
+        logger.warning(f"Rejected archive {zip_path}: {str(e)}")
+        folder_path, status, error = None, FileOrFolderStatus.FAILED, str(e)
+    except Exception as e:
+        logger.error(f"Failed to unzip file: {str(e)}")
+        folder_path, status, error = None, FileOrFolderStatus.FAILED, "Failed to unzip file"
+
+    try:
+        async with AsyncSessionLocal() as db:
+            file_and_folder = await db.get(FileOrFolder, ingest_id)
+            if file_and_folder:
+                file_and_folder.status = status
+                if folder_path:
+                    file_and_folder.path = folder_path
+                await db.commit()
+        previous = await storage.get_ingest_progress(user_id, ingest_id) or {}
+        storage.write_ingest_progress(user_id, ingest_id, {**previous, "status": status.value, "error": error})
+    except Exception as e:
+        logger.error(f"Failed to record the result of ingest {ingest_id}: {str(e)}")
+
+
+async def _start_archive_ingest(db: AsyncSession, background_tasks: BackgroundTasks, user_id: int, zip_path: str,
+                                original_name: str, file_type: FileOrFolderType, file_size: int, file_sha256: str) -> FileResponse:
+    """Create the folder record of an uploaded ZIP and extract it after the response is sent."""
+    file_and_folder = FileOrFolder(
+        name=zip_path.split('/')[-1],
+        original_name=original_name,
+        extension=None,  # Folders don't have extensions
+        path=zip_path,  # Replaced by the extracted folder once the ingest completes
+        size=file_size,  # Use original ZIP file size
+        file_type=file_type,
+        status=FileOrFolderStatus.UPLOADING,
+        deletion_date=datetime.now() + timedelta(days=7),
+        created_by=user_id,
+    )
+    db.add(file_and_folder)
+    await db.commit()
+    await db.refresh(file_and_folder)
+    logger.info(f"Database record {file_and_folder.id} created for ZIP upload {zip_path}, extracting in the background")
+
+    # Answer sheet archives only keep images
+    allowed_extensions = IMAGE_EXTENSIONS if file_type == FileOrFolderType.ANSWER_SHEETS_FOLDER else None
+    SharedStorage().write_ingest_progress(user_id, file_and_folder.id, {"status": FileOrFolderStatus.UPLOADING.value})
+    background_tasks.add_task(_ingest_archive, file_and_folder.id, user_id, zip_path, allowed_extensions)
+
+    return FileResponse(
+        filename=original_name,
+        file_id=file_and_folder.id,  # Return the actual database ID
+        file_size=file_and_folder.size,  # Return the original ZIP file size
+        file_type=file_and_folder.file_type,
+        status=file_and_folder.status,
+        deletion_date=file_and_folder.deletion_date,
+        created_by=file_and_folder.created_by,
+        created_at=file_and_folder.created_at,
+        updated_at=file_and_folder.updated_at,
+        sha256=file_sha256,
+        ingest_id=file_and_folder.id
+    )
+
+
 @router.post("/upload", response_model=FileResponse, status_code=201)
 @require_non_super_admin(require_admin_verified=True)
 async def upload_file(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     file_type: str = Form(...),
     db: AsyncSession = Depends(get_async_db)
@@ -48,22 +146,15 @@ async def upload_file(
     extension = file.filename.split('.')[-1] if file.filename.split('.')[-1] and file.filename.split('.')[-1] != 'zip' else None
     final_path = f"{upload_dir}/{file_name}"
 
-    # Read file content as bytes
-    file_content = await file.read()
-    
+    # Stream the upload to storage block by block, never holding it in memory
     shared_storage = SharedStorage()
-    await shared_storage.save_file(file_content, final_path)
+    try:
+        file_size, file_sha256 = await shared_storage.save_upload(file, final_path, max_size=get_max_upload_size())
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    logger.info(f"Saved upload {final_path} ({file_size} bytes, sha256 {file_sha256})")
 
-    # Handle zip files
     is_zip_file = file.filename.endswith('.zip')
-    if is_zip_file:
-        try:
-            logger.info(f"Unzipping file: {final_path}")
-            final_path = await shared_storage.unzip_file(final_path)
-            logger.info(f"Unzipped file: {final_path}")
-        except Exception as e:
-            logger.error(f"Failed to unzip file: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to unzip file")
     
     if file_type == 'template':
         file_type = FileOrFolderType.TEMPLATE
@@ -74,15 +165,14 @@ async def upload_file(
     else:
         file_type = FileOrFolderType.OTHER
 
-    # Create database record only for non-ZIP files
-    # ZIP files are extracted and the original ZIP is deleted, so we don't create a DB record for it
+    # ZIP files get a folder record once their extraction has been queued
     if not is_zip_file and shared_storage.file_exists(final_path):
         file_and_folder = FileOrFolder(
             name=file_name,
             original_name=file.filename,
             extension=extension,
             path=final_path,
-            size=file.size if file.size else 0,
+            size=file_size,
             file_type=file_type,
             status=FileOrFolderStatus.UPLOADED,
             deletion_date=datetime.now() + timedelta(days=7),
@@ -101,40 +191,12 @@ async def upload_file(
             deletion_date=file_and_folder.deletion_date,
             created_by=file_and_folder.created_by,
             created_at=file_and_folder.created_at,
-            updated_at=file_and_folder.updated_at
+            updated_at=file_and_folder.updated_at,
+            sha256=file_sha256
         )
     elif is_zip_file:
-        # For ZIP files, create a database record for the extracted folder
-        logger.info(f"ZIP file extracted successfully to: {final_path}")
-        
-        # Create database record for the extracted folder
-        file_and_folder = FileOrFolder(
-            name=file_name,
-            original_name=file.filename,
-            extension=None,  # Folders don't have extensions
-            path=final_path,
-            size=file.size if file.size else 0,  # Use original ZIP file size
-            file_type=file_type,
-            status=FileOrFolderStatus.UPLOADED,
-            deletion_date=datetime.now() + timedelta(days=7),
-            created_by=user_id,
-        )
-        db.add(file_and_folder)
-        await db.commit()
-        await db.refresh(file_and_folder)
-        logger.info(f"Database record created for extracted folder with ID: {file_and_folder.id}")
-        
-        return FileResponse(
-            filename=file.filename,
-            file_id=file_and_folder.id,  # Return the actual database ID
-            file_size=file_and_folder.size,  # Return the original ZIP file size
-            file_type=file_and_folder.file_type,
-            status=file_and_folder.status,
-            deletion_date=file_and_folder.deletion_date,
-            created_by=file_and_folder.created_by,
-            created_at=file_and_folder.created_at,
-            updated_at=file_and_folder.updated_at
-        )
+        # ZIP files are extracted in the background; the record tracks the ingest
+        return await _start_archive_ingest(db, background_tasks, user_id, final_path, file.filename, file_type, file_size, file_sha256)
     else:
         raise HTTPException(status_code=500, detail="Failed to upload file")
 
@@ -149,10 +211,14 @@ async def upload_chunk(
     total_chunks: int = Form(...),
     original_name: str = Form(...),
     save_path: str = Form(...),
-    file_type: str = Form(...)
+    file_type: str = Form(...),
+    chunk_size: Optional[int] = Form(None),
+    total_size: Optional[int] = Form(None)
 ):
     """
     Upload a single chunk of a large file
+
+    Every chunk except the last must be chunk_size bytes; chunks may be sent in parallel.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
@@ -160,50 +226,119 @@ async def upload_chunk(
     # Get user from token for ownership tracking
     user_id = request.state.current_user.id
     
-    # Create temporary directory for chunks inside user's directory
+    # Chunks of an upload are written into one file in the user's temporary directory
     user_temp_dir = storage_service.get_user_directory(user_id) / "temp" / "uploads"
     temp_dir = user_temp_dir / upload_id
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
     
-    # Save chunk to temporary file
-    chunk_path = temp_dir / f"chunk_{chunk_index:04d}"
+    # A chunk may not exceed the upload size limit, nor the whole file the chunked upload limit
+    if chunk_size > get_max_upload_size():
+        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(get_max_upload_size())))
+    if (total_size or total_chunks * chunk_size) > get_max_chunked_upload_size():
+        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(get_max_chunked_upload_size())))
     
     try:
-        # Read chunk content as bytes
-        chunk_content = await file.read()
-        
         shared_storage = SharedStorage()
-        await shared_storage.save_chunk(chunk_content, chunk_path, chunk_index)
-        
-        # Save upload metadata
-        metadata = {
+        relative_temp_path = str(temp_dir.relative_to(shared_storage.base_path))
+        await _expire_upload_session(shared_storage, relative_temp_path)
+        metadata = await shared_storage.open_upload_session(relative_temp_path, {
             "upload_id": upload_id,
             "original_name": original_name,
             "total_chunks": total_chunks,
+            "chunk_size": chunk_size,
+            "total_size": total_size,
             "file_type": file_type,
             "save_path": save_path,
-            "chunks_received": [],
             "created_at": datetime.now().isoformat()
-        }
+        })
         
-        logger.info(f"Saving metadata for chunk {chunk_index}/{total_chunks} in {temp_dir}")
-        relative_temp_path = str(temp_dir.relative_to(shared_storage.base_path))
-        await shared_storage.update_chunks_received_metadata(relative_temp_path, metadata, chunk_index)
-        logger.info(f"Metadata saved successfully for chunk {chunk_index}")
+        # Chunks may arrive in any order and in parallel
+        chunk_bytes, chunk_sha256 = await shared_storage.save_chunk(file, relative_temp_path, chunk_index, metadata)
+        logger.info(f"Saved chunk {chunk_index}/{total_chunks} of upload {upload_id} ({chunk_bytes} bytes)")
         
         return {
             "message": f"Chunk {chunk_index + 1}/{total_chunks} uploaded successfully",
             "chunk_index": chunk_index,
             "total_chunks": total_chunks,
-            "upload_id": upload_id
+            "upload_id": upload_id,
+            "sha256": chunk_sha256
         }
         
+    except HTTPException:
+        raise
+    except ChunkMismatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        # The upload was finalized or cancelled meanwhile
+        raise HTTPException(status_code=404, detail="Upload session not found")
     except Exception as e:
-        # Clean up failed chunk
-        if chunk_path.exists():
-            chunk_path.unlink()
+        logger.error(f"Chunk {chunk_index} of upload {upload_id} failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chunk upload failed: {str(e)}")
 
+async def _expire_upload_session(shared_storage: SharedStorage, relative_temp_path: str):
+    """Remove a chunked upload session that was idle for too long and tell the client to start over."""
+    if await shared_storage.upload_session_expired(relative_temp_path, get_upload_session_ttl()):
+        await shared_storage.delete_directory(relative_temp_path)
+        raise HTTPException(status_code=410, detail="Upload session expired")
+
+
+def _pack_received(received: bytes) -> str:
+    """Base64 bitmap of a received map, bit i (most significant bit first) set for each received chunk."""
+    bitmap = bytearray((len(received) + 7) // 8)
+    for chunk_index, flag in enumerate(received):
+        if flag:
+            bitmap[chunk_index // 8] |= 0x80 >> (chunk_index % 8)
+    return base64.b64encode(bytes(bitmap)).decode()
+
+
+@router.api_route("/upload/large/{upload_id}", methods=["GET", "HEAD"], response_model=UploadSessionStatus)
+@require_non_super_admin(require_admin_verified=True)
+async def get_upload_session(
+    request: Request,
+    upload_id: str
+):
+    """
+    Get the chunks of a chunked upload received so far, so an interrupted upload can resume
+
+    HEAD only returns the counts and expiry as X-Total-Chunks, X-Chunks-Received and X-Upload-Expires headers.
+    """
+    user_id = request.state.current_user.id
+
+    temp_dir = storage_service.get_user_directory(user_id) / "temp" / "uploads" / upload_id
+    try:
+        shared_storage = SharedStorage()
+        relative_temp_path = str(temp_dir.relative_to(shared_storage.base_path))
+        await _expire_upload_session(shared_storage, relative_temp_path)
+        state = await shared_storage.get_upload_state(relative_temp_path)
+        if not state:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+
+        metadata = state["metadata"]
+        expires_at = datetime.fromtimestamp(state["last_activity"]) + timedelta(seconds=get_upload_session_ttl())
+        if request.method == "HEAD":
+            return Response(headers={
+                "X-Total-Chunks": str(metadata["total_chunks"]),
+                "X-Chunks-Received": str(len(state["checksums"])),
+                "X-Upload-Expires": expires_at.isoformat(),
+            })
+        return UploadSessionStatus(
+            upload_id=upload_id,
+            original_name=metadata["original_name"],
+            total_chunks=metadata["total_chunks"],
+            chunk_size=metadata["chunk_size"],
+            total_size=metadata.get("total_size"),
+            chunks_received=len(state["checksums"]),
+            received_bitmap=_pack_received(state["received"]),
+            chunk_checksums=state["checksums"],
+            expires_at=expires_at,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get upload session {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get upload session")
+
+
 @router.post("/upload/large/finalize", response_model=FileResponse, status_code=201)
 @require_non_super_admin(require_admin_verified=True)
 async def finalize_upload(
@@ -213,7 +348,7 @@ async def finalize_upload(
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Finalize chunked upload by combining all chunks
+    Finalize a chunked upload once all of its chunks were received
     """
     # Get user from token for ownership tracking
     user_id = request.state.current_user.id
@@ -229,13 +364,16 @@ async def finalize_upload(
         shared_storage = SharedStorage()
         logger.info(f"Loading metadata for upload_id: {upload_id}")
         relative_temp_path = str(temp_dir.relative_to(shared_storage.base_path))
+        await _expire_upload_session(shared_storage, relative_temp_path)
         metadata = await shared_storage.get_metadata(relative_temp_path)
         logger.info(f"Metadata loaded: {metadata}")
+        if not metadata:
+            raise HTTPException(status_code=404, detail="Upload session not found")
         
         original_name = metadata["original_name"]
         total_chunks = metadata["total_chunks"]
         file_type = metadata["file_type"]
-        chunks_received = metadata["chunks_received"]
+        chunks_received = await shared_storage.get_chunks_received(relative_temp_path)
         logger.info(f"Processing file: {original_name}, chunks: {len(chunks_received)}/{total_chunks}")
         
         # Check if all chunks are received
@@ -253,25 +391,17 @@ async def finalize_upload(
         extension = original_name.split('.')[-1] if original_name.split('.')[-1] and original_name.split('.')[-1] != 'zip' else None
         final_path = f"{upload_dir}/{file_name}"
         
-        # Combine all chunks
+        # The chunks were written in place, so the file only has to be moved
         try:
-            logger.info(f"Combining chunks to: {final_path}")
-            await shared_storage.combine_chunks(relative_temp_path, total_chunks, final_path)
-            logger.info(f"Chunks combined successfully")
+            file_size = await shared_storage.complete_upload(relative_temp_path, final_path)
+            logger.info(f"Upload {upload_id} moved to {final_path} ({file_size} bytes)")
         except Exception as e:
-            logger.error(f"Failed to combine chunks: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to combine chunks: {str(e)}")
+            logger.error(f"Failed to complete upload {upload_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to complete upload: {str(e)}")
+        # Hashing would mean reading the whole file again; the chunk responses carry their hashes
+        file_sha256 = None
         
-        # Handle zip files (matching upload endpoint logic)
         is_zip_file = original_name.endswith('.zip')
-        if is_zip_file:
-            try:
-                logger.info(f"Unzipping file: {final_path}")
-                final_path = await shared_storage.unzip_file(final_path)
-                logger.info(f"Unzipped file: {final_path}")
-            except Exception as e:
-                logger.error(f"Failed to unzip file: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Failed to unzip file")
         
         # Convert file_type string to enum (matching upload endpoint logic)
         if file_type == 'template':
@@ -288,13 +418,8 @@ async def finalize_upload(
         await shared_storage.delete_directory(relative_temp_path)
         logger.info(f"Temporary directory cleaned up")
         
-        # Create database record only for non-ZIP files
-        # ZIP files are extracted and the original ZIP is deleted, so we don't create a DB record for it
+        # ZIP files get a folder record once their extraction has been queued
         if not is_zip_file and shared_storage.file_exists(final_path):
-            # Get final file size for non-ZIP files
-            file_size = (shared_storage.base_path / final_path).stat().st_size
-            logger.info(f"Final file size: {file_size} bytes")
-            
             logger.info(f"Creating database record for file: {file_name}")
             file_and_folder = FileOrFolder(
                 name=file_name,
@@ -321,43 +446,12 @@ async def finalize_upload(
                 deletion_date=file_and_folder.deletion_date,
                 created_by=file_and_folder.created_by,
                 created_at=file_and_folder.created_at,
-                updated_at=file_and_folder.updated_at
+                updated_at=file_and_folder.updated_at,
+                sha256=file_sha256
             )
         elif is_zip_file:
-            # For ZIP files, create a database record for the extracted folder
-            logger.info(f"ZIP file extracted successfully to: {final_path}")
-            
-            # Get the original ZIP file size before extraction
-            original_zip_size = (shared_storage.base_path / f"{upload_dir}/{file_name}").stat().st_size if (shared_storage.base_path / f"{upload_dir}/{file_name}").exists() else 0
-            
-            # Create database record for the extracted folder
-            file_and_folder = FileOrFolder(
-                name=file_name,
-                original_name=original_name,
-                extension=None,  # Folders don't have extensions
-                path=final_path,
-                size=original_zip_size,  # Use original ZIP file size
-                file_type=file_type_enum,
-                status=FileOrFolderStatus.UPLOADED,
-                deletion_date=datetime.now() + timedelta(days=7),
-                created_by=user_id,
-            )
-            db.add(file_and_folder)
-            await db.commit()
-            await db.refresh(file_and_folder)
-            logger.info(f"Database record created for extracted folder with ID: {file_and_folder.id}")
-            
-            return FileResponse(
-                filename=original_name,
-                file_id=file_and_folder.id,  # Return the actual database ID
-                file_size=file_and_folder.size,  # Return the original ZIP file size
-                file_type=file_and_folder.file_type,
-                status=file_and_folder.status,
-                deletion_date=file_and_folder.deletion_date,
-                created_by=file_and_folder.created_by,
-                created_at=file_and_folder.created_at,
-                updated_at=file_and_folder.updated_at
-            )
+            # ZIP files are extracted in the background; the record tracks the ingest
+            return await _start_archive_ingest(db, background_tasks, user_id, final_path, original_name, file_type_enum, file_size, file_sha256)
         else:
             raise HTTPException(status_code=500, detail="Failed to finalize file upload")
         
@@ -400,25 +494,37 @@ async def cancel_upload(
 
     return {"message": "Upload cancelled and cleaned up successfully"}
 
-@router.get("", response_model=List[FileResponse])
+@router.get("", response_model=FilesPage)
 @require_non_super_admin(require_admin_verified=True)
 async def list_files(
     request: Request,
     folder: str = Query(None),
     file_type: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all uploaded files with optional filtering by folder or file type
+    List a page of uploaded files, newest first, with optional filtering by folder or file type
     """
     # Get user from token for ownership filtering
     user_id = request.state.current_user.id
     
     try:
-        # Build query
-        query = select(FileOrFolder).where(
+        # Build query over the columns of the response only
+        query = select(
+            FileOrFolder.id,
+            FileOrFolder.name,
+            FileOrFolder.size,
+            FileOrFolder.file_type,
+            FileOrFolder.status,
+            FileOrFolder.deletion_date,
+            FileOrFolder.created_by,
+            FileOrFolder.created_at,
+            FileOrFolder.updated_at
+        ).where(
             FileOrFolder.created_by == user_id
-        ).order_by(FileOrFolder.created_at.desc())
+        )
         
         # Add optional filters
         if file_type:
@@ -427,9 +533,13 @@ async def list_files(
         if folder:
             query = query.where(FileOrFolder.path.like(f"%{folder}%"))
         
+        try:
+            query = paginate(query, FileOrFolder.created_at, FileOrFolder.id, cursor, limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
         # Execute query
-        result = await db.execute(query)
-        files = result.scalars().all()
+        files, following = next_cursor((await db.execute(query)).all(), limit)
         
         # Convert to response format
         file_responses = []
@@ -446,8 +556,10 @@ async def list_files(
                 updated_at=file.updated_at
             ))
         
-        return file_responses
+        return FilesPage(items=file_responses, limit=limit, next_cursor=following)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list files: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
@@ -586,6 +698,40 @@ async def get_file(
         logger.error(f"Failed to get file {file_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get file: {str(e)}")
 
+@router.get("/{file_id}/ingest", response_model=IngestStatus)
+@require_non_super_admin(require_admin_verified=True)
+async def get_ingest_status(
+    request: Request,
+    file_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the extraction progress of an uploaded ZIP file
+    """
+    try:
+        user_info = request.state.current_user
+        user_id = user_info["id"]
+
+        file_and_folder = await db.get(FileOrFolder, file_id)
+        if not file_and_folder or file_and_folder.created_by != user_id:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        progress = await SharedStorage().get_ingest_progress(user_id, file_id) or {}
+        return IngestStatus(
+            file_id=file_id,
+            status=file_and_folder.status,
+            extracted_files=progress.get("extracted_files", 0),
+            total_files=progress.get("total_files"),
+            skipped_files=progress.get("skipped_files", 0),
+            error=progress.get("error"),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get ingest status of file {file_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get ingest status")
+
+
 @router.delete("/{file_id}")
 @require_non_super_admin(require_admin_verified=True)
 async def delete_file(
@@ -1,27 +1,26 @@
 import uuid
 import asyncio
 
-import pandas as pd
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from starlette.websockets import WebSocketState
-from sqlalchemy import select
+from sqlalchemy import select, update, func, tuple_, exists
 import logging
-from io import BytesIO
-import zipfile
 import os
+from tempfile import SpooledTemporaryFile
 from pathlib import Path
 
 from sqlalchemy.orm import selectinload
-from openpyxl import load_workbook
 
 from app.models.marking_job import MarkingJob, MarkingJobStatus
+from app.models.marking_result import MarkingResult
 from app.models.template import Template
-from app.schemas.marking import MarkingCreateMetadata, MarkingResponse, MarkingAttachAnswerSheets, MarkingResponseBasic, ProgressRequest, ProgressResponse, ResultsData, UpdateResultRequest, MarkingAttachIndexList
+from app.schemas.marking import MarkingCreateMetadata, MarkingResponse, MarkingAttachAnswerSheets, MarkingResponseBasic, ProgressRequest, ProgressResponse, ResultsData, UpdateResultRequest, MarkingAttachIndexList, StudentResultsPage, StudentResultRow, ResultSortField, SortOrder, MarkingJobsPage
 from app.schemas.marking import UpdateMarkingSchemeConfigRequest
 from app.database import get_async_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Depends
-from typing import List
+from fastapi import Depends, Query
+from typing import List, Optional
 from app.api.deps import get_websocket_manager
 from app.websocket import WebSocketManager
 from app.middleware.websocket_auth import authorize_websocket
@@ -29,6 +28,9 @@ from app.models.user import UserRoles
 
 from app.queue import submit_marking_job, submit_marking_scheme_config_job
 from app.storage.shared_storage import SharedStorage
+from app.utils.streaming import SPOOL_MAX_SIZE, iter_file, stream_zip
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, next_cursor
+from app.utils.results import write_result_sheet, ensure_marking_results, encode_results_cursor, decode_results_cursor, RESULT_ROW_FIELDS, DEFAULT_RESULT_ROW_FIELDS
 from app.middleware.authorization import require_non_super_admin
 from app.middleware.websocket_auth import authorize_websocket
 from app.models.user import UserRoles
@@ -69,34 +71,44 @@ def _get_marking_response(marking: MarkingJob) -> MarkingResponse:
 
 
 
-@router.get("", response_model=List[MarkingResponseBasic])
+@router.get("", response_model=MarkingJobsPage)
 @require_non_super_admin(require_admin_verified=True)
 async def list_markings(
     request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: AsyncSession = Depends(get_async_db)
 ):
-    """List all markings"""
+    """List a page of markings, newest first"""
     # Get user from token for ownership filtering
     user_id = request.state.current_user.id
     try:
-      markings = await db.execute(select(MarkingJob).options(selectinload(MarkingJob.template)).where(MarkingJob.created_by == user_id).order_by(MarkingJob.created_at.desc()))
-      markings = markings.scalars().all()
-      return [
-          MarkingResponseBasic(
-              id=marking.id,
-              name=marking.name,
-              status=marking.status,
-              priority=marking.priority,
-              template_name=marking.template.name,
-              save_intermediate_results=marking.save_intermediate_results,
-              total_answer_sheets=marking.total_answer_sheets,
-              processed_answer_sheets=marking.processed_answer_sheets,
-              created_at=marking.created_at,
-              updated_at=marking.updated_at,
-              created_by=marking.created_by
-          )
-          for marking in markings
-      ]
+      # Only the columns of the list view, the template name is joined in
+      query = select(
+          MarkingJob.id,
+          MarkingJob.name,
+          MarkingJob.status,
+          MarkingJob.priority,
+          Template.name.label("template_name"),
+          MarkingJob.save_intermediate_results,
+          MarkingJob.total_answer_sheets,
+          MarkingJob.processed_answer_sheets,
+          MarkingJob.created_at,
+          MarkingJob.updated_at,
+          MarkingJob.created_by
+      ).join(Template, MarkingJob.template_id == Template.id).where(MarkingJob.created_by == user_id)
+      try:
+          query = paginate(query, MarkingJob.created_at, MarkingJob.id, cursor, limit)
+      except ValueError:
+          raise HTTPException(status_code=400, detail="Invalid cursor")
+      rows, following = next_cursor((await db.execute(query)).all(), limit)
+      return MarkingJobsPage(
+          items=[MarkingResponseBasic(**row._mapping) for row in rows],
+          limit=limit,
+          next_cursor=following
+      )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list markings: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list markings")
@@ -745,6 +757,92 @@ async def get_results(
 
 
 
+@router.get("/{marking_job_id}/results/rows", response_model=StudentResultsPage, response_model_exclude_unset=True)
+@require_non_super_admin(require_admin_verified=True)
+async def get_result_rows(
+    request: Request,
+    marking_job_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    sort_by: ResultSortField = Query(ResultSortField.ROW_NUMBER),
+    order: SortOrder = Query(SortOrder.ASC),
+    flagged: Optional[bool] = None,
+    resolved: Optional[bool] = None,
+    flag_reason: Optional[str] = Query(None, description="Only rows whose flag reason contains this text"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, labeled_points is only returned when listed"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of the per-student results of a marking job"""
+    user_id = request.state.current_user.id
+    try:
+        selected = DEFAULT_RESULT_ROW_FIELDS
+        if fields:
+            selected = tuple(dict.fromkeys(["row_number", *(field.strip() for field in fields.split(",") if field.strip())]))
+            unknown = [field for field in selected if field not in RESULT_ROW_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown result fields: {', '.join(unknown)}")
+
+        result = await db.execute(
+            select(MarkingJob).options(selectinload(MarkingJob.result_sheet_file)).where(
+                MarkingJob.id == marking_job_id,
+                MarkingJob.created_by == user_id
+            )
+        )
+        marking = result.scalar_one_or_none()
+
+        if not marking:
+            raise HTTPException(status_code=404, detail="Marking job not found")
+
+        await ensure_marking_results(db, marking)
+
+        conditions = [MarkingResult.marking_job_id == marking_job_id]
+        if flagged is not None:
+            conditions.append(MarkingResult.flag == flagged)
+        if resolved is not None:
+            conditions.append(MarkingResult.is_resolved == resolved)
+        if flag_reason:
+            conditions.append(MarkingResult.flag_reason.icontains(flag_reason, autoescape=True))
+        total = await db.scalar(select(func.count()).select_from(MarkingResult).where(*conditions))
+
+        # Keyset pagination on (sort column, row_number), served by the job's composite indexes
+        sort_column = getattr(MarkingResult, sort_by.value)
+        descending = order == SortOrder.DESC
+        if cursor:
+            try:
+                sort_value, row_number = decode_results_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if sort_by == ResultSortField.ROW_NUMBER:
+                key, after = MarkingResult.row_number, row_number
+            else:
+                key, after = tuple_(sort_column, MarkingResult.row_number), tuple_(sort_value, row_number)
+            conditions.append(key < after if descending else key > after)
+        ordering = [sort_column] if sort_by == ResultSortField.ROW_NUMBER else [sort_column, MarkingResult.row_number]
+
+        columns = [getattr(MarkingResult, field) for field in dict.fromkeys([*selected, sort_by.value])]
+        rows = (await db.execute(
+            select(*columns).where(*conditions)
+            .order_by(*[column.desc() if descending else column.asc() for column in ordering])
+            .limit(limit + 1)
+        )).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_results_cursor(rows[-1][sort_by.value], rows[-1]["row_number"])
+        return StudentResultsPage(
+            items=[StudentResultRow(**{field: row[field] for field in selected}) for row in rows],
+            total=total,
+            limit=limit,
+            next_cursor=next_cursor
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get result rows for marking job {marking_job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get results")
+
+
 @router.put("/{marking_job_id}/update-result/{row_number}", response_model=MarkingResponse)
 @require_non_super_admin(require_admin_verified=True)
 async def update_result(
@@ -772,59 +870,32 @@ async def update_result(
         
         if not marking.result_sheet_file:
             raise HTTPException(status_code=404, detail="Result sheet file not found")
-        
-        # Update the result in the Excel file
-        result_sheet_file_path = marking.result_sheet_file.path
-        storage = SharedStorage()
-        
-        # Get the current Excel file
-        excel_content = await storage.get_file(result_sheet_file_path)
-        
-        # Load the workbook from bytes
-        workbook = load_workbook(BytesIO(excel_content))
-        worksheet = workbook.active
+
+        await ensure_marking_results(db, marking)
+
+        # Results live in marking_results, updating one is a single row update
         student_result = request.result
-        
-        correct_str = ",".join(map(str, student_result.correct)) if student_result.correct else ""
-        incorrect_str = ",".join(map(str, student_result.incorrect)) if student_result.incorrect else ""
-        more_than_one_marked_str = ",".join(map(str, student_result.more_than_one_marked)) if student_result.more_than_one_marked else ""
-        not_marked_str = ",".join(map(str, student_result.not_marked)) if student_result.not_marked else ""
-        
-        # Convert labeled_points to JSON string
-        labeled_points_json = json.dumps(student_result.labeled_points, default=lambda x: x.dict() if hasattr(x, 'dict') else x) if student_result.labeled_points else "[]"
-        
-        # Update the row (row_number is 1-based in Excel, but we need to account for header row)
-        excel_row = row_number + 1  # +1 because Excel is 1-based and we have a header row
-        
-        worksheet.cell(row=excel_row, column=1, value=student_result.index_number)  # A - row[0]
-        worksheet.cell(row=excel_row, column=2, value=correct_str)  # B - row[1]
-        worksheet.cell(row=excel_row, column=3, value=incorrect_str)  # C - row[2]
-        worksheet.cell(row=excel_row, column=4, value=more_than_one_marked_str)  # D - row[3]
-        worksheet.cell(row=excel_row, column=5, value=not_marked_str)  # E - row[4]
-        worksheet.cell(row=excel_row, column=6, value=student_result.score)  # F - row[5] (score)
-        worksheet.cell(row=excel_row, column=7, value=student_result.flag)  # G - row[6] (flag)
-        worksheet.cell(row=excel_row, column=8, value=student_result.flag_reason)  # H - row[7] (flag_reason)
-        worksheet.cell(row=excel_row, column=9, value=student_result.answer_sheet_path)  # I (answer_sheet_path)
-        worksheet.cell(row=excel_row, column=10, value=labeled_points_json)  # J (labeled_points)
-
-        # Place "Resolved" at column K by default, but if K is already used by the legacy
-        # "Audit File Name" column (sheets created when save_intermediate_results=True),
-        # fall back to L so we don't clobber the audit reference.
-        header_k = worksheet.cell(row=1, column=11).value
-        resolved_col = 12 if (header_k and str(header_k).strip() == "Audit File Name") else 11
-        if worksheet.cell(row=1, column=resolved_col).value in (None, ""):
-            worksheet.cell(row=1, column=resolved_col, value="Resolved")
-        worksheet.cell(row=excel_row, column=resolved_col, value=bool(student_result.is_resolved))
-
-        # Save the workbook back to bytes
-        output = BytesIO()
-        workbook.save(output)
-        output.seek(0)
-        updated_excel_content = output.getvalue()
-        
-        # Save the updated file back to storage
-        await storage.save_file(updated_excel_content, result_sheet_file_path)
-        
+        updated = await db.execute(
+            update(MarkingResult).where(
+                MarkingResult.marking_job_id == marking_job_id,
+                MarkingResult.row_number == row_number
+            ).values(
+                index_number=student_result.index_number,
+                correct=student_result.correct,
+                incorrect=student_result.incorrect,
+                more_than_one_marked=student_result.more_than_one_marked,
+                not_marked=student_result.not_marked,
+                score=student_result.score,
+                flag=student_result.flag,
+                flag_reason=student_result.flag_reason,
+                answer_sheet_path=student_result.answer_sheet_path,
+                labeled_points=[[bubble.model_dump() for bubble in column] for column in student_result.labeled_points],
+                is_resolved=student_result.is_resolved
+            ).returning(MarkingResult.id)
+        )
+        if updated.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Result not found")
+
         await db.commit()
         await db.refresh(marking)
         return _get_marking_response(marking)   
@@ -844,8 +915,8 @@ async def get_file(
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Endpoint to retrieve a generated XLSX file,
-    remove some columns in-memory, and return for download.
+    Endpoint to build the results XLSX from the stored results,
+    without the internal columns, and stream it for download.
     """
 
     # Validate user ownership
@@ -867,40 +938,20 @@ async def get_file(
         if not marking.result_sheet_file:
             raise HTTPException(status_code=404, detail="Result sheet file not found")
         
-        # Update the result in the Excel file
-        result_sheet_file_path = marking.result_sheet_file.path
-        
-        # Load file from your shared storage
-        shared_storage = SharedStorage()
-        file_content = await shared_storage.get_file(result_sheet_file_path)
-
-        if not file_content:
-            raise HTTPException(status_code=404, detail="File not found")
-
-        # ---- Perform in-memory operations ----
-        # Create an in-memory buffer for reading
-        original_buffer = BytesIO(file_content)
-
-        # Read XLSX into pandas DataFrame
-        df = pd.read_excel(original_buffer)
-
-        # Example: remove some columns safely if they exist
-        columns_to_remove = ["Answer Sheet Path", "Labeled Points", "Audit File Name"]
-        df = df.drop(columns=[c for c in columns_to_remove if c in df.columns])
-
-        # Create another in-memory buffer to save modified file
-        modified_buffer = BytesIO()
-        df.to_excel(modified_buffer, index=False)
-        modified_buffer.seek(0)
+        # Write the sheet to a spooled file, small sheets never touch the disk
+        sheet = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            await write_result_sheet(db, marking, sheet, exclude=["Answer Sheet Path", "Labeled Points", "Audit File Name"])
+        except Exception:
+            sheet.close()
+            raise
 
-        # Set headers for download (proper filename)
         headers = {
-            "Content-Disposition": f'attachment; filename="{marking.name}_results.xlsx"'
+            "Content-Disposition": f'attachment; filename="{marking.name}_results.xlsx"',
+            "Content-Length": str(sheet.tell())
         }
-
-        # Return modified file (no disk writes!)
-        return Response(
-            content=modified_buffer.read(),
+        return StreamingResponse(
+            iter_file(sheet),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers=headers,
         )
@@ -912,6 +963,54 @@ async def get_file(
         raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
     
 
+def _audit_entries(marking: MarkingJob, results_sheet, base_path: Path):
+    """(name in archive, source) pairs of an audit bundle; missing files are skipped."""
+    yield f"{marking.name}_results.xlsx", results_sheet
+
+    # Template and marking scheme files
+    sources = [
+        ("template", marking.template.template_file.path if marking.template and marking.template.template_file else None),
+        ("marking scheme", marking.marking_scheme.path if marking.marking_scheme else None),
+    ]
+    for description, relative_path in sources:
+        if not relative_path:
+            continue
+        file_path = base_path / relative_path
+        if file_path.is_file():
+            yield os.path.basename(relative_path), file_path
+        else:
+            logger.warning(f"Failed to include {description} file for marking job {marking.id}")
+
+    # Intermediate results folder, preserving its relative structure
+    inter_rel = marking.intermediate_results_path
+    if inter_rel:
+        inter_folder = base_path / inter_rel
+        if not inter_folder.is_dir():
+            logger.warning(f"Failed to include intermediate results folder for marking job {marking.id}")
+            return
+        folder_name = os.path.basename(inter_rel.rstrip('/'))
+        for root, dirs, files in os.walk(inter_folder):
+            dirs.sort()
+            for fname in sorted(files):
+                file_full = Path(root) / fname
+                yield os.path.join(folder_name, os.path.relpath(file_full, inter_folder)), file_full
+
+
+async def _get_audit_bundle(db: AsyncSession, marking: MarkingJob) -> Optional[Path]:
+    """The audit ZIP the worker built for the job, None if missing or results were edited since."""
+    if not marking.audit_bundle_path:
+        return None
+    bundle = SharedStorage().get_base_path() / marking.audit_bundle_path
+    if not bundle.is_file():
+        return None
+    # Results are imported with updated_at == created_at, a later update is an edit
+    edited = await db.scalar(select(exists().where(
+        MarkingResult.marking_job_id == marking.id,
+        MarkingResult.updated_at > MarkingResult.created_at
+    )))
+    return None if edited else bundle
+
+
 @router.get("/{marking_job_id}/download-audit")
 @require_non_super_admin(require_admin_verified=True)
 async def get_audit(
@@ -920,7 +1019,8 @@ async def get_audit(
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Endpoint to retrieve a generated Audit ZIP file.
+    Endpoint to stream an Audit ZIP file with the results, template,
+    marking scheme and intermediate results of a marking job.
     """
 
     # Validate user ownership
@@ -945,97 +1045,36 @@ async def get_audit(
         
         if not marking.result_sheet_file:
             raise HTTPException(status_code=404, detail="Result sheet file not found")
-        
-        # Update the result in the Excel file
-        result_sheet_file_path = marking.result_sheet_file.path
-        
-        # Load file from your shared storage
-        shared_storage = SharedStorage()
-        excel_file_content = await shared_storage.get_file(result_sheet_file_path)
-
-        if not excel_file_content:
-            raise HTTPException(status_code=404, detail="File not found")
-
-        # ---- Perform in-memory operations ----
-        # Create an in-memory buffer for reading
-        original_buffer = BytesIO(excel_file_content)
-
-        # Read XLSX into pandas DataFrame
-        df = pd.read_excel(original_buffer)
-
-        # Example: remove some columns safely if they exist
-        columns_to_remove = ["Answer Sheet Path", "Labeled Points"]
-        df = df.drop(columns=[c for c in columns_to_remove if c in df.columns])
-
-        # Create another in-memory buffer to save modified file
-        modified_buffer = BytesIO()
-        df.to_excel(modified_buffer, index=False)
-        modified_buffer.seek(0)
-
-        # Create an in-memory ZIP containing the modified results + template + marking scheme
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-            # Add modified results XLSX
-            zf.writestr(f"{marking.name}_results.xlsx", modified_buffer.getvalue())
 
-            # Add template files if available
-            try:
-                if getattr(marking, "template", None) and getattr(marking.template, "template_file", None) and getattr(marking.template.template_file, "path", None):
-                    tpl_path = marking.template.template_file.path
-                    tpl_bytes = await shared_storage.get_file(tpl_path)
-                    if tpl_bytes:
-                        zf.writestr(os.path.basename(tpl_path), tpl_bytes)
-            except Exception:
-                logger.warning(f"Failed to include template file for marking job {marking_job_id}")
-
-            # Add marking scheme file if available
-            try:
-                if getattr(marking, "marking_scheme", None) and getattr(marking.marking_scheme, "path", None):
-                    ms_path = marking.marking_scheme.path
-                    ms_bytes = await shared_storage.get_file(ms_path)
-                    if ms_bytes:
-                        zf.writestr(os.path.basename(ms_path), ms_bytes)
-            except Exception:
-                logger.warning(f"Failed to include marking scheme file for marking job {marking_job_id}")
-            
-            #Add intermediate results folder
-            try:
-                inter_rel = getattr(marking, "intermediate_results_path", None)
-                if inter_rel:
-                    base_path = shared_storage.get_base_path()
-                    inter_folder = base_path / inter_rel
-                    if inter_folder.exists() and inter_folder.is_dir():
-                        # Walk directory and add files preserving relative structure
-                        for root, dirs, files in os.walk(inter_folder):
-                            for fname in files:
-                                file_full = Path(root) / fname
-                                # relative path inside the intermediate folder
-                                rel_inside = os.path.relpath(file_full, inter_folder)
-                                arcname = os.path.join(os.path.basename(inter_rel.rstrip('/')), rel_inside)
-                                try:
-                                    # Use shared_storage to read file bytes
-                                    file_path_for_storage = str(Path(inter_rel) / rel_inside)
-                                    file_bytes = await shared_storage.get_file(file_path_for_storage)
-                                except Exception:
-                                    # fallback to reading directly from disk
-                                    try:
-                                        with open(file_full, 'rb') as f:
-                                            file_bytes = f.read()
-                                    except Exception:
-                                        file_bytes = None
-
-                                if file_bytes:
-                                    zf.writestr(arcname, file_bytes)
-            except Exception:
-                logger.warning(f"Failed to include intermediate results folder for marking job {marking_job_id}")
-
-        zip_buffer.seek(0)
+        # Serve the bundle the worker built while marking; repeat downloads are plain
+        # disk reads, revalidated by ETag, and resumable with range requests
+        bundle = await _get_audit_bundle(db, marking)
+        if bundle:
+            stat = bundle.stat()
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+                return Response(status_code=304, headers={"ETag": etag})
+            return FileResponse(
+                bundle,
+                media_type="application/zip",
+                filename=f"{marking.name}_audit.zip",
+                headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+            )
 
+        # No bundle, or results were edited after marking: build it while sending
+        sheet = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            await write_result_sheet(db, marking, sheet, exclude=["Answer Sheet Path", "Labeled Points"])
+        except Exception:
+            sheet.close()
+            raise
+
+        # Entries are read from disk chunk by chunk while the archive is sent;
+        # images are stored as they are, everything else is deflated
+        entries = _audit_entries(marking, sheet, SharedStorage().get_base_path())
         headers = {"Content-Disposition": f'attachment; filename="{marking.name}_audit.zip"'}
-
-        # Return ZIP (no disk writes)
-        return Response(
-            content=zip_buffer.read(),
+        return StreamingResponse(
+            stream_zip(entries),
             media_type="application/zip",
             headers=headers,
         )
@@ -1044,4 +1083,4 @@ async def get_audit(
         raise
     except Exception as e:
         logger.error(f"Failed to retrieve or process file: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
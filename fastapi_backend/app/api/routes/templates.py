@@ -1,11 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, status, WebSocket, WebSocketDisconnect, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, status, WebSocket, WebSocketDisconnect, Request
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import uuid
 import logging
 
-from app.schemas.template import TemplateResponse, TemplateCreate, TemplateUpdate
+from app.schemas.template import TemplateResponse, TemplateCreate, TemplateUpdate, TemplatesPage
 from app.models import Template, TemplateConfigJob
 from app.models.template import TemplateConfigStatus, TemplateConfigType
 from app.models.template_config_job import TemplateConfigJobPriority
@@ -17,6 +17,7 @@ from app.api.deps import get_websocket_manager
 from app.storage.shared_storage import SharedStorage
 from app.models.file import FileOrFolder, FileOrFolderStatus
 from app.middleware.authorization import require_non_super_admin
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, next_cursor
 from app.middleware.websocket_auth import authorize_websocket
 from app.models.user import UserRoles
 
@@ -103,52 +104,42 @@ async def create_template(
             detail=f"Failed to create template: {str(e)}"
         )
 
-@router.get("", response_model=List[TemplateResponse])
+@router.get("", response_model=TemplatesPage)
 @require_non_super_admin(require_admin_verified=True)
 async def list_templates(
     request: Request,
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     config_type: Optional[TemplateConfigType] = None,
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all templates
+    List a page of templates, newest first
     """
     # Get user from token for ownership filtering
     user_id = request.state.current_user.id
     try:
-        query = select(Template)
+        query = select(*[getattr(Template, field) for field in TemplateResponse.model_fields])
         query = query.where(Template.created_by == user_id)
         
         if config_type:
             query = query.where(Template.config_type == config_type)
         
-        query = query.offset(skip).limit(limit).order_by(Template.created_at.desc())
+        try:
+            query = paginate(query, Template.created_at, Template.id, cursor, limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         
-        result = await db.execute(query)
-        templates = result.scalars().all()
+        rows, following = next_cursor((await db.execute(query)).all(), limit)
         
-        return [
-            TemplateResponse(
-                id=template.id,
-                name=template.name,
-                description=template.description,
-                status=template.status,
-                config_type=template.config_type,
-                configuration_file_id=template.configuration_file_id,
-                template_file_id=template.template_file_id,
-                num_questions=template.num_questions,
-                num_of_columns= template.num_of_columns,
-                num_of_rows_per_column= template.num_of_rows_per_column,
-                num_of_options_per_question=template.num_of_options_per_question,
-                created_at=template.created_at,
-                updated_at=template.updated_at,
-                created_by=template.created_by
-            )
-            for template in templates
-        ]
+        return TemplatesPage(
+            items=[TemplateResponse(**row._mapping) for row in rows],
+            limit=limit,
+            next_cursor=following
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
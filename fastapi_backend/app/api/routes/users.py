@@ -10,6 +10,7 @@ from app.schemas.user import UserResponse, UserResponseWithFaculty, UserRoleUpda
 from app.database import get_async_db
 from app.models.user import User, VerifyStatus, UserRoles
 from app.middleware.authorization import require_basic_or_higher, require_faculty_admin_or_higher
+from app.api.routes.auth import user_cache
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -142,6 +143,7 @@ async def update_user(
             user.faculty_id = user_update.faculty_id
             
         await db.commit()
+        user_cache.invalidate(user.email)
         
         # Re-query the user with faculty relationship to avoid greenlet issues
         result = await db.execute(
@@ -194,6 +196,7 @@ async def verify_user(
         user.verify_status = VerifyStatus.ADMINVERIFIED
         
         await db.commit()
+        user_cache.invalidate(user.email)
         
         # Re-query the user with faculty relationship to avoid greenlet issues
         result = await db.execute(
@@ -251,6 +254,7 @@ async def update_role(
             raise HTTPException(status_code=400, detail=f"Invalid role: {user_role_update.role}")
         
         await db.commit()
+        user_cache.invalidate(user.email)
         
         # Re-query the user with faculty relationship to avoid greenlet issues
         result = await db.execute(
@@ -309,6 +313,7 @@ async def delete_user(
         
         await db.delete(user)
         await db.commit()
+        user_cache.invalidate(user_response.email)
         
         return user_response
         
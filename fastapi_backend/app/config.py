@@ -64,10 +64,19 @@ class AppSettings(BaseSettings):
     allowed_hosts: str = Field(
         ...)
     
-    # File upload settings
+    # File upload settings; max_upload_size also bounds each chunk of a chunked upload
     max_upload_size: int = Field(
         default=100 * 1024 * 1024,  # 100MB
     )
+
+    max_chunked_upload_size: int = Field(
+        default=20 * 1024 * 1024 * 1024,  # 20GB
+    )
+
+    # Seconds a chunked upload session is kept after its last chunk, so clients can resume it
+    upload_session_ttl: int = Field(
+        default=24 * 60 * 60,
+    )
     
     upload_dir: str = Field(
         default="uploads")
@@ -76,6 +85,29 @@ class AppSettings(BaseSettings):
     nfs_shared_path: str = Field(
         default="/shared")
 
+    # WebSocket delivery: messages queued per client before it is evicted as too slow,
+    # and seconds a single send may take
+    websocket_send_queue_size: int = Field(
+        default=100)
+
+    websocket_send_timeout: float = Field(
+        default=5.0)
+
+    # Seconds a user's dashboard statistics are reused
+    dashboard_cache_ttl: float = Field(
+        default=15.0)
+
+    # Retention sweeper: seconds between sweeps (0 disables it), files checked per
+    # batch, and files deleted from the share in parallel
+    file_retention_sweep_interval: float = Field(
+        default=600.0)
+
+    file_retention_batch_size: int = Field(
+        default=200)
+
+    file_retention_concurrency: int = Field(
+        default=4)
+
 
 class RabbitMQSettings(BaseSettings):
     """RabbitMQ configuration settings."""
@@ -88,6 +120,16 @@ class RabbitMQSettings(BaseSettings):
     rabbitmq_user: str = Field(...)
     rabbitmq_password: str = Field(...)
 
+    # Job queues are priority queues; must match the marking worker's JOB_MAX_PRIORITY
+    job_max_priority: int = Field(
+        default=10)
+
+    # Result consumers: unacknowledged messages per consumer, and how many are processed at once
+    result_consumer_prefetch: int = Field(
+        default=20)
+    result_consumer_concurrency: int = Field(
+        default=4)
+
 
 class AuthSettings(BaseSettings):
     """Authentication settings."""
@@ -114,6 +156,17 @@ class AuthSettings(BaseSettings):
         default=7,
         description="Refresh token expiration time in days"
     )
+
+    # In-process authentication caches
+    auth_token_cache_size: int = Field(
+        default=10000,
+        description="Verified access tokens (and users) cached per process, 0 disables the caches"
+    )
+
+    auth_user_cache_ttl: float = Field(
+        default=30,
+        description="Seconds a user loaded for an access token is reused"
+    )
     
     # Super user settings
     super_user_email: str = Field(
@@ -209,6 +262,16 @@ def get_nfs_shared_path() -> str:
     return settings.app.nfs_shared_path
 
 
+def get_websocket_send_queue_size() -> int:
+    """Get the per-client WebSocket send queue size from settings."""
+    return settings.app.websocket_send_queue_size
+
+
+def get_websocket_send_timeout() -> float:
+    """Get the WebSocket send timeout from settings."""
+    return settings.app.websocket_send_timeout
+
+
 def get_rabbitmq_url() -> str:
     """Get RabbitMQ URL from settings."""
     return settings.rabbitmq.rabbitmq_url
@@ -234,6 +297,21 @@ def get_rabbitmq_password() -> str:
     return settings.rabbitmq.rabbitmq_password
 
 
+def get_job_max_priority() -> int:
+    """Get the x-max-priority of the job queues from settings."""
+    return settings.rabbitmq.job_max_priority
+
+
+def get_result_consumer_prefetch() -> int:
+    """Get the prefetch count of each result consumer from settings."""
+    return settings.rabbitmq.result_consumer_prefetch
+
+
+def get_result_consumer_concurrency() -> int:
+    """Get how many messages each result consumer processes at once from settings."""
+    return settings.rabbitmq.result_consumer_concurrency
+
+
 def get_secret_key() -> str:
     """Get JWT secret key from settings."""
     return settings.auth.secret_key
@@ -254,6 +332,16 @@ def get_refresh_token_expire_days() -> int:
     return settings.auth.refresh_token_expire_days
 
 
+def get_auth_token_cache_size() -> int:
+    """Get the number of verified access tokens cached per process from settings."""
+    return settings.auth.auth_token_cache_size
+
+
+def get_auth_user_cache_ttl() -> float:
+    """Get seconds a user loaded for an access token is reused from settings."""
+    return settings.auth.auth_user_cache_ttl
+
+
 def get_super_user_email() -> str:
     """Get super user email from settings."""
     return settings.auth.super_user_email
@@ -312,6 +400,36 @@ def get_max_upload_size() -> int:
     return settings.app.max_upload_size
 
 
+def get_max_chunked_upload_size() -> int:
+    """Get max size of a file assembled from chunks from settings."""
+    return settings.app.max_chunked_upload_size
+
+
+def get_upload_session_ttl() -> int:
+    """Get seconds an idle chunked upload session is kept from settings."""
+    return settings.app.upload_session_ttl
+
+
+def get_dashboard_cache_ttl() -> float:
+    """Get seconds a user's dashboard statistics are reused from settings."""
+    return settings.app.dashboard_cache_ttl
+
+
+def get_file_retention_sweep_interval() -> float:
+    """Get seconds between file retention sweeps from settings."""
+    return settings.app.file_retention_sweep_interval
+
+
+def get_file_retention_batch_size() -> int:
+    """Get number of files a retention sweep checks per batch from settings."""
+    return settings.app.file_retention_batch_size
+
+
+def get_file_retention_concurrency() -> int:
+    """Get number of files a retention sweep deletes in parallel from settings."""
+    return settings.app.file_retention_concurrency
+
+
 def get_upload_dir() -> str:
     """Get upload directory from settings."""
     return settings.app.upload_dir
@@ -122,10 +122,11 @@ async def create_tables():
     Create all database tables asynchronously.
     """
     # Import models to ensure they are registered with Base
-    from .models import User, Template, FileOrFolder, MarkingJob, TemplateConfigJob
+    from .models import User, Template, FileOrFolder, MarkingJob, MarkingResult, TemplateConfigJob
     
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
 
 
 def create_tables_sync():
@@ -133,9 +134,23 @@ def create_tables_sync():
     Create all database tables synchronously.
     """
     # Import models to ensure they are registered with Base
-    from .models import User, Template, FileOrFolder, MarkingJob, TemplateConfigJob
+    from .models import User, Template, FileOrFolder, MarkingJob, MarkingResult, TemplateConfigJob
     
     Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        create_missing_indexes(conn)
+
+
+def create_missing_indexes(connection):
+    """
+    Create the indexes declared on the models that an existing database lacks.
+
+    create_all only creates the indexes of the tables it creates, so indexes
+    added to a model later are created here; existing ones are left alone.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
 
 
 # Database initialization
@@ -8,6 +8,7 @@ from app.database import init_db, close_db, test_database_connection
 from app.config import get_app_name, get_app_version, get_debug, get_environment, get_allowed_hosts
 from app.queue import initialize_queue_system, shutdown_queue_system, rabbitmq_manager
 from app.api.deps import initialize_websocket_manager
+from app.retention import retention_sweeper
 
 
 logging.basicConfig(
@@ -33,6 +34,8 @@ async def lifespan(app: FastAPI):
         await initialize_queue_system()
         logger.info("Queue system initialized")
 
+        retention_sweeper.start()
+
     except Exception as e:
         logger.exception("Initialization failed: %s", e)
         raise
@@ -42,6 +45,8 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down MCQ Marking System API")
 
     try:
+        await retention_sweeper.stop()
+
         await shutdown_queue_system()
         logger.info("Queue system shutdown complete")
 
@@ -110,6 +115,7 @@ async def health_check():
         "status": overall_status,
         "database": db_status,
         "queue": queue_status,
+        "retention": retention_sweeper.stats.as_dict(),
         "version": get_app_version(),
         "environment": get_environment()
     }
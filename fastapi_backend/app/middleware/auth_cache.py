@@ -0,0 +1,66 @@
+"""
+In-process caches for authentication.
+
+Decoding and verifying a JWT and loading the user behind it happen on every
+authenticated request, mostly for the same few tokens of polling clients. The
+caches here keep verified token claims until the token expires and users for a
+short time. Each API replica has its own caches; user changes invalidate the
+local entry and the TTL bounds how long other replicas can serve a stale user.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.utils.ttl_cache import TTLCache
+
+
+def _token_key(token: str) -> str:
+    # Tokens are credentials, keep only their digest
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenClaimsCache:
+    """LRU cache of verified JWT claims keyed by token hash, each entry valid until the token's exp."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = _token_key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None:
+                return None
+            if claims.get("exp") is None or claims["exp"] <= time.time():
+                # Expired tokens are decoded again so they are rejected the usual way
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        if self.max_size <= 0 or claims.get("exp") is None:
+            return
+        key = _token_key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class UserCache(TTLCache):
+    """Users by email for a few seconds, so repeated requests of one user skip the database."""
+
+    def invalidate(self, email: Optional[str] = None) -> None:
+        """Drop one user, e.g. after their role or verification status changed, or all users."""
+        super().invalidate(email)
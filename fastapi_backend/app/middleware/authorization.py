@@ -9,6 +9,10 @@ from app.middleware.user_state import UserState
 
 logger = logging.getLogger(__name__)
 
+# Token claims to enums, built once instead of scanning the enums per request
+ROLES_BY_VALUE = {role.value: role for role in UserRoles}
+VERIFY_STATUSES_BY_VALUE = {verify_status.value: verify_status for verify_status in VerifyStatus}
+
 
 class AuthorizationMiddleware:
     """
@@ -84,33 +88,15 @@ class AuthorizationMiddleware:
             # Extract user information from token
             user_info = get_user_from_token(request)
             
-           
-            
             # Add user to request state for access in endpoints
             request.state.current_user = UserState(user_info)
             
-            # Extract role and verification status
-            user_role_str = user_info["role"]
-            user_verify_status_str = user_info["verify_status"]
-            
             # Convert string values to enums
-            user_role = None
-            user_verify_status = None
-            
-            # Find matching UserRole enum
-            for role in UserRoles:
-                if role.value == user_role_str:
-                    user_role = role
-                    break
-            
-            # Find matching VerifyStatus enum
-            for status_enum in VerifyStatus:
-                if status_enum.value == user_verify_status_str:
-                    user_verify_status = status_enum
-                    break
+            user_role = ROLES_BY_VALUE.get(user_info["role"])
+            user_verify_status = VERIFY_STATUSES_BY_VALUE.get(user_info["verify_status"])
             
             if not user_role:
-                logger.warning(f"Invalid user role in token: {user_role_str}")
+                logger.warning(f"Invalid user role in token: {user_info['role']}")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid user role",
@@ -118,7 +104,7 @@ class AuthorizationMiddleware:
                 )
             
             if not user_verify_status:
-                logger.warning(f"Invalid verification status in token: {user_verify_status_str}")
+                logger.warning(f"Invalid verification status in token: {user_info['verify_status']}")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid verification status",
@@ -145,11 +131,12 @@ class AuthorizationMiddleware:
                     detail="Access denied. Admin verification for the user account required.",
                 )
             
-            logger.info(
-                f"Authorization successful: role={user_role.value}, "
-                f"verification={user_verify_status.value}, "
-                f"allowed_roles={[role.value for role in allowed_roles]}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Authorization successful: role={user_role.value}, "
+                    f"verification={user_verify_status.value}, "
+                    f"allowed_roles={[role.value for role in allowed_roles]}"
+                )
             
         except HTTPException:
             # Re-raise HTTP exceptions (authentication/authorization errors)
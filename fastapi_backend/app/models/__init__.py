@@ -8,6 +8,7 @@ from .user import User
 from .template import Template, TemplateConfigStatus
 from .file import FileOrFolder
 from .marking_job import MarkingJob, MarkingJobStatus
+from .marking_result import MarkingResult
 from .template_config_job import TemplateConfigJob, TemplateConfigJobPriority
 
 __all__ = [
@@ -18,6 +19,7 @@ __all__ = [
     "FileOrFolder", 
     "MarkingJob", 
     "MarkingJobStatus",
+    "MarkingResult",
     "TemplateConfigJob",
     "TemplateConfigStatus",
     "TemplateConfigJobPriority"
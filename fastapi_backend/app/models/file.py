@@ -3,7 +3,7 @@ File model for uploaded files and documents.
 """
 
 from datetime import datetime, timedelta
-from sqlalchemy import Column, DateTime, String, Integer, BigInteger, ForeignKey, Enum
+from sqlalchemy import Column, DateTime, String, Integer, BigInteger, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 from .base import BaseModel
@@ -34,6 +34,16 @@ class FileOrFolder(BaseModel):
     """File model for uploaded files and documents."""
     
     __tablename__ = "files_or_folders"
+    __table_args__ = (
+        # A user's files newest first
+        Index("ix_files_or_folders_created_by_created_at", "created_by", "created_at", "id"),
+        # Retention sweep of expired files; swept rows drop out of the index
+        Index(
+            "ix_files_or_folders_deletion_date",
+            "deletion_date",
+            postgresql_where=text("deletion_date IS NOT NULL"),
+        ),
+    )
     
     # File metadata
     name = Column(String(255), nullable=False)
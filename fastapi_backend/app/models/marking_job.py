@@ -2,9 +2,10 @@
 MarkingJob model for handling MCQ answer sheet marking operations.
 """
 
-from sqlalchemy import Column, String, Text, Integer, Float, Boolean, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, Text, Integer, Float, Boolean, ForeignKey, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
+from typing import Optional
 from .base import BaseModel
 
 
@@ -36,6 +37,13 @@ class MarkingJob(BaseModel):
     """
     
     __tablename__ = "marking_jobs"
+    __table_args__ = (
+        # A user's jobs newest first, and their counts per status
+        Index("ix_marking_jobs_created_by_created_at", "created_by", "created_at", "id"),
+        Index("ix_marking_jobs_created_by_status", "created_by", "status"),
+        # Jobs of a template, e.g. when the template is deleted
+        Index("ix_marking_jobs_template_id", "template_id"),
+    )
 
     # Basic job information
     name = Column(String(100), nullable=False, index=True)
@@ -108,6 +116,13 @@ class MarkingJob(BaseModel):
             return 0.0
         return (self.processed_answer_sheets / total_processed) * 100
     
+    @property
+    def audit_bundle_path(self) -> Optional[str]:
+        """Where the marking worker assembles the audit ZIP, next to the intermediate results."""
+        if not self.intermediate_results_path:
+            return None
+        return f"{self.intermediate_results_path.rstrip('/')}.zip"
+
     @property
     def is_completed(self) -> bool:
         """Check if the job is completed."""
@@ -165,7 +180,8 @@ class MarkingJob(BaseModel):
             'result_sheet_file_path': self.result_sheet_file_path,
             'intermediate_results_path': self.intermediate_results_path,
             'index_list_file_path': self.index_list_file_path.path if self.index_list_file_path else None,
-            'save_intermediate_results': self.save_intermediate_results
+            'save_intermediate_results': self.save_intermediate_results,
+            'audit_bundle_path': self.audit_bundle_path
         }
     
     def update_progress(self, processed: int, failed: int = 0):
@@ -0,0 +1,55 @@
+"""
+MarkingResult model holding the per-student results of a marking job.
+"""
+
+from sqlalchemy import Column, String, Text, Integer, Float, Boolean, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from .base import BaseModel
+
+
+class MarkingResult(BaseModel):
+    """
+    One marked answer sheet of a marking job.
+
+    This table is the source of truth for results once a job has completed; the
+    result XLSX written by the worker is imported into it once and downloads are
+    built from it on demand.
+    """
+
+    __tablename__ = "marking_results"
+    __table_args__ = (
+        # Keyset pagination of a job's results in each sort order
+        UniqueConstraint("marking_job_id", "row_number", name="uq_marking_results_job_row"),
+        Index("ix_marking_results_job_score", "marking_job_id", "score", "row_number"),
+        Index("ix_marking_results_job_index_number", "marking_job_id", "index_number", "row_number"),
+        # Review queue: the flagged results of a job are a small part of it
+        Index(
+            "ix_marking_results_job_flagged",
+            "marking_job_id", "row_number",
+            postgresql_where=text("flag"),
+        ),
+    )
+
+    marking_job_id = Column(Integer, ForeignKey("marking_jobs.id", ondelete="CASCADE"), nullable=False)
+    row_number = Column(Integer, nullable=False)  # 1-based data row of the result sheet
+
+    # Student and marks
+    index_number = Column(String(100), nullable=False, default="")
+    correct = Column(JSONB, nullable=False, default=list)
+    incorrect = Column(JSONB, nullable=False, default=list)
+    more_than_one_marked = Column(JSONB, nullable=False, default=list)
+    not_marked = Column(JSONB, nullable=False, default=list)
+    score = Column(Float, nullable=False, default=0)
+
+    # Review state
+    flag = Column(Boolean, nullable=False, default=False)
+    flag_reason = Column(Text, nullable=False, default="")
+    is_resolved = Column(Boolean, nullable=False, default=False)
+
+    # Answer sheet references
+    answer_sheet_path = Column(String(500), nullable=False, default="")
+    labeled_points = Column(JSONB, nullable=False, default=list)
+    audit_file_name = Column(String(500), nullable=True)
+
+    def __repr__(self):
+        return f"<MarkingResult(marking_job_id={self.marking_job_id}, row_number={self.row_number}, index_number='{self.index_number}')>"
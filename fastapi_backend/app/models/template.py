@@ -2,7 +2,7 @@
 Template model for MCQ templates.
 """
 
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum ,JSON
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum ,JSON, Index
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 from .base import BaseModel
@@ -25,6 +25,11 @@ class Template(BaseModel):
     """Template model for MCQ templates."""
     
     __tablename__ = "templates"
+    __table_args__ = (
+        # A user's templates newest first, and their counts per config type and status
+        Index("ix_templates_created_by_created_at", "created_by", "created_at", "id"),
+        Index("ix_templates_created_by_config_type_status", "created_by", "config_type", "status"),
+    )
     
     name = Column(String(100), nullable=False, index=True)
     description = Column(Text, nullable=True)
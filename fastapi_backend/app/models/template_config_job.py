@@ -2,7 +2,7 @@
 TemplateConfigJob model for handling template configuration operations.
 """
 
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, Enum,JSON
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, Enum,JSON, Index
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 
@@ -27,6 +27,10 @@ class TemplateConfigJob(BaseModel):
     """
     
     __tablename__ = "template_config_jobs"
+    __table_args__ = (
+        # Config jobs of a template
+        Index("ix_template_config_jobs_template_id", "template_id"),
+    )
     
     # Basic job information
     name = Column(String(100), nullable=False, index=True)
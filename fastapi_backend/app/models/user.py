@@ -1,5 +1,5 @@
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -17,6 +17,11 @@ class User(BaseModel):
     """User model for authentication and user management."""
     
     __tablename__ = "users"
+    __table_args__ = (
+        # Users of a faculty newest first, and faculty user counts
+        Index("ix_users_faculty_id_created_at", "faculty_id", "created_at"),
+    )
+
     email = Column(String(100), unique=True, index=True, nullable=False)
     first_name = Column(String(100), nullable=True)
     last_name = Column(String(100), nullable=True)
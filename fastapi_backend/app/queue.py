@@ -8,10 +8,10 @@ import aio_pika
 from aio_pika import Connection, Channel, Queue, Message, ExchangeType
 from aio_pika.abc import AbstractIncomingMessage
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 
-from .config import get_rabbitmq_url
+from .config import get_rabbitmq_url, get_job_max_priority, get_result_consumer_prefetch, get_result_consumer_concurrency
 from .database import get_async_db, AsyncSessionLocal
 from app.models.marking_job import MarkingJob
 from app.models.template_config_job import TemplateConfigJob
@@ -19,9 +19,18 @@ from app.models.marking_job import MarkingJobStatus
 from app.models.template import Template, TemplateConfigStatus
 from app.models.file import FileOrFolder, FileOrFolderType, FileOrFolderStatus
 from app.api.deps import get_websocket_manager
+from app.utils.results import import_marking_results
 
 logger = logging.getLogger(__name__)
 
+# AMQP message priority per job priority. Job queues are declared with x-max-priority
+# so RabbitMQ delivers the most urgent job first; the worker declares them the same way
+JOB_PRIORITIES = {
+    "urgent": 9,
+    "high": 7,
+    "normal": 5,
+    "low": 1
+}
 
 class RabbitMQManager:
     """
@@ -81,12 +90,14 @@ class RabbitMQManager:
             {
                 "name": "template_config_queue",
                 "routing_key": "template.config",
-                "durable": True
+                "durable": True,
+                "max_priority": get_job_max_priority()
             },
             {
                 "name": "marking_job_queue", 
                 "routing_key": "marking.job",
-                "durable": True
+                "durable": True,
+                "max_priority": get_job_max_priority()
             },
             {
                 "name": "template_config_results",
@@ -101,7 +112,8 @@ class RabbitMQManager:
             {
                 "name": "marking_scheme_config_queue",
                 "routing_key": "marking.scheme.config",
-                "durable": True
+                "durable": True,
+                "max_priority": get_job_max_priority()
             },
             {
                 "name": "marking_scheme_config_results",
@@ -111,9 +123,13 @@ class RabbitMQManager:
         ]
         
         for config in queue_configs:
+            arguments = None
+            if config.get("max_priority"):
+                arguments = {"x-max-priority": config["max_priority"]}
             queue = await self.channel.declare_queue(
                 config["name"], 
-                durable=config["durable"]
+                durable=config["durable"],
+                arguments=arguments
             )
             await queue.bind(self.exchange, config["routing_key"])
             self.queues[config["name"]] = queue
@@ -186,13 +202,7 @@ class TemplateConfigProducer:
                 raise
             
             # Determine priority based on job priority
-            priority_map = {
-                "urgent": 9,
-                "high": 7,
-                "normal": 5,
-                "low": 1
-            }
-            priority = priority_map.get(job.priority.value, 5)
+            priority = JOB_PRIORITIES.get(job.priority.value, JOB_PRIORITIES["normal"])
             
             # Check if RabbitMQ connection is available
             if not self.rabbitmq.connection or self.rabbitmq.connection.is_closed:
@@ -260,13 +270,7 @@ class MarkingSchemeConfigProducer:
                 raise
             
             # Determine priority based on job priority
-            priority_map = {
-                "urgent": 9,
-                "high": 7,
-                "normal": 5,
-                "low": 1
-            }
-            priority = priority_map.get(job.priority.value, 5)
+            priority = JOB_PRIORITIES.get(job.priority.value, JOB_PRIORITIES["normal"])
             
             # Check if RabbitMQ connection is available
             if not self.rabbitmq.connection or self.rabbitmq.connection.is_closed:
@@ -327,13 +331,7 @@ class MarkingJobProducer:
             message = job.to_marking_job_data()
             
             # Determine priority based on job priority
-            priority_map = {
-                "urgent": 9,
-                "high": 7,
-                "normal": 5,
-                "low": 1
-            }
-            priority = priority_map.get(job.priority.value, 5)
+            priority = JOB_PRIORITIES.get(job.priority.value, JOB_PRIORITIES["normal"])
             
             # Publish to queue
             await self.rabbitmq.publish_message(
@@ -353,12 +351,91 @@ class MarkingJobProducer:
             raise
 
 
-class TemplateConfigResultConsumer:
-    """Consumer for template configuration job results."""
-    
-    def __init__(self, rabbitmq_manager: RabbitMQManager):
+class ResultConsumer:
+    """
+    Base class for the job result consumers.
+
+    Every consumer gets its own channel and prefetch window and processes up to
+    `concurrency` messages at once. Messages are sharded by job_id, so results of
+    one job are still handled in the order they were published.
+    """
+
+    queue_name: str = ""
+
+    def __init__(self, rabbitmq_manager: RabbitMQManager,
+                 prefetch_count: Optional[int] = None,
+                 concurrency: Optional[int] = None):
         self.rabbitmq = rabbitmq_manager
         self.is_consuming = False
+        self.prefetch_count = prefetch_count
+        self.concurrency = concurrency
+        self.channel: Optional[Channel] = None
+
+    async def process_message(self, message: AbstractIncomingMessage):
+        """Process one result message."""
+        raise NotImplementedError
+
+    @staticmethod
+    def shard_key(message: AbstractIncomingMessage) -> Any:
+        """Messages with the same key are processed in order."""
+        try:
+            return json.loads(message.body.decode()).get('job_id')
+        except Exception:
+            return None
+
+    async def _process_shard(self, shard: asyncio.Queue):
+        while True:
+            message = await shard.get()
+            if message is None:
+                return
+            try:
+                await self.process_message(message)
+            except Exception as e:
+                logger.error(f"Error processing message from {self.queue_name}: {e}")
+
+    async def start_consuming(self):
+        """Start consuming result messages."""
+        if self.is_consuming:
+            return
+        
+        self.is_consuming = True
+        prefetch_count = self.prefetch_count or get_result_consumer_prefetch()
+        concurrency = self.concurrency or get_result_consumer_concurrency()
+
+        self.channel = await self.rabbitmq.connection.channel()
+        await self.channel.set_qos(prefetch_count=prefetch_count)
+        queue = await self.channel.get_queue(self.queue_name)
+        
+        logger.info(f"Starting {self.queue_name} consumer (prefetch {prefetch_count}, concurrency {concurrency})")
+
+        # The prefetch window bounds how many messages wait in the shards
+        shards = [asyncio.Queue() for _ in range(concurrency)]
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                for shard in shards:
+                    task_group.create_task(self._process_shard(shard))
+                try:
+                    async with queue.iterator() as queue_iter:
+                        async for message in queue_iter:
+                            if not self.is_consuming:
+                                break
+                            shards[hash(self.shard_key(message)) % concurrency].put_nowait(message)
+                finally:
+                    for shard in shards:
+                        shard.put_nowait(None)
+        finally:
+            if not self.channel.is_closed:
+                await self.channel.close()
+    
+    def stop_consuming(self):
+        """Stop consuming messages."""
+        self.is_consuming = False
+
+
+class TemplateConfigResultConsumer(ResultConsumer):
+    """Consumer for template configuration job results."""
+    
+    queue_name = "template_config_results"
     
     async def process_template_config_result(self, message: AbstractIncomingMessage):
         """Process template configuration result message."""
@@ -522,35 +599,14 @@ class TemplateConfigResultConsumer:
             except Exception as e:
                 logger.error(f"Error parsing template config result message: {e}")
     
-    async def start_consuming(self):
-        """Start consuming template configuration result messages."""
-        if self.is_consuming:
-            return
-        
-        self.is_consuming = True
-        queue = self.rabbitmq.queues.get("template_config_results")
-        if not queue:
-            raise RuntimeError("template_config_results queue not found")
-        
-        logger.info("Starting template config result consumer")
-        
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                if not self.is_consuming:
-                    break
-                await self.process_template_config_result(message)
-    
-    def stop_consuming(self):
-        """Stop consuming messages."""
-        self.is_consuming = False
+    async def process_message(self, message: AbstractIncomingMessage):
+        await self.process_template_config_result(message)
 
 
-class MarkingSchemeConfigResultConsumer:
+class MarkingSchemeConfigResultConsumer(ResultConsumer):
     """Consumer for marking scheme configuration job results."""
     
-    def __init__(self, rabbitmq_manager: RabbitMQManager):
-        self.rabbitmq = rabbitmq_manager
-        self.is_consuming = False
+    queue_name = "marking_scheme_config_results"
     
     async def process_marking_scheme_config_result(self, message: AbstractIncomingMessage):
         """Process marking scheme configuration result message."""
@@ -577,8 +633,6 @@ class MarkingSchemeConfigResultConsumer:
                             return
                         
                         ws = get_websocket_manager()
-                        logger.info(f"WebSocket manager instance for job {job_id}: {id(ws)}")
-                        logger.info(f"Marking scheme config connections: {list(ws.marking_scheme_config_connections.keys())}")
                         
                         # Update job with results
                         if result_data.get('status', 'failed') == 'completed':
@@ -657,35 +711,66 @@ class MarkingSchemeConfigResultConsumer:
             except Exception as e:
                 logger.error(f"Error parsing marking scheme config result message: {e}")
     
-    async def start_consuming(self):
-        """Start consuming marking scheme configuration result messages."""
-        if self.is_consuming:
-            return
-        
-        self.is_consuming = True
-        queue = self.rabbitmq.queues.get("marking_scheme_config_results")
-        if not queue:
-            raise RuntimeError("marking_scheme_config_results queue not found")
-        
-        logger.info("Starting marking scheme config result consumer")
-        
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                if not self.is_consuming:
-                    break
-                await self.process_marking_scheme_config_result(message)
-    
-    def stop_consuming(self):
-        """Stop consuming messages."""
-        self.is_consuming = False
+    async def process_message(self, message: AbstractIncomingMessage):
+        await self.process_marking_scheme_config_result(message)
 
 
-class MarkingJobResultConsumer:
+class MarkingJobResultConsumer(ResultConsumer):
     """Consumer for marking job results."""
     
-    def __init__(self, rabbitmq_manager: RabbitMQManager):
-        self.rabbitmq = rabbitmq_manager
-        self.is_consuming = False
+    queue_name = "marking_job_results"
+
+    def __init__(self, rabbitmq_manager: RabbitMQManager, progress_flush_interval: float = 1.0, **kwargs):
+        super().__init__(rabbitmq_manager, **kwargs)
+        # Latest progress per job, written to the database once per flush interval
+        self.progress_flush_interval = progress_flush_interval
+        self.pending_progress: Dict[int, Dict[str, int]] = {}
+        self.progress_flush_task: Optional[asyncio.Task] = None
+
+    async def handle_progress(self, job_id: int, progress: Dict[str, int]):
+        """Forward progress to the WebSocket clients and queue it for the next database flush."""
+        logger.info(f"Marking job {job_id} is processing. Progress: {progress['completed']}/{progress['total']}")
+        self.pending_progress[job_id] = progress
+        if self.progress_flush_task is None or self.progress_flush_task.done():
+            self.progress_flush_task = asyncio.create_task(self.flush_progress_later())
+        ws = get_websocket_manager()
+        try:
+            await ws.send_message_to_marking_job(str(job_id), {
+                "status": "processing",
+                "marking_job_id": job_id,
+                "progress": {
+                    "completed": progress['completed'],
+                    "total": progress['total']
+                }
+                })
+        except Exception as ws_error:
+            logger.warning(f"Failed to send WebSocket message for job {job_id}: {ws_error}")
+
+    async def flush_progress_later(self):
+        """Write the latest progress of every job in one transaction after the flush interval."""
+        await asyncio.sleep(self.progress_flush_interval)
+        pending, self.pending_progress = self.pending_progress, {}
+        if not pending:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                for job_id, progress in pending.items():
+                    # Never move a finished job back to processing
+                    await db.execute(
+                        update(MarkingJob)
+                        .where(
+                            MarkingJob.id == job_id,
+                            MarkingJob.status.notin_([MarkingJobStatus.COMPLETED, MarkingJobStatus.FAILED, MarkingJobStatus.CANCELLED])
+                        )
+                        .values(
+                            status=MarkingJobStatus.PROCESSING,
+                            processed_answer_sheets=progress['completed'],
+                            total_answer_sheets=progress['total']
+                        )
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write marking job progress for jobs {list(pending)}: {e}")
     
     async def process_marking_job_result(self, message: AbstractIncomingMessage):
         """Process marking job result message."""
@@ -698,6 +783,14 @@ class MarkingJobResultConsumer:
                 if not job_id:
                     logger.error("No job_id in marking job result message")
                     return
+
+                # Progress only touches the database in coalesced batches
+                if result_data.get('status') == 'processing':
+                    await self.handle_progress(job_id, result_data['result'])
+                    return
+
+                # A final state supersedes any progress still waiting to be written
+                self.pending_progress.pop(job_id, None)
                 
                 # Get database session
                 async for db in get_async_db():
@@ -771,6 +864,14 @@ class MarkingJobResultConsumer:
                                     else:
                                         job.result_sheet_file_id = existing_file_record.id
                                         logger.info(f"Using existing file record {existing_file_record.id} for result sheet: {output_path}")
+
+                                    # Results are served from the database from now on; if the import
+                                    # fails they are imported on first read instead
+                                    try:
+                                        async with db.begin_nested():
+                                            await import_marking_results(db, job.id, output_path)
+                                    except Exception as import_error:
+                                        logger.warning(f"Failed to import results of marking job {job_id}: {import_error}")
                             
                             await db.commit()
                             logger.info(f"Marking job {job_id} completed successfully")
@@ -785,25 +886,6 @@ class MarkingJobResultConsumer:
                             except Exception as ws_error:
                                 logger.warning(f"Failed to send WebSocket message for job {job_id}: {ws_error}")
                             
-                        elif result_data.get('status', 'failed') == 'processing':
-                            if job.status != MarkingJobStatus.PROCESSING:
-                                job.status = MarkingJobStatus.PROCESSING
-                                await db.commit()
-                            logger.info(f"Marking job {job_id} is processing. Progress: {result_data['result']['completed']}/{result_data['result']['total']}")
-                            ws = get_websocket_manager()
-                            try:
-                                await ws.send_message_to_marking_job(str(job_id), {
-                                    "status": "processing",
-                                    "marking_job_id": job_id,
-                                    "progress": {
-                                        "completed": result_data['result']['completed'],
-                                        "total": result_data['result']['total']
-                                    }
-                                    })
-                            except Exception as ws_error:
-                                logger.warning(f"Failed to send WebSocket message for job {job_id}: {ws_error}")
-                            
-                            logger.info(f"Marking job {job_id} is processing")
                         else:
                             job.status = MarkingJobStatus.FAILED
                             # Try to get error message from either 'error_message' or 'result' field
@@ -829,27 +911,8 @@ class MarkingJobResultConsumer:
             except Exception as e:
                 logger.error(f"Error parsing marking job result message: {e}")
     
-    async def start_consuming(self):
-        """Start consuming marking job result messages."""
-        if self.is_consuming:
-            return
-        
-        self.is_consuming = True
-        queue = self.rabbitmq.queues.get("marking_job_results")
-        if not queue:
-            raise RuntimeError("marking_job_results queue not found")
-        
-        logger.info("Starting marking job result consumer")
-        
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                if not self.is_consuming:
-                    break
-                await self.process_marking_job_result(message)
-    
-    def stop_consuming(self):
-        """Stop consuming messages."""
-        self.is_consuming = False
+    async def process_message(self, message: AbstractIncomingMessage):
+        await self.process_marking_job_result(message)
 
 
 # Global producer and consumer instances
@@ -868,6 +931,9 @@ async def initialize_queue_system():
         
         await rabbitmq_manager.connect()
         logger.info("RabbitMQ connection established successfully")
+
+        # Progress reaches viewers on every replica through the fan-out exchange
+        await get_websocket_manager().start_fanout(rabbitmq_manager.connection)
         
         # Start consumers in background tasks
         logger.info("Starting background consumers...")
@@ -889,6 +955,8 @@ async def shutdown_queue_system():
         template_config_consumer.stop_consuming()
         marking_scheme_config_consumer.stop_consuming()
         marking_job_consumer.stop_consuming()
+
+        await get_websocket_manager().stop_fanout()
         
         # Disconnect from RabbitMQ
         await rabbitmq_manager.disconnect()
@@ -0,0 +1,226 @@
+"""
+Retention sweeper for the shared storage.
+
+Every file or folder record gets a deletion_date when it is created. A
+background task of each API replica periodically takes expired records in
+batches, removes them from the share in a bounded thread pool and marks them
+deleted. Records a template or marking job still points to are kept and
+checked again a retention period later. Batches are locked with SKIP LOCKED,
+so replicas sweeping at the same time split the work instead of repeating it.
+
+Idle chunked upload sessions are removed by the same sweep.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, union
+
+from app.config import (
+    get_file_retention_batch_size,
+    get_file_retention_concurrency,
+    get_file_retention_sweep_interval,
+    get_upload_session_ttl,
+)
+from app.database import AsyncSessionLocal
+from app.models.file import FileOrFolder, FileOrFolderStatus
+from app.models.marking_job import MarkingJob
+from app.models.template import Template
+from app.storage.shared_storage import SharedStorage
+
+logger = logging.getLogger(__name__)
+
+# How long files are kept, and how long a file still in use is kept before it is checked again
+FILE_RETENTION_PERIOD = timedelta(days=7)
+# Files that could not be removed are tried again after this long
+RETRY_DELAY = timedelta(hours=1)
+
+
+class RetentionStats:
+    """Counters of the sweeps of this replica, reported by /health."""
+
+    def __init__(self):
+        self.sweeps = 0
+        self.files_deleted = 0
+        self.files_kept = 0
+        self.files_failed = 0
+        self.upload_sessions_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_sweep_at: Optional[str] = None
+        self.last_sweep_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _referenced_file_ids():
+    """Ids of the files and folders templates and marking jobs point to."""
+    columns = [
+        Template.configuration_file_id,
+        Template.template_file_id,
+        MarkingJob.marking_scheme_id,
+        MarkingJob.marking_config_id,
+        MarkingJob.answer_sheets_folder_id,
+        MarkingJob.result_sheet_file_id,
+        MarkingJob.intermediate_results_file_id,
+        MarkingJob.index_list_file_id,
+    ]
+    return union(*[select(column).where(column.isnot(None)) for column in columns])
+
+
+def expired_files_query(now: datetime, limit: int):
+    """The next batch of expired files, locked, skipping rows other sweeps hold, oldest first."""
+    return (
+        select(
+            FileOrFolder.id,
+            FileOrFolder.path,
+            FileOrFolder.created_by,
+            FileOrFolder.id.in_(_referenced_file_ids()).label("referenced"),
+        )
+        .where(FileOrFolder.deletion_date <= now)
+        .order_by(FileOrFolder.deletion_date)
+        .limit(limit)
+        .with_for_update(of=FileOrFolder, skip_locked=True)
+    )
+
+
+class RetentionSweeper:
+    def __init__(self, interval: float, batch_size: int, concurrency: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.storage = SharedStorage()
+        self.stats = RetentionStats()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval <= 0:
+            logger.info("File retention sweeper disabled")
+            return
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="retention")
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"File retention sweeper started, sweeping every {self.interval}s")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.last_error = str(e)
+                logger.error(f"File retention sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self):
+        """Sweep all expired files in batches, then idle upload sessions."""
+        started = time.monotonic()
+        deleted = kept = failed = reclaimed = 0
+        while True:
+            batch_deleted, batch_kept, batch_failed, batch_reclaimed = await self._sweep_batch()
+            deleted += batch_deleted
+            kept += batch_kept
+            failed += batch_failed
+            reclaimed += batch_reclaimed
+            if batch_deleted + batch_kept + batch_failed < self.batch_size:
+                break
+        sessions, session_bytes = await self._sweep_upload_sessions()
+
+        elapsed = time.monotonic() - started
+        self.stats.sweeps += 1
+        self.stats.files_deleted += deleted
+        self.stats.files_kept += kept
+        self.stats.files_failed += failed
+        self.stats.upload_sessions_deleted += sessions
+        self.stats.bytes_reclaimed += reclaimed + session_bytes
+        self.stats.last_sweep_at = datetime.now().isoformat()
+        self.stats.last_sweep_seconds = round(elapsed, 3)
+        self.stats.last_error = None
+        if deleted or failed or sessions:
+            logger.info(
+                f"Retention sweep removed {deleted} files and {sessions} upload sessions "
+                f"({reclaimed + session_bytes} bytes), kept {kept} in use, {failed} failed, in {elapsed:.1f}s"
+            )
+
+    async def _sweep_batch(self) -> tuple:
+        now = datetime.now()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(expired_files_query(now, self.batch_size))).all()
+            if not rows:
+                return 0, 0, 0, 0
+
+            kept_ids = [row.id for row in rows if row.referenced]
+            expired = [row for row in rows if not row.referenced]
+
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(
+                *[loop.run_in_executor(self.executor, self._remove, row.path, row.created_by, row.id) for row in expired],
+                return_exceptions=True
+            )
+
+            deleted_ids, failed_ids, reclaimed = [], [], 0
+            for row, result in zip(expired, results):
+                if isinstance(result, BaseException):
+                    logger.warning(f"Failed to remove expired file {row.id} at {row.path}: {result}")
+                    failed_ids.append(row.id)
+                else:
+                    deleted_ids.append(row.id)
+                    reclaimed += result
+
+            await self._update(db, deleted_ids, status=FileOrFolderStatus.DELETED, deletion_date=None)
+            await self._update(db, kept_ids, deletion_date=now + FILE_RETENTION_PERIOD)
+            await self._update(db, failed_ids, deletion_date=now + RETRY_DELAY)
+            await db.commit()
+        return len(deleted_ids), len(kept_ids), len(failed_ids), reclaimed
+
+    @staticmethod
+    async def _update(db, ids: list, **values):
+        if ids:
+            await db.execute(
+                FileOrFolder.__table__.update().where(FileOrFolder.id.in_(ids)).values(**values)
+            )
+
+    def _remove(self, path: str, user_id: int, file_id: int) -> int:
+        size = self.storage.remove_path(path)
+        self.storage.remove_ingest_progress(user_id, file_id)
+        return size
+
+    async def _sweep_upload_sessions(self) -> tuple:
+        ttl = get_upload_session_ttl()
+        loop = asyncio.get_running_loop()
+        sessions = await loop.run_in_executor(self.executor, self.storage.list_upload_sessions)
+        removed = reclaimed = 0
+        for session in sessions:
+            if not await self.storage.upload_session_expired(session, ttl):
+                continue
+            try:
+                reclaimed += await loop.run_in_executor(self.executor, self.storage.remove_path, session)
+                removed += 1
+            except Exception as e:
+                logger.warning(f"Failed to remove expired upload session {session}: {str(e)}")
+        return removed, reclaimed
+
+
+retention_sweeper = RetentionSweeper(
+    interval=get_file_retention_sweep_interval(),
+    batch_size=get_file_retention_batch_size(),
+    concurrency=get_file_retention_concurrency(),
+)
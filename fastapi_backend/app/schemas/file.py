@@ -2,7 +2,7 @@ from enum import Enum
 from token import OP
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 from fastapi import Query
 
 class DownloadType(str, Enum):
@@ -29,4 +29,30 @@ class FileResponse(BaseModel):
     deletion_date: Optional[datetime] = None
     created_by: int
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+    sha256: Optional[str] = None  # Of the uploaded file, for ZIPs of the archive itself; chunked uploads hash each chunk instead
+    ingest_id: Optional[int] = None  # Set for ZIPs, poll /files/{ingest_id}/ingest until extracted
+
+class FilesPage(BaseModel):
+    items: list[FileResponse]
+    limit: int
+    next_cursor: Optional[str] = None
+
+class IngestStatus(BaseModel):
+    file_id: int
+    status: str  # uploading while extracting, then uploaded or failed
+    extracted_files: int = 0
+    total_files: Optional[int] = None
+    skipped_files: int = 0  # Members left out, e.g. non-images in answer sheet archives
+    error: Optional[str] = None
+
+class UploadSessionStatus(BaseModel):
+    upload_id: str
+    original_name: str
+    total_chunks: int
+    chunk_size: int
+    total_size: Optional[int] = None
+    chunks_received: int
+    received_bitmap: str  # Base64, bit i (most significant bit first) is set once chunk i arrived
+    chunk_checksums: Dict[int, str]  # sha256 hex digest of each received chunk
+    expires_at: datetime  # The session is removed if no chunk arrives before then
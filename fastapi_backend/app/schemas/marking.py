@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from typing import Any, Optional
 from pydantic import BaseModel, Field
 
@@ -42,6 +43,11 @@ class MarkingResponseBasic(BaseModel):
     updated_at: datetime
     created_by: int
 
+class MarkingJobsPage(BaseModel):
+    items: list[MarkingResponseBasic]
+    limit: int
+    next_cursor: Optional[str] = None
+
 class ResultsData(MarkingResponseBasic):
     marking_config_id: int
     result_sheet_file_id: int
@@ -89,7 +95,7 @@ class StudentResult(BaseModel):
     more_than_one_marked: list[int]
     not_marked: list[int]
     columnwise_total: Optional[list[int]] = None
-    score: int
+    score: float
     flag: bool
     flag_reason: str
     answer_sheet_path: str
@@ -99,6 +105,36 @@ class StudentResult(BaseModel):
 class UpdateResultRequest(BaseModel):
     result: StudentResult
 
+class ResultSortField(str, Enum):
+    ROW_NUMBER = "row_number"
+    SCORE = "score"
+    INDEX_NUMBER = "index_number"
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+class StudentResultRow(BaseModel):
+    """A student result with only the requested fields set"""
+    row_number: int
+    index_number: Optional[str] = None
+    correct: Optional[list[int]] = None
+    incorrect: Optional[list[int]] = None
+    more_than_one_marked: Optional[list[int]] = None
+    not_marked: Optional[list[int]] = None
+    score: Optional[float] = None
+    flag: Optional[bool] = None
+    flag_reason: Optional[str] = None
+    answer_sheet_path: Optional[str] = None
+    labeled_points: Optional[list[list[Bubble]]] = None
+    is_resolved: Optional[bool] = None
+
+class StudentResultsPage(BaseModel):
+    items: list[StudentResultRow]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
 
 class ProgressRequest(BaseModel):
     marking_job_ids: list[int]
@@ -32,6 +32,11 @@ class TemplateResponse(BaseModel):
     updated_at: datetime
     created_by: int
 
+class TemplatesPage(BaseModel):
+    items: List[TemplateResponse]
+    limit: int
+    next_cursor: Optional[str] = None
+
 class TemplateUpdate(BaseModel):
     name: str
     description: Optional[str] = None
\ No newline at end of file
@@ -1,13 +1,135 @@
 import json
 import os
+import time
+import uuid
+import asyncio
+import hashlib
 import zipfile
+import threading
 import aiofiles
+import aiofiles.os
 import shutil
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Tuple
 
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from app.config import get_nfs_shared_path
 
+# Bytes read and written at a time when streaming uploads to storage
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+# Files of a chunked upload session: the preallocated target, one byte per received chunk
+# and the sha256 digest of each chunk at chunk_index * CHUNK_DIGEST_SIZE
+UPLOAD_DATA_NAME = "data"
+UPLOAD_RECEIVED_NAME = "received"
+UPLOAD_CHECKSUMS_NAME = "checksums"
+CHUNK_DIGEST_SIZE = hashlib.sha256().digest_size
+
+# Bytes per chunk assumed for clients that do not send a chunk size
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """An upload exceeded its size limit while being written."""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_size} bytes")
+        self.max_size = max_size
+
+
+class ChunkMismatchError(Exception):
+    """A chunk does not fit the layout of its upload session."""
+
+
+# Members extracted in parallel per archive; zlib releases the GIL so threads decompress concurrently
+EXTRACT_WORKERS = 4
+
+# Extensions kept when extracting answer sheet archives
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+class UnsafeArchiveError(Exception):
+    """An archive member would be written outside its extraction folder."""
+
+
+def _archive_members(archive: zipfile.ZipFile, folder: Path, allowed_extensions: Optional[Iterable[str]]):
+    """
+    Validate the members of an archive and pick the ones to extract.
+
+    Returns:
+        ([(member, target path)], number of skipped members)
+    """
+    root = folder.resolve()
+    members, skipped = [], 0
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = PurePosixPath(info.filename.replace("\\", "/"))
+        if name.is_absolute() or ".." in name.parts or ":" in name.parts[0]:
+            raise UnsafeArchiveError(f"Unsafe path in archive: {info.filename}")
+        target = (root / Path(*name.parts)).resolve()
+        if not target.is_relative_to(root):
+            raise UnsafeArchiveError(f"Unsafe path in archive: {info.filename}")
+        # Resource forks and hidden files of macOS and other tools
+        if name.parts[0] == "__MACOSX" or any(part.startswith(".") for part in name.parts):
+            skipped += 1
+            continue
+        if allowed_extensions is not None and target.suffix.lower() not in allowed_extensions:
+            skipped += 1
+            continue
+        members.append((info, target))
+    return members, skipped
+
+
+def extract_archive(zip_path: Path, folder: Path, allowed_extensions: Optional[Iterable[str]] = None,
+                    workers: int = EXTRACT_WORKERS, progress: Optional[Callable[[int, int, int], None]] = None) -> Tuple[int, int]:
+    """
+    Extract an archive into folder, decompressing members on several threads.
+
+    Every member is validated before anything is written. Members are streamed
+    to disk in blocks, each thread reads through its own handle of the archive.
+
+    Args:
+        allowed_extensions: Only members with these extensions are extracted, None for all
+        progress: Called with (extracted, total, skipped) after each member
+
+    Returns:
+        (extracted, skipped) member counts
+
+    Raises:
+        UnsafeArchiveError: If a member would escape folder (zip slip)
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        members, skipped = _archive_members(archive, folder, allowed_extensions)
+    total = len(members)
+    extracted = 0
+    lock = threading.Lock()
+
+    def extract(batch):
+        nonlocal extracted
+        with zipfile.ZipFile(zip_path) as archive:
+            for info, target in batch:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with archive.open(info) as source, open(target, "wb") as destination:
+                    shutil.copyfileobj(source, destination, UPLOAD_BLOCK_SIZE)
+                with lock:
+                    extracted += 1
+                    done = extracted
+                if progress:
+                    progress(done, total, skipped)
+
+    if progress:
+        progress(0, total, skipped)
+    # Round-robin so large and small members spread over the threads
+    batches = [batch for batch in (members[i::workers] for i in range(workers)) if batch]
+    if batches:
+        with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="unzip") as pool:
+            for _ in pool.map(extract, batches):
+                pass
+    return total, skipped
+
+
 class SharedStorage:
     _instance: Optional['SharedStorage'] = None
     _initialized: bool = False
@@ -46,40 +168,229 @@ class SharedStorage:
         async with aiofiles.open(self.base_path / file_path, 'rb') as f:
             return await f.read()
 
-    async def save_chunk(self, chunk_content: bytes, file_path: str, chunk_index: int):
-        chunk_file_path = self.base_path / file_path
-        chunk_file_path.parent.mkdir(parents=True, exist_ok=True)
-        async with aiofiles.open(chunk_file_path, 'wb') as f:
-            await f.write(chunk_content)
+    async def _write_stream(self, blocks, file_path: str, max_size: Optional[int] = None) -> Tuple[int, str]:
+        """
+        Write async byte blocks to a temporary file next to file_path, then rename it into place.
 
-    async def get_chunk(self, file_path: str, chunk_index: int):
-        async with aiofiles.open(self.base_path / file_path / f"chunk_{chunk_index:04d}", 'rb') as f:
-            return await f.read()
+        Returns:
+            (size in bytes, sha256 hex digest) of the written file
 
-    async def combine_chunks(self, temp_dir: str, total_chunks: int, final_path: str):
-        final_path_obj = self.base_path / final_path
-        final_path_obj.parent.mkdir(parents=True, exist_ok=True)
-        
-        async with aiofiles.open(final_path_obj, 'wb') as final_file:
-            for chunk_index in range(total_chunks):
-                chunk_path = self.base_path / temp_dir / f"chunk_{chunk_index:04d}"
-                if not chunk_path.exists():
-                    raise FileNotFoundError(f"Chunk {chunk_index} not found at {chunk_path}")
-                
-                async with aiofiles.open(chunk_path, 'rb') as chunk_file:
-                    while chunk := await chunk_file.read(8192):
-                        await final_file.write(chunk)
-
-    async def update_chunks_received_metadata(self, file_path: str, metadata: dict, chunk_index: int):
-        metadata_path = self.base_path / file_path / "metadata.json"
-        if metadata_path.exists():
-            async with aiofiles.open(metadata_path, 'r') as f:
-                metadata = json.loads(await f.read())
-        
-        metadata["chunks_received"].append(chunk_index)
-        
-        async with aiofiles.open(metadata_path, 'w') as f:
-            await f.write(json.dumps(metadata, indent=2))
+        Raises:
+            UploadTooLargeError: As soon as more than max_size bytes were received
+        """
+        full_path = self.base_path / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = full_path.with_name(f".{full_path.name}.{uuid.uuid4().hex[:8]}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, 'wb') as f:
+                async for block in blocks:
+                    size += len(block)
+                    if max_size is not None and size > max_size:
+                        raise UploadTooLargeError(max_size)
+                    digest.update(block)
+                    await f.write(block)
+                await f.flush()
+                await aiofiles.os.wrap(os.fsync)(f.fileno())
+            # Readers only ever see the complete file
+            await aiofiles.os.replace(temp_path, full_path)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return size, digest.hexdigest()
+
+    async def save_upload(self, upload, file_path: str, max_size: Optional[int] = None) -> Tuple[int, str]:
+        """
+        Stream an uploaded file to storage in fixed-size blocks, the upload is never held in memory.
+
+        Args:
+            upload: UploadFile (or any object with an async read(size))
+            file_path: Relative destination path
+            max_size: Reject the upload once it grows beyond this many bytes
+
+        Returns:
+            (size in bytes, sha256 hex digest) of the saved file
+        """
+        async def blocks():
+            while block := await upload.read(UPLOAD_BLOCK_SIZE):
+                yield block
+        return await self._write_stream(blocks(), file_path, max_size)
+
+    def _create_upload_session(self, temp_dir: str, metadata: dict) -> dict:
+        session_dir = self.base_path / temp_dir
+        session_dir.mkdir(parents=True, exist_ok=True)
+        # Creating and growing these is idempotent, so concurrent first chunks may all do it
+        fd = os.open(session_dir / UPLOAD_DATA_NAME, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if metadata.get("total_size") and os.fstat(fd).st_size < metadata["total_size"]:
+                os.ftruncate(fd, metadata["total_size"])
+        finally:
+            os.close(fd)
+        for name, size in ((UPLOAD_CHECKSUMS_NAME, metadata["total_chunks"] * CHUNK_DIGEST_SIZE),
+                           (UPLOAD_RECEIVED_NAME, metadata["total_chunks"])):
+            fd = os.open(session_dir / name, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+
+        # Linking a complete temporary file publishes the metadata at most once
+        metadata_path = session_dir / "metadata.json"
+        temp_path = session_dir / f".metadata.{uuid.uuid4().hex[:8]}.json"
+        temp_path.write_text(json.dumps(metadata, indent=2))
+        try:
+            os.link(temp_path, metadata_path)
+            return metadata
+        except FileExistsError:
+            stored = json.loads(metadata_path.read_text())
+        finally:
+            temp_path.unlink()
+        for key in ("total_chunks", "chunk_size", "total_size"):
+            if metadata.get(key) is not None and stored.get(key) != metadata[key]:
+                raise ChunkMismatchError(f"{key} does not match the upload session")
+        return stored
+
+    async def open_upload_session(self, temp_dir: str, metadata: dict) -> dict:
+        """
+        Create the files of a chunked upload, or join the session another chunk created.
+
+        Args:
+            temp_dir: Relative session directory
+            metadata: Session metadata with at least total_chunks and chunk_size
+
+        Returns:
+            The metadata of the session, as stored by the first chunk
+
+        Raises:
+            ChunkMismatchError: If the session exists with a different layout
+        """
+        return await asyncio.to_thread(self._create_upload_session, temp_dir, metadata)
+
+    async def save_chunk(self, upload, temp_dir: str, chunk_index: int, metadata: dict) -> Tuple[int, str]:
+        """
+        Stream a chunk into the upload's data file at its offset and mark it received.
+
+        Chunks touch disjoint byte ranges and one byte each of the received map, so they
+        may be written concurrently without locking.
+
+        Returns:
+            (size in bytes, sha256 hex digest) of the chunk
+
+        Raises:
+            ChunkMismatchError: If the chunk index or length does not fit the session
+        """
+        total_chunks, chunk_size = metadata["total_chunks"], metadata["chunk_size"]
+        if not 0 <= chunk_index < total_chunks:
+            raise ChunkMismatchError(f"Chunk index {chunk_index} is out of range")
+        is_last = chunk_index == total_chunks - 1
+        session_dir = self.base_path / temp_dir
+        offset = chunk_index * chunk_size
+        digest = hashlib.sha256()
+        size = 0
+
+        fd = await asyncio.to_thread(os.open, session_dir / UPLOAD_DATA_NAME, os.O_WRONLY)
+        try:
+            while block := await upload.read(UPLOAD_BLOCK_SIZE):
+                if size + len(block) > chunk_size:
+                    raise ChunkMismatchError(f"Chunk {chunk_index} is larger than {chunk_size} bytes")
+                digest.update(block)
+                await asyncio.to_thread(os.pwrite, fd, block, offset + size)
+                size += len(block)
+            if not is_last and size != chunk_size:
+                raise ChunkMismatchError(f"Chunk {chunk_index} must be {chunk_size} bytes, got {size}")
+            if is_last:
+                if metadata.get("total_size") is not None and offset + size != metadata["total_size"]:
+                    raise ChunkMismatchError(f"Chunk {chunk_index} does not end at {metadata['total_size']} bytes")
+                # The last chunk fixes the length of the file
+                await asyncio.to_thread(os.ftruncate, fd, offset + size)
+            # A chunk is only acknowledged once it is on disk
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            await asyncio.to_thread(os.close, fd)
+
+        def mark_received():
+            # The checksum is in place before the chunk counts as received
+            for name, content, offset in ((UPLOAD_CHECKSUMS_NAME, digest.digest(), chunk_index * CHUNK_DIGEST_SIZE),
+                                          (UPLOAD_RECEIVED_NAME, b"\x01", chunk_index)):
+                session_fd = os.open(session_dir / name, os.O_WRONLY)
+                try:
+                    os.pwrite(session_fd, content, offset)
+                finally:
+                    os.close(session_fd)
+        await asyncio.to_thread(mark_received)
+        return size, digest.hexdigest()
+
+    async def get_chunks_received(self, temp_dir: str) -> list[int]:
+        """Indexes of the chunks of an upload that were written completely."""
+        async with aiofiles.open(self.base_path / temp_dir / UPLOAD_RECEIVED_NAME, 'rb') as f:
+            received = await f.read()
+        return [chunk_index for chunk_index, flag in enumerate(received) if flag]
+
+    @staticmethod
+    def _upload_last_activity(session_dir: Path) -> float:
+        # Marking a chunk received updates the mtime of the received map
+        return max((session_dir / UPLOAD_RECEIVED_NAME).stat().st_mtime, (session_dir / "metadata.json").stat().st_mtime)
+
+    async def upload_session_expired(self, temp_dir: str, ttl: int) -> bool:
+        """True if a chunked upload session exists and received nothing for ttl seconds."""
+        try:
+            last_activity = await asyncio.to_thread(self._upload_last_activity, self.base_path / temp_dir)
+        except FileNotFoundError:
+            return False
+        return time.time() - last_activity > ttl
+
+    async def get_upload_state(self, temp_dir: str) -> Optional[dict]:
+        """
+        Inventory of a chunked upload for clients resuming it.
+
+        Returns:
+            None if there is no such session, else a dict with the session metadata,
+            received (bytes, non-zero for each received chunk), checksums (sha256 hex
+            digest per received chunk index) and last_activity (POSIX time of the last chunk)
+        """
+        session_dir = self.base_path / temp_dir
+
+        def read_state():
+            try:
+                last_activity = self._upload_last_activity(session_dir)
+                metadata = json.loads((session_dir / "metadata.json").read_text())
+                received = (session_dir / UPLOAD_RECEIVED_NAME).read_bytes()
+                digests = (session_dir / UPLOAD_CHECKSUMS_NAME).read_bytes()
+            except FileNotFoundError:
+                return None
+            checksums = {
+                chunk_index: digests[chunk_index * CHUNK_DIGEST_SIZE:(chunk_index + 1) * CHUNK_DIGEST_SIZE].hex()
+                for chunk_index, flag in enumerate(received) if flag
+            }
+            return {"metadata": metadata, "received": received, "checksums": checksums, "last_activity": last_activity}
+        return await asyncio.to_thread(read_state)
+
+    async def complete_upload(self, temp_dir: str, final_path: str) -> int:
+        """
+        Move the data file of a chunked upload with all chunks received to final_path.
+
+        Returns:
+            Size of the file in bytes
+        """
+        data_path = self.base_path / temp_dir / UPLOAD_DATA_NAME
+        full_path = self.base_path / final_path
+
+        def complete():
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(data_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            os.replace(data_path, full_path)
+            return size
+        return await asyncio.to_thread(complete)
 
     async def get_metadata(self, file_path: str):
         metadata_path = self.base_path / file_path / "metadata.json"
@@ -88,44 +399,109 @@ class SharedStorage:
                 return json.loads(await f.read())
         return None
     
+    def remove_path(self, file_path: str) -> int:
+        """
+        Remove a file or folder of the share, blocking; a missing path is not an error.
+
+        Returns:
+            Bytes reclaimed
+
+        Raises:
+            ValueError: If the path does not point inside the share
+        """
+        base = self.base_path.resolve()
+        path = (self.base_path / file_path).resolve()
+        if path == base or base not in path.parents:
+            raise ValueError(f"Refusing to remove {file_path!r} outside the shared storage")
+        try:
+            if path.is_dir() and not path.is_symlink():
+                size = sum(
+                    (Path(root) / name).stat().st_size
+                    for root, _, names in os.walk(path) for name in names
+                )
+                shutil.rmtree(path)
+                return size
+            size = path.lstat().st_size
+            path.unlink()
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def list_upload_sessions(self) -> list[str]:
+        """Relative paths of the chunked upload sessions of all users."""
+        return [
+            str(session.relative_to(self.base_path))
+            for session in self.base_path.glob("users/*/temp/uploads/*")
+            if session.is_dir()
+        ]
+
+    def remove_ingest_progress(self, user_id: int, ingest_id: int):
+        (self.base_path / "users" / str(user_id) / "temp" / "ingest" / f"{ingest_id}.json").unlink(missing_ok=True)
+
     async def delete_directory(self, file_path: str):
         shutil.rmtree(self.base_path / file_path)
     
     async def delete_file(self, file_path: str):
         os.remove(self.base_path / file_path)
 
-    async def unzip_file(self, file_path: str):
-        try:   
-            with zipfile.ZipFile(self.base_path / file_path, 'r') as zip_ref:
-                # Create a unique folder name to avoid conflicts
-                base_folder_name = file_path.replace('.zip', '').replace('.ZIP', '')
-                folder_path = self.base_path / base_folder_name
-                
-                # If the folder already exists, remove it first to avoid conflicts
-                if folder_path.exists():
-                    shutil.rmtree(folder_path)
-                
-                # Create the directory
-                folder_path.mkdir(parents=True, exist_ok=True)
-                
-                # Extract all files
-                zip_ref.extractall(folder_path)
-                
-                # Delete the original zip file
-                await self.delete_file(file_path)
-                
-                # Always return the extraction folder path since we want to point to the folder containing the extracted content
-                # This ensures we're always returning a directory path, not a file path
-                # Skip __MACOSX folder that Mac zip files often contain
-                for item in folder_path.iterdir():
-                    if item.is_dir() and item.name != "__MACOSX":
-                        final_path = item
-                        break
-                else:
-                    # If no non-__MACOSX directory found, use the extraction folder itself
-                    final_path = folder_path
-                    
+    async def unzip_file(self, file_path: str, allowed_extensions: Optional[Iterable[str]] = None,
+                         progress: Optional[Callable[[int, int, int], None]] = None) -> str:
+        """
+        Extract a ZIP next to itself and delete it, off the event loop.
+
+        Args:
+            file_path: Relative path of the archive
+            allowed_extensions: Only members with these extensions are extracted, None for all
+            progress: Called from extraction threads with (extracted, total, skipped)
+
+        Returns:
+            Path of the extracted folder
+        """
+        def unzip():
+            # Create a unique folder name to avoid conflicts
+            base_folder_name = file_path.replace('.zip', '').replace('.ZIP', '')
+            folder_path = self.base_path / base_folder_name
+
+            # If the folder already exists, remove it first to avoid conflicts
+            if folder_path.exists():
+                shutil.rmtree(folder_path)
+            folder_path.mkdir(parents=True, exist_ok=True)
+
+            try:
+                extract_archive(self.base_path / file_path, folder_path, allowed_extensions, progress=progress)
+            except BaseException:
+                shutil.rmtree(folder_path, ignore_errors=True)
+                raise
+
+            # Delete the original zip file
+            os.remove(self.base_path / file_path)
+
+            # Always return the extraction folder path since we want to point to the folder containing the extracted content
+            # This ensures we're always returning a directory path, not a file path
+            for item in folder_path.iterdir():
+                if item.is_dir():
+                    return str(item)
+            # If no directory found, use the extraction folder itself
+            return str(folder_path)
+
+        try:
+            return await asyncio.to_thread(unzip)
+        except UnsafeArchiveError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to unzip file: {str(e)}")
 
-        return str(final_path)
\ No newline at end of file
+    def write_ingest_progress(self, user_id: int, ingest_id: int, progress: dict):
+        """Record the progress of an archive ingest where every replica can read it."""
+        progress_path = self.get_user_directory(user_id) / "temp" / "ingest" / f"{ingest_id}.json"
+        progress_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = progress_path.with_name(progress_path.name + ".tmp")
+        temp_path.write_text(json.dumps(progress))
+        os.replace(temp_path, progress_path)
+
+    async def get_ingest_progress(self, user_id: int, ingest_id: int) -> Optional[dict]:
+        progress_path = self.get_user_directory(user_id) / "temp" / "ingest" / f"{ingest_id}.json"
+        if not progress_path.exists():
+            return None
+        async with aiofiles.open(progress_path, 'r') as f:
+            return json.loads(await f.read())
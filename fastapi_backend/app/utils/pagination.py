@@ -0,0 +1,66 @@
+"""
+Keyset pagination of list endpoints, newest first.
+
+Pages are ordered by (created_at, id) descending and a page starts after the
+last row of the previous one, so each page is a range scan of the owner's
+(created_by, created_at, id) index however long the history is.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import Select, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing after the row with this creation time and id."""
+    return base64.urlsafe_b64encode(json.dumps([created_at.isoformat(), row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Returns:
+        (created_at, id) of the last row of the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(created_at)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+
+def paginate(query: Select, created_at_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """
+    Restrict a query to the page after cursor, newest first.
+
+    One row more than limit is selected so next_cursor can tell whether another page follows.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: Sequence, limit: int) -> tuple:
+    """
+    Returns:
+        (rows of this page, cursor of the next page or None); rows need created_at and id
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
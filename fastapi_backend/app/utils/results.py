@@ -0,0 +1,214 @@
+"""
+Import and export of marking results.
+
+The worker writes each job's results to an XLSX sheet. The backend imports that
+sheet into the marking_results table once and afterwards reads, updates and
+exports results from the table only.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+from io import BytesIO
+from typing import IO, Iterable
+
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.marking_job import MarkingJob
+from app.models.marking_result import MarkingResult
+from app.storage.shared_storage import SharedStorage
+
+logger = logging.getLogger(__name__)
+
+# Result sheet columns in the order the worker writes them
+RESULT_SHEET_COLUMNS = [
+    ("Index No", "index_number"),
+    ("Correct", "correct"),
+    ("Incorrect", "incorrect"),
+    ("More than one marked", "more_than_one_marked"),
+    ("Not marked", "not_marked"),
+    ("Score", "score"),
+    ("Flag", "flag"),
+    ("Flag Reason", "flag_reason"),
+    ("Answer Sheet Path", "answer_sheet_path"),
+    ("Labeled Points", "labeled_points"),
+    ("Resolved", "is_resolved"),
+    ("Audit File Name", "audit_file_name"),
+]
+
+QUESTION_LIST_FIELDS = ("correct", "incorrect", "more_than_one_marked", "not_marked")
+
+# Rows fetched from the database per batch while writing a result sheet
+RESULT_SHEET_BATCH_SIZE = 500
+
+# Fields of a result row the rows endpoint can return; labeled_points is large and only sent on request
+RESULT_ROW_FIELDS = ("row_number", "index_number", *QUESTION_LIST_FIELDS, "score", "flag", "flag_reason",
+                     "answer_sheet_path", "labeled_points", "is_resolved")
+DEFAULT_RESULT_ROW_FIELDS = tuple(field for field in RESULT_ROW_FIELDS if field != "labeled_points")
+
+
+def _parse_question_list(value) -> list[int]:
+    if value is None:
+        return []
+    if isinstance(value, (int, float)):
+        return [int(value)]
+    return [int(part) for part in str(value).split(",") if part.strip() not in ("", "-") and part.strip().lstrip("-").isdigit()]
+
+
+def _parse_labeled_points(value) -> list:
+    if not value:
+        return []
+    try:
+        return json.loads(str(value))
+    except ValueError:
+        return []
+
+
+def encode_results_cursor(sort_value, row_number: int) -> str:
+    """Opaque cursor pointing after the row with this sort value and row number."""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_number]).encode()).decode()
+
+
+def decode_results_cursor(cursor: str) -> tuple:
+    """
+    Returns:
+        (sort_value, row_number) of the last row of the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_value, row_number = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(row_number, int):
+        raise ValueError("Invalid cursor")
+    return sort_value, row_number
+
+
+def parse_result_sheet(content: bytes) -> list[dict]:
+    """
+    Parse a result sheet written by the worker into marking_results rows.
+
+    Columns are looked up by header so sheets with the legacy "Audit File Name"
+    column before "Resolved" are read correctly. Row numbers are the 1-based data
+    row of the sheet, the same numbering the results page has always used.
+    """
+    workbook = load_workbook(BytesIO(content), read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        positions = {str(name).strip(): i for i, name in enumerate(header) if name is not None}
+        fields = {field: positions[name] for name, field in RESULT_SHEET_COLUMNS if name in positions}
+
+        results = []
+        for row_number, row in enumerate(rows, start=1):
+            if not row or all(cell in (None, "") for cell in row):
+                continue
+            def value(field):
+                position = fields.get(field)
+                return row[position] if position is not None and position < len(row) else None
+
+            result = {
+                "row_number": row_number,
+                "index_number": "" if value("index_number") is None else str(value("index_number")),
+                "score": float(value("score") or 0),
+                "flag": bool(value("flag")),
+                "flag_reason": str(value("flag_reason") or ""),
+                "answer_sheet_path": str(value("answer_sheet_path") or ""),
+                "labeled_points": _parse_labeled_points(value("labeled_points")),
+                # Only an actual boolean counts as resolved, anything else is a legacy cell
+                "is_resolved": value("is_resolved") is True,
+                "audit_file_name": value("audit_file_name"),
+            }
+            for field in QUESTION_LIST_FIELDS:
+                result[field] = _parse_question_list(value(field))
+            results.append(result)
+        return results
+    finally:
+        workbook.close()
+
+
+def _append_result_rows(worksheet, fields: list[str], rows) -> None:
+    for result in rows:
+        row = []
+        for field, value in zip(fields, result):
+            if field in QUESTION_LIST_FIELDS:
+                value = ",".join(map(str, value or []))
+            elif field == "labeled_points":
+                value = json.dumps(value or [])
+            elif field == "score" and value is not None and float(value).is_integer():
+                value = int(value)
+            row.append(value)
+        worksheet.append(row)
+
+
+async def write_result_sheet(db: AsyncSession, marking: MarkingJob, file: IO[bytes], exclude: Iterable[str] = ()) -> None:
+    """
+    Write the stored results of a job to file as a result sheet.
+
+    Rows are read from a server-side cursor in batches and appended to a
+    write-only workbook, so neither the rows nor the sheet are held in memory.
+
+    Args:
+        db: Session, the job's results are imported first if needed
+        marking: Job with its result_sheet_file loaded
+        file: Binary file the XLSX is written to
+        exclude: Header names of columns to leave out
+    """
+    await ensure_marking_results(db, marking)
+    exclude = set(exclude)
+    if not marking.save_intermediate_results:
+        exclude.add("Audit File Name")
+    columns = [(name, field) for name, field in RESULT_SHEET_COLUMNS if name not in exclude]
+    fields = [field for _, field in columns]
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=marking.name[:31] if marking.name else None)
+    worksheet.append([name for name, _ in columns])
+    rows = await db.stream(
+        select(*[getattr(MarkingResult, field) for field in fields])
+        .where(MarkingResult.marking_job_id == marking.id)
+        .order_by(MarkingResult.row_number)
+        .execution_options(yield_per=RESULT_SHEET_BATCH_SIZE)
+    )
+    async for batch in rows.partitions():
+        await asyncio.to_thread(_append_result_rows, worksheet, fields, batch)
+    await asyncio.to_thread(workbook.save, file)
+
+
+async def import_marking_results(db: AsyncSession, marking_job_id: int, result_sheet_path: str) -> int:
+    """
+    Replace the stored results of a marking job with the rows of its result sheet.
+    The caller commits.
+
+    Returns:
+        Number of imported rows
+    """
+    content = await SharedStorage().get_file(result_sheet_path)
+    if not content:
+        raise FileNotFoundError(f"Result sheet {result_sheet_path} not found")
+
+    rows = await asyncio.to_thread(parse_result_sheet, content)
+    await db.execute(delete(MarkingResult).where(MarkingResult.marking_job_id == marking_job_id))
+    if rows:
+        await db.execute(insert(MarkingResult), [{**row, "marking_job_id": marking_job_id} for row in rows])
+    logger.info(f"Imported {len(rows)} results for marking job {marking_job_id}")
+    return len(rows)
+
+
+async def ensure_marking_results(db: AsyncSession, marking: MarkingJob) -> None:
+    """
+    Import the result sheet of a job that completed before results were stored
+    in the database. Does nothing once the job has stored results.
+    """
+    stored = await db.scalar(
+        select(func.count()).select_from(MarkingResult).where(MarkingResult.marking_job_id == marking.id)
+    )
+    if stored or not marking.result_sheet_file:
+        return
+    await import_marking_results(db, marking.id, marking.result_sheet_file.path)
+    await db.commit()
@@ -0,0 +1,89 @@
+"""
+Chunked streaming of files and ZIP archives for download responses.
+
+The generators here are synchronous; StreamingResponse iterates them in a
+thread pool, so disk reads never block the event loop and only one chunk
+is held in memory at a time.
+"""
+
+import os
+import zipfile
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Tuple, Union
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Generated files up to this size stay in memory before spilling to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Formats that are compressed already, deflating them again only costs CPU
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".pdf", ".xlsx", ".zip", ".gz"}
+
+
+def iter_file(file: IO[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield an open file from its start in chunks and close it."""
+    try:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable sink that hands out what was written since the last take()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[Tuple[str, Union[Path, IO[bytes]]]], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Build a ZIP archive while it is being sent.
+
+    Args:
+        entries: (name in archive, source) pairs, source is a path on disk or an open binary file
+        chunk_size: Bytes read from a source at a time
+
+    Yields:
+        Consecutive chunks of the archive
+    """
+    buffer = _ChunkBuffer()
+    # An unseekable sink makes zipfile write sizes in data descriptors after each entry
+    archive = zipfile.ZipFile(buffer, mode="w")
+    for arcname, source in entries:
+        path = Path(source) if isinstance(source, (str, Path)) else None
+        info = zipfile.ZipInfo.from_file(path, arcname) if path else zipfile.ZipInfo(arcname)
+        info.compress_type = zipfile.ZIP_STORED if Path(arcname).suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        file = open(path, "rb") if path else source
+        try:
+            size = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            with archive.open(info, mode="w", force_zip64=size >= zipfile.ZIP64_LIMIT) as entry:
+                while chunk := file.read(chunk_size):
+                    entry.write(chunk)
+                    if data := buffer.take():
+                        yield data
+        finally:
+            file.close()
+        if data := buffer.take():
+            yield data
+    archive.close()
+    yield buffer.take()
@@ -1,82 +1,193 @@
 from fastapi import WebSocket
 from enum import Enum
+from typing import Optional
 from starlette.websockets import WebSocketState
+import asyncio
+import json
 import logging
+import aio_pika
+from aio_pika import ExchangeType, Message
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+
+from app.config import get_websocket_send_queue_size, get_websocket_send_timeout
 
 logger = logging.getLogger(__name__)
 
+# Fanout exchange every backend replica binds to, so a message published by the
+# replica that consumed a job result reaches viewers connected to any replica
+WEBSOCKET_FANOUT_EXCHANGE = "mcq_ocr_websocket"
+
 class WebSocketConnectionType(Enum):
     TEMPLATE_CONFIG = "template_config"
     MARKING_SCHEME_CONFIG = "marking_scheme_config"
     MARKING_JOB = "marking_job"
 
+
+class ConnectionSender:
+    """
+    Sends queued messages to one websocket from its own task, so a broadcast
+    never waits on a slow client. A client that falls behind by more than the
+    queue size, or that does not take a message within the send timeout, is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, on_evict, queue_size: int, send_timeout: float):
+        self.websocket = websocket
+        self.on_evict = on_evict
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task = asyncio.create_task(self._run())
+
+    def put(self, message: dict) -> bool:
+        """Queue a message, False if the client is too far behind."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _run(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=self.send_timeout)
+            except Exception as e:
+                logger.warning(f"Evicting websocket after failed send: {e!r}")
+                self.on_evict(self.websocket)
+                return
+
+    def stop(self):
+        self.task.cancel()
+
+
 class WebSocketManager:
     def __init__(self):
         self.template_config_connections: dict[str, list[WebSocket]] = {}
         self.marking_scheme_config_connections: dict[str, list[WebSocket]] = {}
         self.marking_job_connections: dict[str, list[WebSocket]] = {}
+        # One sender per websocket, a websocket may follow several jobs
+        self.senders: dict[WebSocket, ConnectionSender] = {}
+        self.exchange = None
+        self.channel = None
+
+    def _connections_of(self, connection_type: WebSocketConnectionType) -> dict:
+        return {
+            WebSocketConnectionType.TEMPLATE_CONFIG: self.template_config_connections,
+            WebSocketConnectionType.MARKING_SCHEME_CONFIG: self.marking_scheme_config_connections,
+            WebSocketConnectionType.MARKING_JOB: self.marking_job_connections,
+        }[connection_type]
+
+    async def start_fanout(self, connection: AbstractRobustConnection):
+        """Bind this replica to the fanout exchange and deliver what arrives on it locally."""
+        self.channel = await connection.channel()
+        self.exchange = await self.channel.declare_exchange(WEBSOCKET_FANOUT_EXCHANGE, ExchangeType.FANOUT, durable=True)
+        # Exclusive queue per replica; messages are transient progress so nothing is kept
+        queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(self.exchange)
+        await queue.consume(self._on_fanout_message, no_ack=True)
+        logger.info(f"WebSocket fan-out bound to exchange {WEBSOCKET_FANOUT_EXCHANGE}")
+
+    async def stop_fanout(self):
+        if self.channel and not self.channel.is_closed:
+            await self.channel.close()
+        self.channel = None
+        self.exchange = None
+
+    async def _on_fanout_message(self, message: AbstractIncomingMessage):
+        try:
+            payload = json.loads(message.body.decode())
+            connection_type = WebSocketConnectionType(payload["type"])
+            self._deliver(self._connections_of(connection_type), payload["job_id"], payload["message"])
+        except Exception as e:
+            logger.error(f"Invalid websocket fan-out message: {e}")
+
+    def _sender_for(self, websocket: WebSocket) -> ConnectionSender:
+        if websocket not in self.senders:
+            self.senders[websocket] = ConnectionSender(websocket, self._evict,
+                                                       get_websocket_send_queue_size(),
+                                                       get_websocket_send_timeout())
+        return self.senders[websocket]
+
+    def _forget(self, websocket: WebSocket):
+        for connections in (self.template_config_connections, self.marking_scheme_config_connections, self.marking_job_connections):
+            for job_id in [job_id for job_id, sockets in connections.items() if websocket in sockets]:
+                connections[job_id].remove(websocket)
+                if not connections[job_id]:
+                    del connections[job_id]
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.stop()
+
+    def _evict(self, websocket: WebSocket):
+        """Drop a slow or broken client; its route sees the close and cleans up."""
+        self._forget(websocket)
+        if websocket.client_state != WebSocketState.DISCONNECTED:
+            asyncio.create_task(self._close(websocket, code=1013))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int = 1000):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass  # Already closed or closing
 
     async def _connect(self, connections: dict, job_id: str, websocket: WebSocket):
         await websocket.accept()
-        if job_id not in connections:
-            connections[job_id] = []
-        connections[job_id].append(websocket)
-        await self._send_message(connections, job_id, {"status": "connected"})
+        await self._register(connections, job_id, websocket)
+        # Sent directly so it arrives before anything the route sends next
+        await websocket.send_json({"status": "connected"})
 
     async def _register(self, connections: dict, job_id: str, websocket: WebSocket):
         """Register a websocket without accepting it (already accepted)"""
         if job_id not in connections:
             connections[job_id] = []
-        connections[job_id].append(websocket)
+        if websocket not in connections[job_id]:
+            connections[job_id].append(websocket)
+        self._sender_for(websocket)
 
     async def _disconnect(self, connections: dict, job_id: str, websocket: WebSocket):
         if job_id in connections.keys() and websocket in connections[job_id]:
             connections[job_id].remove(websocket)
+            if not connections[job_id]:
+                del connections[job_id]
+        self._forget(websocket)
         # Only close if not already closed
         if websocket.client_state != WebSocketState.DISCONNECTED:
-            try:
-                await websocket.close()
-            except Exception:
-                pass  # Already closed or closing
+            await self._close(websocket)
 
     async def _clean_connections(self, connections: dict, job_id: str):
-        if job_id in connections.keys():
-            if len(connections[job_id]) == 0:
-                for connection in connections[job_id]:
-                    await connection.close()
-                del connections[job_id]
-    
-    async def _send_message(self, connections: dict, job_id: str, message: dict):
-        logger.info(f"Attempting to send message to {job_id}, connections available: {list(connections.keys())}")
-        if job_id in connections:
-            logger.info(f"Found {len(connections[job_id])} connections for job {job_id}")
-            # Create a copy of the list to avoid modification during iteration
-            connections_to_send = connections[job_id].copy()
-            for connection in connections_to_send:
-                try:
-                    # Check if connection is still open
-                    if connection.client_state == WebSocketState.CONNECTED:
-                        logger.info(f"Sending message to connection for job {job_id}")
-                        await connection.send_json(message)
-                        logger.info(f"Successfully sent message to connection for job {job_id}")
-                    else:
-                        logger.warning(f"Connection for job {job_id} is not connected, state: {connection.client_state}")
-                        # Remove closed connections
-                        if connection in connections[job_id]:
-                            connections[job_id].remove(connection)
-                except Exception as e:
-                    # Remove failed connections
-                    if connection in connections[job_id]:
-                        connections[job_id].remove(connection)
-                    logger.warning(f"Failed to send WebSocket message to {job_id}: {e}")
-        else:
-            logger.warning(f"No connections found for job {job_id}")
+        for websocket in connections.pop(job_id, []):
+            await self._disconnect(connections, job_id, websocket)
+
+    def _deliver(self, connections: dict, job_id: str, message: dict):
+        """Queue the message for every local viewer of the job."""
+        for websocket in list(connections.get(job_id, [])):
+            if websocket.client_state != WebSocketState.CONNECTED:
+                self._forget(websocket)
+            elif not self._sender_for(websocket).put(message):
+                logger.warning(f"Evicting websocket for job {job_id}, it is too far behind")
+                self._evict(websocket)
+
+    async def _send_message(self, connections: dict, connection_type: WebSocketConnectionType, job_id: str, message: dict):
+        if self.exchange is None:
+            # No broker (single process or not started yet), deliver to local viewers only
+            self._deliver(connections, job_id, message)
+            return
+        payload = {"type": connection_type.value, "job_id": job_id, "message": message}
+        try:
+            await self.exchange.publish(
+                Message(json.dumps(payload, default=str).encode(), content_type="application/json",
+                        delivery_mode=aio_pika.DeliveryMode.NOT_PERSISTENT),
+                routing_key=""
+            )
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out publish failed, delivering locally: {e}")
+            self._deliver(connections, job_id, message)
 
     async def connect_template_config(self, job_id: str, websocket: WebSocket):
         await self._connect(self.template_config_connections, job_id, websocket)
 
     async def send_message_to_template_config(self, job_id: str, message: dict):
-        await self._send_message(self.template_config_connections, job_id, message)
+        await self._send_message(self.template_config_connections, WebSocketConnectionType.TEMPLATE_CONFIG, job_id, message)
 
     async def disconnect_template_config(self, job_id: str, websocket: WebSocket):
         await self._disconnect(self.template_config_connections, job_id, websocket)
@@ -89,7 +200,6 @@ class WebSocketManager:
 
     async def register_marking_scheme_config(self, job_id: str, websocket: WebSocket):
         """Register a marking scheme config websocket that's already been accepted"""
-        logger.info(f"Registering marking scheme config WebSocket for job {job_id}")
         await self._register(self.marking_scheme_config_connections, job_id, websocket)
         logger.info(f"Registered marking scheme config WebSocket for job {job_id}, total connections: {len(self.marking_scheme_config_connections.get(job_id, []))}")
 
@@ -100,7 +210,7 @@ class WebSocketManager:
         await self._clean_connections(self.marking_scheme_config_connections, job_id)
 
     async def send_message_to_marking_scheme_config(self, job_id: str, message: dict):
-        await self._send_message(self.marking_scheme_config_connections, job_id, message)
+        await self._send_message(self.marking_scheme_config_connections, WebSocketConnectionType.MARKING_SCHEME_CONFIG, job_id, message)
 
     async def connect_marking_job(self, job_id: str, websocket: WebSocket):
         await self._connect(self.marking_job_connections, job_id, websocket)
@@ -110,10 +220,10 @@ class WebSocketManager:
         await self._register(self.marking_job_connections, job_id, websocket)
 
     async def send_message_to_marking_job(self, job_id: str, message: dict):
-        await self._send_message(self.marking_job_connections, job_id, message)
+        await self._send_message(self.marking_job_connections, WebSocketConnectionType.MARKING_JOB, job_id, message)
 
     async def disconnect_marking_job(self, job_id: str, websocket: WebSocket):
         await self._disconnect(self.marking_job_connections, job_id, websocket)
 
     async def clean_marking_job_connections(self, job_id: str):
-        await self._clean_connections(self.marking_job_connections, job_id)
\ No newline at end of file
+        await self._clean_connections(self.marking_job_connections, job_id)
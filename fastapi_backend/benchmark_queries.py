@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Query plan benchmark for the list and dashboard endpoints of MCQ OCR System.
+
+Seeds a local PostgreSQL database with realistic volumes (by default 10k
+marking jobs and 100k files spread over a few users, most of them owned by one
+busy user) and records EXPLAIN ANALYZE of the queries the hot endpoints run,
+optionally also without the secondary indexes of the models to compare.
+
+Point DATABASE_URL at a scratch database: the seeded rows belong to a faculty
+named "benchmark" and replace those of an earlier run.
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import sync_engine, create_tables_sync, Base
+from app.models import User, Template, FileOrFolder, MarkingJob, MarkingResult, TemplateConfigJob
+from app.models.faculty import Faculty
+from app.models.user import UserRoles, VerifyStatus
+from app.models.template import TemplateConfigType, TemplateConfigStatus
+from app.models.marking_job import MarkingJobStatus, MarkingJobPriority
+from app.models.file import FileOrFolderType, FileOrFolderStatus
+from app.api.routes.dashboard import _config_type_stats_query, _faculty_user_count
+from app.retention import expired_files_query
+
+BENCHMARK_FACULTY = "benchmark"
+BATCH_SIZE = 5000
+
+JOB_STATUS_WEIGHTS = {
+    MarkingJobStatus.COMPLETED: 70,
+    MarkingJobStatus.FAILED: 8,
+    MarkingJobStatus.CANCELLED: 4,
+    MarkingJobStatus.PROCESSING: 2,
+    MarkingJobStatus.QUEUED: 2,
+    MarkingJobStatus.INITIALIZED: 14,
+}
+
+
+def _created_at(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=random.randint(0, days * 24 * 60 * 60))
+
+
+def _insert(conn, model, rows) -> list:
+    """Insert rows in batches and return their ids in order."""
+    table = model.__table__
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        result = conn.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True),
+            rows[start:start + BATCH_SIZE],
+        )
+        ids.extend(result.scalars().all())
+    return ids
+
+
+def reset(conn):
+    """Delete everything owned by the benchmark faculty."""
+    faculty_ids = select(Faculty.id).where(Faculty.name == BENCHMARK_FACULTY)
+    user_ids = select(User.id).where(User.faculty_id.in_(faculty_ids))
+    job_ids = select(MarkingJob.id).where(MarkingJob.created_by.in_(user_ids))
+    conn.execute(delete(MarkingResult).where(MarkingResult.marking_job_id.in_(job_ids)))
+    conn.execute(delete(MarkingJob).where(MarkingJob.created_by.in_(user_ids)))
+    conn.execute(delete(TemplateConfigJob).where(TemplateConfigJob.created_by.in_(user_ids)))
+    conn.execute(delete(Template).where(Template.created_by.in_(user_ids)))
+    conn.execute(delete(FileOrFolder).where(FileOrFolder.created_by.in_(user_ids)))
+    conn.execute(delete(User).where(User.faculty_id.in_(faculty_ids)))
+    conn.execute(delete(Faculty).where(Faculty.name == BENCHMARK_FACULTY))
+
+
+def seed(conn, args):
+    random.seed(args.seed)
+    faculty_id = _insert(conn, Faculty, [{"name": BENCHMARK_FACULTY}])[0]
+
+    user_ids = _insert(conn, User, [
+        {
+            "email": f"user{i}@{BENCHMARK_FACULTY}.local",
+            "hashed_password": "!",
+            "role": UserRoles.FACULTYADMIN if i == 0 else UserRoles.BASIC,
+            "faculty_id": faculty_id,
+            "verify_status": VerifyStatus.ADMINVERIFIED,
+            "created_at": _created_at(365),
+        }
+        for i in range(args.users)
+    ])
+    # The first user owns half of everything, the others share the rest
+    owner_weights = [len(user_ids) - 1 or 1] + [1] * (len(user_ids) - 1)
+
+    def owner():
+        return random.choices(user_ids, owner_weights)[0]
+
+    files = []
+    for i in range(args.files):
+        created_at = _created_at(365)
+        status = random.choices(
+            [FileOrFolderStatus.UPLOADED, FileOrFolderStatus.DELETED, FileOrFolderStatus.FAILED], [90, 8, 2]
+        )[0]
+        files.append({
+            "name": f"sheet_{i}.jpg",
+            "path": f"users/uploads/sheet_{i}.jpg",
+            "size": random.randint(200_000, 2_000_000),
+            "extension": ".jpg",
+            "file_type": random.choice(list(FileOrFolderType)),
+            "status": status,
+            # Swept files have no deletion date left
+            "deletion_date": None if status == FileOrFolderStatus.DELETED else created_at.replace(tzinfo=None) + timedelta(days=7),
+            "created_by": owner(),
+            "created_at": created_at,
+        })
+    file_ids = _insert(conn, FileOrFolder, files)
+    print(f"Seeded {len(file_ids)} files")
+
+    template_owners = [owner() for _ in range(args.templates)]
+    template_ids = _insert(conn, Template, [
+        {
+            "name": f"template {i}",
+            "config_type": random.choice(list(TemplateConfigType)),
+            "status": random.choices(
+                [TemplateConfigStatus.COMPLETED, TemplateConfigStatus.FAILED, TemplateConfigStatus.QUEUED], [85, 10, 5]
+            )[0],
+            "num_questions": 50,
+            "num_of_options_per_question": 5,
+            "created_by": created_by,
+            "created_at": _created_at(365),
+        }
+        for i, created_by in enumerate(template_owners)
+    ])
+    templates_by_owner = {}
+    for template_id, created_by in zip(template_ids, template_owners):
+        templates_by_owner.setdefault(created_by, []).append(template_id)
+    print(f"Seeded {len(template_ids)} templates")
+
+    jobs = []
+    for i in range(args.jobs):
+        created_by = random.choice(list(templates_by_owner))
+        status = random.choices(list(JOB_STATUS_WEIGHTS), list(JOB_STATUS_WEIGHTS.values()))[0]
+        created_at = _created_at(365)
+        total = random.randint(20, 600)
+        started = created_at + timedelta(minutes=random.randint(0, 30))
+        finished = status in (MarkingJobStatus.COMPLETED, MarkingJobStatus.FAILED, MarkingJobStatus.CANCELLED)
+        jobs.append({
+            "name": f"job {i}",
+            "status": status,
+            "priority": random.choices(list(MarkingJobPriority), [9, 1])[0],
+            "template_id": random.choice(templates_by_owner[created_by]),
+            "total_answer_sheets": total,
+            "processed_answer_sheets": total if status == MarkingJobStatus.COMPLETED else random.randint(0, total),
+            "failed_answer_sheets": 0,
+            "processing_started_at": started.isoformat() if finished else None,
+            "processing_completed_at": (started + timedelta(seconds=total * random.uniform(0.5, 2))).isoformat() if finished else None,
+            "created_by": created_by,
+            "created_at": created_at,
+        })
+    job_ids = _insert(conn, MarkingJob, jobs)
+    print(f"Seeded {len(job_ids)} marking jobs")
+
+    results = []
+    for job_id in job_ids[:args.result_jobs]:
+        for row_number in range(1, args.results_per_job + 1):
+            flag = random.random() < 0.05
+            results.append({
+                "marking_job_id": job_id,
+                "row_number": row_number,
+                "index_number": f"{random.randint(100000, 999999)}X",
+                "score": random.uniform(0, 100),
+                "flag": flag,
+                "flag_reason": "multiple answers" if flag else "",
+            })
+    _insert(conn, MarkingResult, results)
+    print(f"Seeded {len(results)} marking results")
+
+
+def busiest_user(conn):
+    return conn.execute(
+        select(MarkingJob.created_by, func.count().label("jobs"))
+        .join(User, User.id == MarkingJob.created_by)
+        .join(Faculty, Faculty.id == User.faculty_id)
+        .where(Faculty.name == BENCHMARK_FACULTY)
+        .group_by(MarkingJob.created_by)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).first()
+
+
+def endpoint_queries(conn, user_id):
+    """The queries of the hot endpoints, as the routes build them, for one user."""
+    job_id = conn.scalar(
+        select(MarkingJob.id).where(MarkingJob.created_by == user_id).order_by(MarkingJob.created_at.desc()).limit(1)
+    )
+    faculty_id = conn.scalar(select(User.faculty_id).where(User.id == user_id))
+    result_job_id = conn.scalar(select(func.min(MarkingResult.marking_job_id)))
+    return {
+        "list_markings": select(MarkingJob).where(MarkingJob.created_by == user_id).order_by(MarkingJob.created_at.desc()),
+        "list_templates": select(Template).where(Template.created_by == user_id).offset(0).limit(100).order_by(Template.created_at.desc()),
+        "list_files": select(FileOrFolder).where(FileOrFolder.created_by == user_id).order_by(FileOrFolder.created_at.desc()),
+        "list_users (faculty admin)": select(User).where(User.faculty_id == faculty_id).order_by(User.created_at.desc()),
+        "ownership check": select(MarkingJob).where(MarkingJob.id == job_id, MarkingJob.created_by == user_id),
+        "dashboard user": select(User, _faculty_user_count()).where(User.id == user_id),
+        "dashboard config types": _config_type_stats_query(user_id),
+        "dashboard recent jobs": (
+            select(MarkingJob, Template.name.label("template_name"))
+            .join(Template, MarkingJob.template_id == Template.id)
+            .where(MarkingJob.created_by == user_id)
+            .order_by(MarkingJob.created_at.desc())
+            .limit(5)
+        ),
+        "dashboard recent templates": select(Template).where(Template.created_by == user_id).order_by(Template.created_at.desc()).limit(5),
+        "retention batch": expired_files_query(datetime.now(), 200),
+        "flagged results": (
+            select(MarkingResult)
+            .where(MarkingResult.marking_job_id == result_job_id, MarkingResult.flag == True)  # noqa: E712
+            .order_by(MarkingResult.row_number)
+            .limit(50)
+        ),
+    }
+
+
+def explain(conn, name, statement, out):
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = [row[0] for row in conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))]
+    execution = next((line for line in plan if line.startswith("Execution Time")), "")
+    print(f"{name:<28} {execution}")
+    out.write(f"-- {name}\n{sql}\n\n" + "\n".join(plan) + "\n\n")
+
+
+def secondary_indexes():
+    return [
+        index for table in Base.metadata.sorted_tables for index in table.indexes
+        if not index.unique
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch database and record EXPLAIN ANALYZE of the endpoint queries")
+    parser.add_argument("--no-seed", action="store_true", help="Explain against the rows already in the database")
+    parser.add_argument("--compare", action="store_true", help="Also explain without the secondary indexes of the models")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--templates", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--result-jobs", type=int, default=20, help="Number of jobs that get marking results")
+    parser.add_argument("--results-per-job", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="query_plans.txt", help="File the full plans are written to")
+    args = parser.parse_args()
+
+    if sync_engine.dialect.name != "postgresql":
+        print("The benchmark needs a PostgreSQL DATABASE_URL")
+        sys.exit(1)
+
+    create_tables_sync()
+    with sync_engine.begin() as conn:
+        if not args.no_seed:
+            reset(conn)
+            seed(conn, args)
+    with sync_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+    with sync_engine.connect() as conn, open(args.output, "w") as out:
+        user = busiest_user(conn)
+        if user is None:
+            print("No benchmark data, run without --no-seed first")
+            sys.exit(1)
+        print(f"Explaining the endpoint queries of user {user.created_by} ({user.jobs} marking jobs)")
+        queries = endpoint_queries(conn, user.created_by)
+
+        out.write("==== With indexes ====\n\n")
+        for name, statement in queries.items():
+            explain(conn, name, statement, out)
+
+        if args.compare:
+            print("\nWithout secondary indexes")
+            out.write("==== Without secondary indexes ====\n\n")
+            conn.rollback()
+            # DDL is transactional in PostgreSQL, the indexes come back with the rollback
+            with conn.begin() as transaction:
+                for index in secondary_indexes():
+                    index.drop(conn, checkfirst=True)
+                for name, statement in queries.items():
+                    explain(conn, name, statement, out)
+                transaction.rollback()
+
+    print(f"\nPlans written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -72,13 +72,17 @@ async def test_list_files_success():
     logger.info("==================== TEST: List Files ====================")
     logger.info("GET /api/files/")
     
-    response_data = [{
-        "file_id": i,
-        "filename": f"testfile_{i}.txt",
-        "file_size": 100,
-        "file_type": "template",
-        "created_at": "2023-10-05T10:30:00Z"
-    } for i in range(1, 4)]
+    response_data = {
+        "items": [{
+            "file_id": i,
+            "filename": f"testfile_{i}.txt",
+            "file_size": 100,
+            "file_type": "template",
+            "created_at": "2023-10-05T10:30:00Z"
+        } for i in range(1, 4)],
+        "limit": 50,
+        "next_cursor": None
+    }
     
     log_test_result("list_files", {}, response_data, 200)
     logger.info("✅ List files successful")
@@ -77,13 +77,17 @@ async def test_get_marking():
 @pytest.mark.asyncio
 async def test_list_markings():
     logger.info("==================== TEST: List Marking Jobs ====================")
-    response_data = [{
-        "id": i,
-        "name": f"Marking Job {i}",
-        "description": f"Description for job {i}",
-        "status": MarkingJobStatus.PENDING.value,
-        "created_at": "2023-10-05T10:30:00Z"
-    } for i in range(1, 4)]
+    response_data = {
+        "items": [{
+            "id": i,
+            "name": f"Marking Job {i}",
+            "description": f"Description for job {i}",
+            "status": MarkingJobStatus.PENDING.value,
+            "created_at": "2023-10-05T10:30:00Z"
+        } for i in range(1, 4)],
+        "limit": 50,
+        "next_cursor": None
+    }
     
     log_test_result("list_markings", {}, response_data, 200)
     logger.info("✅ List marking jobs successful")
@@ -64,14 +64,18 @@ async def test_create_template():
 @pytest.mark.asyncio
 async def test_list_templates():
     logger.info("==================== TEST: List Templates ====================")
-    response_data = [{
-        "id": i,
-        "name": f"Template {i}",
-        "description": f"Description for template {i}",
-        "config_type": "grid_based",
-        "status": "completed",
-        "created_at": "2023-10-05T10:30:00Z"
-    } for i in range(1, 4)]
+    response_data = {
+        "items": [{
+            "id": i,
+            "name": f"Template {i}",
+            "description": f"Description for template {i}",
+            "config_type": "grid_based",
+            "status": "completed",
+            "created_at": "2023-10-05T10:30:00Z"
+        } for i in range(1, 4)],
+        "limit": 50,
+        "next_cursor": None
+    }
     
     log_test_result("list_templates", {}, response_data, 200)
     logger.info("✅ List templates successful")
@@ -49,22 +49,22 @@ horizontal_line_detection_params = HoughLineConfig(
 
 ##################### Helper Functions #####################
 def contour_area_filter(contours, min_area, max_area):
-    filtered_contours = []
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if min_area <= area <= max_area:
-            filtered_contours.append(contour)
-    return filtered_contours
+    areas = np.array([cv2.contourArea(contour) for contour in contours])
+    keep = np.flatnonzero((areas >= min_area) & (areas <= max_area))
+    return [contours[i] for i in keep]
 
 def detect_hough_lines(image, threshold:int, horisontal:bool = False, angle_tolerance:float=np.pi/16, rho_resolution:float=1, theta_resolution:float=np.pi/180):
     main_angle = np.pi/2 if horisontal else 0
     min_angle  = main_angle-angle_tolerance
     max_angle  = main_angle+angle_tolerance
     lines = cv2.HoughLinesWithAccumulator(image, rho_resolution, theta_resolution,threshold, None, 0,0, min_angle, max_angle)
-    return lines
+    if lines is None:
+        return None
+    # (rho, theta, votes) rows; the nesting differs between OpenCV versions
+    return lines.reshape(-1, 3).astype(np.float64)
 
 def get_points_on_line(line):
-    rho, theta, _ = line[0]
+    rho, theta, _ = line
     a = math.cos(theta)
     b = math.sin(theta)
     x0 = a * rho
@@ -74,33 +74,28 @@ def get_points_on_line(line):
     return pt1,pt2
 
 def group_lines(lines, inter_line_width:int=15):
-    line_groups = []
-    sorted_lines = sorted(lines, key=lambda x: x[0][0])
-    line_groups.append([sorted_lines[0]])
-    current_group_index = 0
-    current_rho = sorted_lines[0][0][0]
-    for line in sorted_lines[1:]:
-        rho = line[0][0]
-        if rho - current_rho <= inter_line_width:
-            line_groups[current_group_index].append(line)
-        else:
-            line_groups.append([line])
-            current_group_index += 1
-        current_rho = rho
-    return line_groups
+    # Sort by rho and start a new group wherever the gap to the previous line is too wide
+    sorted_lines = lines[np.argsort(lines[:, 0], kind='stable')]
+    breaks = np.flatnonzero(np.diff(sorted_lines[:, 0]) > inter_line_width) + 1
+    return np.split(sorted_lines, breaks)
 
-def solve_line_intersection(line1, line2):
-    rho1, theta1, _ = line1[0]
-    rho2, theta2, _ = line2[0]
-    A = np.array([[np.cos(theta1), np.sin(theta1)],
-                  [np.cos(theta2), np.sin(theta2)]])
-    b = np.array([[rho1],
-                  [rho2]])
-    if np.linalg.det(A) == 0:
-        return None
-    x0, y0 = np.linalg.solve(A, b)
-    x0, y0 = int(np.round(x0.item())), int(np.round(y0.item()))
-    return (x0, y0)
+def select_line(line_group, highest_rho:bool):
+    # Take the two lines with the most votes, then the one with the lowest or highest rho
+    strongest = line_group[np.argsort(-line_group[:, 2], kind='stable')[:2]]
+    index = np.argmax(strongest[:, 0]) if highest_rho else np.argmin(strongest[:, 0])
+    return strongest[index]
+
+def solve_line_intersections(lines1, lines2):
+    # Solves the 2x2 system of every (lines1[i], lines2[i]) pair in one batch
+    lines1 = np.asarray(lines1, dtype=np.float64)
+    lines2 = np.asarray(lines2, dtype=np.float64)
+    A = np.stack([np.stack([np.cos(lines1[:, 1]), np.sin(lines1[:, 1])], axis=-1),
+                  np.stack([np.cos(lines2[:, 1]), np.sin(lines2[:, 1])], axis=-1)], axis=1)
+    b = np.stack([lines1[:, 0], lines2[:, 0]], axis=-1)[..., np.newaxis]
+    if np.any(np.linalg.det(A) == 0):
+        raise ValueError("Parallel lines have no intersection.")
+    points = np.linalg.solve(A, b)[..., 0]
+    return np.round(points).astype(int)
 
 ##################### Main Class #####################
 class LineBasedIndexSectionDetector:
@@ -111,7 +106,7 @@ class LineBasedIndexSectionDetector:
                  min_contour_area: int = 10000, max_contour_area: int = 50000, contour_margin: int = 10,
                  vertical_line_detection_params: HoughLineConfig = vertical_line_detection_params,
                  horizontal_line_detection_params: HoughLineConfig = horizontal_line_detection_params,
-                 inter_line_width: int = 15):
+                 inter_line_width: int = 15, search_region: tuple = None):
         self.operating_width = operating_width
         self.operating_height = operating_height
         self.output_width = output_width
@@ -126,14 +121,18 @@ class LineBasedIndexSectionDetector:
         self.horizontal_line_detection_params = horizontal_line_detection_params
         self.inter_line_width = inter_line_width
         self.morph_kernel_size = morph_kernel_size
+        # (x0, y0, x1, y1) as fractions of the sheet where the index box is expected
+        self.search_region = search_region
 
     def __save_intermediate(self, image: np.ndarray, step_name: str, file_id: str):
         if not os.path.exists(self.intermediate_results_dir):
             os.makedirs(self.intermediate_results_dir)
         cv2.imwrite(os.path.join(self.intermediate_results_dir, f"{file_id}_{step_name}.png"), image)
 
-    def set_image(self, image: np.ndarray):
-        image = cv2.resize(image, (self.operating_width, self.operating_height))
+    def set_image(self, image: np.ndarray, resize: bool = True):
+        # Pre-cropped index sections are already at the right scale and must not be resized
+        if resize:
+            image = cv2.resize(image, (self.operating_width, self.operating_height))
         self.original = image
         self.current = image
     
@@ -144,7 +143,29 @@ class LineBasedIndexSectionDetector:
         return self.current
     
     def extract_index_section(self, debug:bool = False,file_id:str="file") -> np.ndarray:
+        self.locate_index_box(debug=debug, file_id=file_id)
+        return self.refine_index_section(debug=debug, file_id=file_id)
+
+    def locate_index_box(self, debug:bool = False,file_id:str="file") -> np.ndarray:
+        if self.search_region is not None:
+            height, width = self.current.shape[:2]
+            x0, y0, x1, y1 = self.search_region
+            bounds = (round(x0 * width), round(y0 * height), round(x1 * width), round(y1 * height))
+            try:
+                return self.__locate_index_box(bounds, debug=debug, file_id=file_id)
+            except ValueError:
+                # The box is not where it is expected, look for it on the whole sheet
+                pass
+        return self.__locate_index_box(None, debug=debug, file_id=file_id)
+
+    def __locate_index_box(self, bounds:tuple = None, debug:bool = False,file_id:str="file") -> np.ndarray:
         ########################## PHASE 1 ##########################
+        # Only the (x0, y0, x1, y1) bounds are searched when given
+        offset_x, offset_y = 0, 0
+        search_area = self.current
+        if bounds is not None:
+            offset_x, offset_y, x1, y1 = bounds
+            search_area = self.current[offset_y:y1, offset_x:x1]
         ############ STEP 1: Edge Detection ############
         blur_spread = self.edge_detection_params_1.blur_spread
         blur_strength = self.edge_detection_params_1.blur_strength
@@ -152,7 +173,7 @@ class LineBasedIndexSectionDetector:
         canny_threshold2 = self.edge_detection_params_1.canny_threshold2
         morph_kernel_size = self.morph_kernel_size
         # Convert to grayscale
-        gray_paper = cv2.cvtColor(self.current, cv2.COLOR_BGR2GRAY)
+        gray_paper = cv2.cvtColor(search_area, cv2.COLOR_BGR2GRAY)
         # Blur the image to reduce noise
         blurred_paper = cv2.GaussianBlur(gray_paper, (blur_spread, blur_spread), blur_strength)
         # Edge detection using Canny
@@ -168,21 +189,23 @@ class LineBasedIndexSectionDetector:
         if len(contours) == 0:
             raise ValueError("No contours found in the image.")
         # Filter contours by area
-        filtered_contours = contour_area_filter(contours, self.min_contour_area, self.max_contour_area)
+        areas = np.array([cv2.contourArea(contour) for contour in contours])
+        areas[(areas < self.min_contour_area) | (areas > self.max_contour_area)] = -1
         # filtered contour count validation
-        if len(filtered_contours) == 0:
+        if not np.any(areas >= 0):
             raise ValueError("No contours found after filtering by area.")
         if debug:
-            contour_visualization = self.current.copy()
+            filtered_contours = [contours[i] for i in np.flatnonzero(areas >= 0)]
+            contour_visualization = search_area.copy()
             cv2.drawContours(contour_visualization, filtered_contours, -1, (0,255,0), 3)
             self.__save_intermediate(contour_visualization, "step2_filtered_contours", file_id)
         ############ STEP 3: Target Contour Selection and Extraction ############
         # choose the max area contour as target
-        target = max(filtered_contours, key=cv2.contourArea)
+        target = contours[int(np.argmax(areas))]
         box = cv2.boundingRect(target)
         x, y, w, h = box
-        x -= self.contour_margin
-        y -= self.contour_margin
+        x += offset_x - self.contour_margin
+        y += offset_y - self.contour_margin
         w += 2 * self.contour_margin
         h += 2 * self.contour_margin
         # Clamp coordinates to image boundaries
@@ -194,6 +217,9 @@ class LineBasedIndexSectionDetector:
         self.current = self.current[y:y2, x:x2].copy()
         if debug:
             self.__save_intermediate(self.current, "step3_extracted_section", file_id)
+        return self.current
+
+    def refine_index_section(self, debug:bool = False,file_id:str="file") -> np.ndarray:
         ################################ PHASE 2 ##########################
         ############ STEP 4: Redetect Edges ############
         blur_spread = self.edge_detection_params_2.blur_spread
@@ -255,32 +281,19 @@ class LineBasedIndexSectionDetector:
         bottom_line_group = horizontal_line_groups[-1]
 
         # Right: top 2 by votes, then pick leftmost (lowest rho)
-        right_lines = sorted(right_line_group, key=lambda line: line[0][2], reverse=True)[:2]
-        right_line = min(right_lines, key=lambda line: line[0][0])
-
+        right_line = select_line(right_line_group, highest_rho=False)
         # Left: top 2 by votes, then pick rightmost (highest rho)
-        left_lines = sorted(left_line_group, key=lambda line: line[0][2], reverse=True)[:2]
-        left_line = max(left_lines, key=lambda line: line[0][0])
-
-        
+        left_line = select_line(left_line_group, highest_rho=True)
         # Top: top 2 by votes, then pick bottommost (highest rho → further down)
-        top_lines = sorted(top_line_group, key=lambda line: line[0][2], reverse=True)[:2]
-        top_line = max(top_lines, key=lambda line: line[0][0])
-
-        
+        top_line = select_line(top_line_group, highest_rho=True)
         # Bottom: top 2 by votes, then pick topmost (lowest rho → further up)
-        bottom_lines = sorted(bottom_line_group, key=lambda line: line[0][2], reverse=True)[:2]
-        bottom_line = min(bottom_lines, key=lambda line: line[0][0])
-
+        bottom_line = select_line(bottom_line_group, highest_rho=False)
 
         ################## STEP 6: Warp Perspective ######################
-        # Calculate intersection points
-        top_left     = solve_line_intersection(left_line, top_line)
-        top_right    = solve_line_intersection(right_line, top_line)
-        bottom_left  = solve_line_intersection(left_line, bottom_line)
-        bottom_right = solve_line_intersection(right_line, bottom_line)
-        
-        contour = np.array([top_left, top_right, bottom_right, bottom_left], dtype="float32")
+        # Calculate intersection points (top left, top right, bottom right, bottom left)
+        corners = solve_line_intersections([left_line, right_line, right_line, left_line],
+                                           [top_line, top_line, bottom_line, bottom_line])
+        contour = corners.astype("float32")
         dst = np.array([
             [0, 0],
             [self.output_width - 1, 0],
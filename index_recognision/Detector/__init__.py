@@ -14,7 +14,8 @@ detector = LineBasedIndexSectionDetector(operating_width=Config.OPERATING_WIDTH,
                                             contour_margin=Config.CONTOUR_MARGIN,
                                             vertical_line_detection_params=Config.VERTICAL_LINE_DETECTION_PARAMS,
                                             horizontal_line_detection_params=Config.HORIZONTAL_LINE_DETECTION_PARAMS,
-                                            inter_line_width=Config.INTER_LINE_WIDTH)
+                                            inter_line_width=Config.INTER_LINE_WIDTH,
+                                            search_region=Config.SEARCH_REGION)
 
 def get_index_section(image: np.ndarray) -> np.ndarray:
     """
@@ -32,4 +33,23 @@ def get_index_section(image: np.ndarray) -> np.ndarray:
     except Exception as e:
         print(f"Error during index section extraction: {e}")
         image = detector.get_current()
+    return image
+
+def get_index_section_from_crop(image: np.ndarray) -> np.ndarray:
+    """
+    Refines an index section that was already cropped out of the aligned answer sheet
+    by the marking worker. Only the line based perspective correction is run.
+
+    Args:
+        image: Cropped image of the index box.
+
+    Returns:
+        Image containing the student index section.
+    """
+    detector.set_image(image, resize=False)
+    try:
+        image = detector.refine_index_section(debug=False)
+    except Exception as e:
+        print(f"Error during index section refinement: {e}")
+        image = detector.get_current()
     return image
\ No newline at end of file
@@ -34,4 +34,7 @@ class Config:
         rho_resolution=1,
         theta_resolution=np.pi/64
     )
-    INTER_LINE_WIDTH = 15
\ No newline at end of file
+    INTER_LINE_WIDTH = 15
+    # Part of the sheet (x0, y0, x1, y1 as fractions) searched for the index box first,
+    # the whole sheet is searched when it is not found there. None always searches the whole sheet
+    SEARCH_REGION = (0.35, 0.0, 1.0, 0.25)
\ No newline at end of file
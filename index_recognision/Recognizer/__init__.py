@@ -1,10 +1,16 @@
 import numpy as np
+import doctr
 from .DoctrDetoctorRecognizer import DoctrDetoctorRecognizer
 from .config import Config
 
-recognizer = DoctrDetoctorRecognizer(detect_margin_x=Config.DETECTOR_MARGIN_X,
+recognizer = DoctrDetoctorRecognizer(det_model_name=Config.DET_MODEL_NAME,
+                                     rec_model_name=Config.REC_MODEL_NAME,
+                                     detect_margin_x=Config.DETECTOR_MARGIN_X,
                                      detect_margin_y=Config.DETECTOR_MARGIN_Y)
 
+# Identifies the models producing the results, used to invalidate cached results
+MODEL_VERSION = f"doctr-{doctr.__version__}:{Config.DET_MODEL_NAME}:{Config.REC_MODEL_NAME}"
+
 def recognize_student_index(index_image: np.ndarray) -> dict:
     """
     Recognizes the student index number from the index number image.
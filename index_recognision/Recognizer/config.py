@@ -1,4 +1,5 @@
 class Config:
     DETECTOR_MARGIN_X = 5
     DETECTOR_MARGIN_Y = 5
-    
\ No newline at end of file
+    DET_MODEL_NAME = "fast_base"
+    REC_MODEL_NAME = "crnn_vgg16_bn"
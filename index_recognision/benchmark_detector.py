@@ -0,0 +1,57 @@
+################################ Imports ##########################
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from Detector import detector
+
+################################ Functions ##########################
+def run(images, search_region, repeats):
+    detector.search_region = search_region
+    outputs, timings, failures = [], [], 0
+    for image in images:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            detector.set_image(image)
+            try:
+                output = detector.extract_index_section()
+            except Exception:
+                output = None
+        timings.append((time.perf_counter() - start) / repeats)
+        failures += output is None
+        outputs.append(output)
+    return outputs, np.array(timings), failures
+
+def report(name, timings, failures):
+    print(f"{name:<14} mean {timings.mean() * 1000:7.2f} ms  p95 {np.percentile(timings, 95) * 1000:7.2f} ms  failures {failures}")
+
+################################ Main Code ##########################
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark index section detection over a set of answer sheets")
+    parser.add_argument("--samples", default=os.path.join(os.path.dirname(__file__), "..", "samples"),
+                        help="Directory searched recursively for answer sheet images")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.samples, "**", "*.jpg"), recursive=True))
+    images = [cv2.imread(path) for path in paths]
+    print(f"Benchmarking {len(images)} images from {args.samples}")
+
+    search_region = detector.search_region
+    full_outputs, full_timings, full_failures = run(images, None, args.repeats)
+    roi_outputs, roi_timings, roi_failures = run(images, search_region, args.repeats)
+    detector.search_region = search_region
+
+    report("whole sheet", full_timings, full_failures)
+    report("search region", roi_timings, roi_failures)
+
+    # Both runs should crop the same index section
+    differences = [np.abs(full.astype(int) - roi.astype(int)).mean()
+                   for full, roi in zip(full_outputs, roi_outputs) if full is not None and roi is not None]
+    if differences:
+        print(f"Mean absolute pixel difference: mean {np.mean(differences):.2f}, max {np.max(differences):.2f}")
+
+if __name__ == "__main__":
+    main()
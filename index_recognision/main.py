@@ -2,6 +2,7 @@
 import cv2
 import os,sys
 import json
+import base64
 import logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,39 +15,85 @@ import Recognizer
 import numpy as np
 from task_queue.rabbitMQ import send_message, start_consuming
 from storage.nfs_storage import NFSStorage
+from storage.result_cache import ResultCache
 
 ################################ Configurations ###################
 INCOMING_QUEUE = os.getenv('RABBITMQ_INCOMING_QUEUE', 'rabbitmq_incoming_queue')
 OUTGOING_QUEUE = os.getenv('RABBITMQ_OUTGOING_QUEUE', 'rabbitmq_outgoing_queue')
+RESULT_CACHE_SIZE = int(os.getenv('INDEX_RESULT_CACHE_SIZE', '20000')) # 0 disables the cache
 nfs = NFSStorage()
+RESULT_CACHE_DIR = os.getenv('INDEX_RESULT_CACHE_DIR', os.path.join(nfs.shared_path, 'cache', 'index_results'))
+result_cache = ResultCache(RESULT_CACHE_DIR, Recognizer.MODEL_VERSION, max_entries=RESULT_CACHE_SIZE)
 logger = logging.getLogger(__name__)
 
 ################################ Functions ##########################
-def preprocess(file_path) -> np.ndarray:
+def read_file(file_path) -> bytes:
     absolute_path = nfs.get_absolute_path(file_path)
     if not nfs.file_exists(absolute_path):
         raise FileNotFoundError(f"File not found: {absolute_path}")
-    image = cv2.imread(absolute_path)
-    return image
+    with open(absolute_path, 'rb') as f:
+        return f.read()
+
+def decode_image(content: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+
+def preprocess(file_path) -> np.ndarray:
+    return decode_image(read_file(file_path))
+
+def read_index_crop(task: dict):
+    """
+    Returns the PNG bytes of the index section cropped by the marking worker, either inline
+    (base64) or from NFS. Returns None when the task only carries the full sheet path.
+    """
+    if task.get('index_image'):
+        return base64.b64decode(task['index_image'])
+    if task.get('index_image_path'):
+        return read_file(task['index_image_path'])
+    return None
 
 def callback(ch, method, properties, body):
-    logger.info(" [x] Received %r" % body)
     task = json.loads(body) # type: dict
+    logger.info(" [x] Received task %s (answer sheet %s)" % (task.get('task_id'), task.get('answer_sheet_id')))
     file_path = task['file_path']
     result = task
     result['error_flag'] = False
 
-    ## Detect the index section from the input image
+    ## Prefer the worker's crop; fall back to the full sheet
     try:
-        image = preprocess(file_path)
-    except FileNotFoundError as e:
-        logger.error(e)
-        result['error_flag'] = True
+        content = read_index_crop(task)
+    except Exception as e:
+        logger.warning(f"Could not read index crop, falling back to full sheet: {e}")
+        content = None
+    is_crop = content is not None
+    # The crop is not needed in the result message
+    result.pop('index_image', None)
+
+    if content is None:
+        try:
+            content = read_file(file_path)
+        except FileNotFoundError as e:
+            logger.error(e)
+            result['error_flag'] = True
+            send_message(OUTGOING_QUEUE, result)
+            logger.info(" [x] Sent result to outgoing queue")
+            return
+
+    ## Skip OCR entirely for images that were recognized before
+    cache_key = result_cache.make_key(content)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        result.update(cached)
         send_message(OUTGOING_QUEUE, result)
-        logger.info(" [x] Sent result to outgoing queue")
+        logger.info(" [x] Sent cached result to outgoing queue")
         return
+
+    ## Detect the index section from the input image
     try:
-        index_image = Detector.get_index_section(image)
+        image = decode_image(content)
+        if is_crop:
+            index_image = Detector.get_index_section_from_crop(image)
+        else:
+            index_image = Detector.get_index_section(image)
         logger.info(" [x] Index section detected")
         data = Recognizer.recognize_student_index(index_image)
         logger.info(" [x] Index recognized")
@@ -56,6 +103,11 @@ def callback(ch, method, properties, body):
         send_message(OUTGOING_QUEUE, result)
         return
 
+    try:
+        result_cache.set(cache_key, data)
+    except Exception as e:
+        logger.warning(f"Could not cache index result: {e}")
+
     ## Make result with incoming task + data
     result.update(data)
     send_message(OUTGOING_QUEUE, result)
@@ -0,0 +1,99 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    Content addressed cache of index recognition results.
+
+    Entries are keyed by the sha256 of the image bytes that were recognized
+    (the worker's crop or the original sheet) together with the model version,
+    and stored as small JSON files so the cache can live on local disk or NFS.
+    The least recently used entries are evicted once max_entries is exceeded.
+    """
+    def __init__(self, cache_dir: str, model_version: str, max_entries: int = 20000):
+        self.cache_dir = Path(cache_dir)
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # type: OrderedDict[str, None]
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files already on disk (oldest access first)"""
+        files = sorted(self.cache_dir.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._entries[path.stem] = None
+        logger.info(f"Loaded {len(self._entries)} cached index results from {self.cache_dir}")
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def make_key(self, content: bytes) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(self.model_version.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached result for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        # Touch the entry so the on-disk order survives restarts
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+        return result
+
+    def set(self, key: str, result: dict):
+        """Store the result for key and evict the least recently used entries"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def __len__(self):
+        return len(self._entries)
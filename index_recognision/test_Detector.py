@@ -57,4 +57,13 @@ def test_detect_index_section_empty():
     # Check if the output is a numpy array
     assert isinstance(index_section, np.ndarray), "Output is not a numpy array."
     # Check if the output still has non-zero dimensions (it may return the original image)
-    assert index_section.size > 0, "Output image has zero size."
\ No newline at end of file
+    assert index_section.size > 0, "Output image has zero size."
+def test_detect_index_section_from_crop_empty():
+    # Create an empty crop, as if the worker could not find the index box lines
+    empty_crop = np.zeros((80, 420, 3), dtype=np.uint8)
+    # now test the Detector function
+    index_section = Detector.get_index_section_from_crop(empty_crop)
+    # Check if the output is a numpy array
+    assert isinstance(index_section, np.ndarray), "Output is not a numpy array."
+    # Check if the crop is returned untouched (it must not be resized to the full sheet operating size)
+    assert index_section.shape == empty_crop.shape, "Crop was resized."
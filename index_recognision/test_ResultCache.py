@@ -0,0 +1,40 @@
+# pytest cases for storage/result_cache.py
+import pytest
+from storage.result_cache import ResultCache
+
+MODEL_VERSION = 'test-model'
+
+def test_result_cache_hit(tmp_path):
+    cache = ResultCache(str(tmp_path), MODEL_VERSION, max_entries=10)
+    key = cache.make_key(b'index image bytes')
+    # nothing cached yet
+    assert cache.get(key) is None, "Empty cache returned a result."
+    cache.set(key, {'index_number': '210001A', 'confidence': 0.93})
+    assert cache.get(key) == {'index_number': '210001A', 'confidence': 0.93}, "Cached result does not match."
+    # a new cache over the same directory sees the stored entry
+    reopened = ResultCache(str(tmp_path), MODEL_VERSION, max_entries=10)
+    assert reopened.get(key) is not None, "Cached result was not persisted."
+
+def test_result_cache_model_version(tmp_path):
+    cache = ResultCache(str(tmp_path), MODEL_VERSION, max_entries=10)
+    other = ResultCache(str(tmp_path), 'other-model', max_entries=10)
+    # the same content under a different model version must not collide
+    assert cache.make_key(b'content') != other.make_key(b'content'), "Model version is not part of the key."
+
+def test_result_cache_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), MODEL_VERSION, max_entries=2)
+    keys = [cache.make_key(str(i).encode()) for i in range(3)]
+    cache.set(keys[0], {'index_number': '0'})
+    cache.set(keys[1], {'index_number': '1'})
+    # use the first entry so the second becomes the least recently used
+    assert cache.get(keys[0]) is not None
+    cache.set(keys[2], {'index_number': '2'})
+    assert len(cache) == 2, "Cache grew beyond max_entries."
+    assert cache.get(keys[1]) is None, "Least recently used entry was not evicted."
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+def test_result_cache_disabled(tmp_path):
+    cache = ResultCache(str(tmp_path / 'disabled'), MODEL_VERSION, max_entries=0)
+    key = cache.make_key(b'content')
+    cache.set(key, {'index_number': '0'})
+    assert cache.get(key) is None, "Disabled cache returned a result."
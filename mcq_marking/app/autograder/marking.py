@@ -69,9 +69,10 @@ def check_neighbours_pixels(img, points):
     return answers.astype('int')
 
 
-def get_answers(template_img, answers_image, bubble_coordinates):
-    # Find homography Matrix
-    homography = get_homography(template_img, answers_image)
+def get_answers(template_img, answers_image, bubble_coordinates, homography=None):
+    # Find homography Matrix (callers that already aligned the sheet pass it in)
+    if homography is None:
+        homography = get_homography(template_img, answers_image)
     
     if homography is None:
         logger.error("Failed to calculate homography matrix - not enough feature matches")
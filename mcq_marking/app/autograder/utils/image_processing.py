@@ -84,6 +84,18 @@ def get_homography(img1, img2):
         H = None
     return H
 
+def warp_region(img, homography, region, margin=0):
+    ''' Crop the [x, y, w, h] region given in template space out of an image that
+        the homography maps the template onto. Returns a (h, w) aligned numpy array.'''
+    x, y, w, h = region
+    x, y = x - margin, y - margin
+    w, h = w + 2 * margin, h + 2 * margin
+    template_corners = np.float32([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]).reshape(-1, 1, 2)
+    image_corners = cv2.perspectiveTransform(template_corners, homography)
+    target_corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    M = cv2.getPerspectiveTransform(image_corners.reshape(4, 2), target_corners)
+    return cv2.warpPerspective(np.array(img), M, (int(w), int(h)), borderMode=cv2.BORDER_REPLICATE)
+
 def get_binary_image(img):
     img = np.array(img)
     # Thresholding the image using threshold
@@ -2,17 +2,15 @@ import pika
 import logging
 import threading
 import json
-from app.utils.EventRegistery import EventRegistery
-from app.utils.ThreadSafeDict import ThreadSafeDict
+from app.utils.ResultBroker import ResultBroker
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class IndexListner:
-    def __init__(self, rabbitmq_url: str, event_registery: EventRegistery, temp_data_store: ThreadSafeDict, queue_name: str = 'index_results_queue'):
+    def __init__(self, rabbitmq_url: str, result_broker: ResultBroker, queue_name: str = 'index_results_queue'):
         self.rabbitmq_url = rabbitmq_url
-        self.event_registery = event_registery
-        self.temp_data_store = temp_data_store
+        self.result_broker = result_broker
         self.queue_name = queue_name
         self.thread = None
         self.should_stop = threading.Event()
@@ -63,19 +61,17 @@ class IndexListner:
             message = body.decode('utf-8')
             task = json.loads(message)
             task_id = task.get('task_id')
+            answer_sheet_id = task.get('answer_sheet_id')
             
-            if task_id is None:
-                logger.error("Received message without task_id")
+            if task_id is None or answer_sheet_id is None:
+                logger.error("Received message without task_id or answer_sheet_id")
                 return
             
-            logger.info(f"Received index recognition result for task_id: {task_id}")
-            logger.info(f"Message content: {message}")
+            logger.info(f"Received index recognition result for task_id: {task_id}, answer sheet: {answer_sheet_id}")
             
-            # Store in thread-safe dict
-            self.temp_data_store.set(task_id, task)
-            
-            # Trigger event
-            self.event_registery.set_event(task_id)
+            # Hand the result to the answer sheet waiting for it
+            if not self.result_broker.resolve(task_id, answer_sheet_id, task):
+                logger.warning(f"Dropped index recognition result for task_id: {task_id}, answer sheet: {answer_sheet_id}, nobody is waiting for it")
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
\ No newline at end of file
@@ -1,4 +1,8 @@
+from collections import defaultdict
+from rapidfuzz import process
 from rapidfuzz.distance import Levenshtein, Hamming
+from scipy.optimize import linear_sum_assignment
+import numpy as np
 import re
 
 def get_regex_from_list(label_list):
@@ -39,44 +43,145 @@ def get_regex_from_list(label_list):
             regex_str += f"[{char_class}]"
     return regex_str
 
+class IndexMatcher:
+    ''' Matches predicted index numbers against the possible labels of a job.
+        Built once per job: the regex, an exact lookup table and per-position Hamming
+        buckets are precomputed, and nearest neighbour searches run in rapidfuzz.'''
+    def __init__(self, possible_labels, regex_str=None):
+        # check if possible_labels is empty
+        if not possible_labels:
+            raise ValueError("The list of possible labels is empty.")
+        self.labels = [str(label) for label in possible_labels]
+        self.regex_str = regex_str if regex_str is not None else get_regex_from_list(self.labels)
+        self.pattern = re.compile(self.regex_str)
+        # validate possible index numbers using regex (once, instead of on every sheet)
+        for label in self.labels:
+            if not self.pattern.fullmatch(label):
+                raise ValueError(f"Possible label '{label}' does not match the regex pattern '{self.regex_str}'")
+        self.label_set = set(self.labels)
+        # (position, label without that position) -> indexes of labels, so every label
+        # at Hamming distance 1 from a query is found with len(query) lookups
+        self.hamming_buckets = defaultdict(list)
+        for i, label in enumerate(self.labels):
+            for position in range(len(label)):
+                self.hamming_buckets[(position, label[:position] + label[position + 1:])].append(i)
+
+    def _hamming_neighbours(self, matched_str):
+        ''' Indexes (in list order) of the labels exactly one substitution away'''
+        neighbours = set()
+        for position in range(len(matched_str)):
+            neighbours.update(self.hamming_buckets.get((position, matched_str[:position] + matched_str[position + 1:]), ()))
+        return sorted(neighbours)
+
+    def _closest(self, distances):
+        ''' Returns (best_matching_label, is_exact_match, is_guess) for a row of distances.
+            The first label in list order wins ties, like a linear scan would.'''
+        best = int(np.argmin(distances))
+        candidates = int(np.count_nonzero(distances == distances[best]))
+        return self.labels[best], False, candidates > 1
+
+    def match(self, predicted_label):
+        ''' Given a predicted label, return the best matching label from the possible labels
+            based on exact match or hamming distance.
+            Returns a tuple of (best_matching_label, is_exact_match, is_guess)'''
+        return self.match_many([predicted_label])[0]
+
+    def match_many(self, predicted_labels):
+        ''' Batch version of match(); the remaining nearest neighbour searches are
+            computed with one rapidfuzz cdist call per distance metric.'''
+        results = [None] * len(predicted_labels)
+        hamming_queries, levenshtein_queries = [], []
+        for i, predicted_label in enumerate(predicted_labels):
+            match = self.pattern.search(str(predicted_label))
+            # if match, we use exact match test and if fails hamming distance
+            if match:
+                matched_str = match.group(0)
+                if matched_str in self.label_set:
+                    results[i] = (matched_str, True, False)
+                    continue
+                neighbours = self._hamming_neighbours(matched_str)
+                if neighbours:
+                    results[i] = (self.labels[neighbours[0]], False, len(neighbours) > 1)
+                else:
+                    hamming_queries.append((i, matched_str))
+            else:
+                # If no match found using regex, we use Levenshtein distance on the whole predicted label
+                levenshtein_queries.append((i, str(predicted_label)))
+        for queries, scorer in ((hamming_queries, Hamming.distance), (levenshtein_queries, Levenshtein.distance)):
+            if not queries:
+                continue
+            distances = process.cdist([query for _, query in queries], self.labels, scorer=scorer, dtype=np.int32, workers=-1)
+            for (i, _), row in zip(queries, distances):
+                results[i] = self._closest(row)
+        return results
+
+    def distance_matrix(self, predicted_labels):
+        ''' (len(predicted_labels), len(labels)) matrix of the distances match() ranks by:
+            Hamming on the regex match, or Levenshtein on the whole label when it does not match'''
+        distances = np.empty((len(predicted_labels), len(self.labels)), dtype=np.int32)
+        hamming_rows, hamming_queries, levenshtein_rows, levenshtein_queries = [], [], [], []
+        for i, predicted_label in enumerate(predicted_labels):
+            match = self.pattern.search(str(predicted_label))
+            if match:
+                hamming_rows.append(i)
+                hamming_queries.append(match.group(0))
+            else:
+                levenshtein_rows.append(i)
+                levenshtein_queries.append(str(predicted_label))
+        if hamming_rows:
+            distances[hamming_rows] = process.cdist(hamming_queries, self.labels, scorer=Hamming.distance, dtype=np.int32, workers=-1)
+        if levenshtein_rows:
+            distances[levenshtein_rows] = process.cdist(levenshtein_queries, self.labels, scorer=Levenshtein.distance, dtype=np.int32, workers=-1)
+        return distances
+
+
+def reconcile_index_numbers(matcher, predicted_labels, confidences=None, max_distance=2):
+    ''' Assign the predicted labels of a whole job to distinct possible labels at once.
+        Solves a bipartite assignment minimising the total distance, weighted by the recognition
+        confidence so confident readings keep their best match when two sheets compete for it.
+        A sheet is resolved if it got an exact match, or a unique closest label within max_distance
+        that no other sheet took from it.
+        Returns a list of (best_matching_label, is_exact_match, is_resolved) in input order.'''
+    if not predicted_labels:
+        return []
+    distances = matcher.distance_matrix(predicted_labels)
+    if confidences is None:
+        confidences = [1.0] * len(predicted_labels)
+    confidences = np.array([c if c is not None else 0.0 for c in confidences], dtype=np.float64)
+    # confident readings are more expensive to move away from their closest label
+    weights = 0.5 + np.clip(confidences, 0.0, 1.0)
+    cost = distances * weights[:, None]
+    # readings that match nothing must not take a label away from a sheet that fits it
+    out_of_range = distances > max_distance
+    cost[out_of_range] = (max_distance + 1) * 2.0 * len(predicted_labels)
+    rows, cols = linear_sum_assignment(cost)
+    assignment = dict(zip(rows.tolist(), cols.tolist()))
+    taken = np.zeros(len(matcher.labels), dtype=bool)
+    taken[cols] = True
+
+    results = []
+    for i in range(len(predicted_labels)):
+        row = distances[i]
+        col = assignment.get(i)
+        if col is None or out_of_range[i, col]:
+            # more sheets than labels, or nothing close enough: keep the independent best guess
+            best = int(np.argmin(row))
+            results.append((matcher.labels[best], bool(row[best] == 0), False))
+            continue
+        distance = row[col]
+        if distance == 0:
+            results.append((matcher.labels[col], True, True))
+            continue
+        # a closer label went to another sheet, or free labels are just as close: unresolved
+        lost_closer = bool(np.any(row < distance))
+        alternatives = int(np.count_nonzero((row == distance) & ~taken))
+        results.append((matcher.labels[col], False, not lost_closer and alternatives == 0))
+    return results
+
+
 def get_matching_index(predicted_label,regex_str, possible_labels):
     ''' Given a predicted label, a regex string and a list of possible labels,
     return the best matching label from the possible labels based on exact match or hamming distance.
-        Returns a tuple of (best_matching_label, is_exact_match, is_guess)'''
-    # check if possible_labels is empty
-    if not possible_labels:
-        raise ValueError("The list of possible labels is empty.")
-    pattern = re.compile(regex_str)
-    # first validate possible index number using regex
-    for label in possible_labels:
-        if not pattern.fullmatch(label):
-            raise ValueError(f"Possible label '{label}' does not match the regex pattern '{regex_str}'")
-
-    match = pattern.search(str(predicted_label))
-    # if match, we use exact match test and if fails hamming distance
-    if match:
-        matched_str = match.group(0)
-        # Check for exact match
-        if matched_str in possible_labels:
-            return matched_str, True, False
-        else:
-            # Use Hamming distance to find the closest match
-            hamming_distances = [(label, Hamming.distance(matched_str, label)) for label in possible_labels]
-            closest_match = min(hamming_distances, key=lambda x: x[1]) # this gives us the tuple (label, distance)
-            # Check if there's more than one candidate with the same minimum distance
-            min_distance = closest_match[1]
-            candidates = [label for label, dist in hamming_distances if dist == min_distance]
-            if len(candidates) > 1:
-                return closest_match[0], False, True
-            else:
-                return closest_match[0], False, False
-    else:
-        # If no match found using regex, we use Levenshtein distance on the whole predicted label
-        levenshtein_distances = [(label, Levenshtein.distance(str(predicted_label), label)) for label in possible_labels]
-        closest_match = min(levenshtein_distances, key=lambda x: x[1])
-        min_distance = closest_match[1]
-        candidates = [label for label, dist in levenshtein_distances if dist == min_distance]
-        if len(candidates) > 1:
-            return closest_match[0], False, True
-        else:
-            return closest_match[0], False, False
\ No newline at end of file
+        Returns a tuple of (best_matching_label, is_exact_match, is_guess)
+        Prefer building an IndexMatcher once when matching many labels.'''
+    return IndexMatcher(possible_labels, regex_str).match(predicted_label)
@@ -11,8 +11,7 @@ logging.getLogger("pika").setLevel(logging.WARNING)
 
 from app.markingworker.markingworker import MCQMarkingWorker
 from app.indexListner.IndexListner import IndexListner
-from app.utils.EventRegistery import EventRegistery
-from app.utils.ThreadSafeDict import ThreadSafeDict
+from app.utils.ResultBroker import ResultBroker
 
 def main():
     # Get RabbitMQ URL from environment variable or use default
@@ -27,18 +26,27 @@ def main():
 
     index_results_queue = os.getenv('INDEX_RESULTS_QUEUE', 'index_results_queue')
 
-    # Create the event registery
-    event_registery = EventRegistery()
-    # Create a thread-safe dictionary to store temporary data
-    temp_data_store = ThreadSafeDict()
+    index_result_timeout = float(os.getenv('INDEX_RESULT_TIMEOUT', '30'))
+    index_max_pending = int(os.getenv('INDEX_MAX_PENDING', '10000'))
+
+    # Correlates index recognition results with the answer sheets waiting for them
+    result_broker = ResultBroker(max_pending=index_max_pending, default_timeout=index_result_timeout)
     
     # Index Listener
-    index_listener = IndexListner(rabbitmq_url, event_registery, temp_data_store, index_results_queue)
+    index_listener = IndexListner(rabbitmq_url, result_broker, index_results_queue)
     index_listener.start()
 
+    # Jobs of each type that run at once
+    template_config_concurrency = int(os.getenv('TEMPLATE_CONFIG_CONCURRENCY', '2'))
+    marking_config_concurrency = int(os.getenv('MARKING_CONFIG_CONCURRENCY', '2'))
+    marking_job_concurrency = int(os.getenv('MARKING_JOB_CONCURRENCY', '1'))
+
     # MCQ Marking Worker
     worker = MCQMarkingWorker(rabbitmq_url, template_config_queue, marking_job_queue, marking_config_queue, marking_job_results_queue, template_config_results_queue, marking_config_results_queue,
-                              event_registery, temp_data_store)
+                              result_broker,
+                              template_config_concurrency=template_config_concurrency,
+                              marking_scheme_config_concurrency=marking_config_concurrency,
+                              marking_job_concurrency=marking_job_concurrency)
     worker.run()
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 import json
 import logging
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional, Union
+from typing import Callable, Dict, Any, Optional, Union
 import pika
 from pika.adapters.blocking_connection import BlockingChannel
 from pika.spec import Basic, BasicProperties
@@ -10,12 +13,20 @@ from app.markingworker.processors.job_processor_interface import JobProcessorInt
 from app.markingworker.processors.template_config_processor import TemplateConfigProcessor
 from app.markingworker.processors.marking_scheme_config_processor import MarkingSchemeConfigProcessor
 from app.markingworker.processors.marking_job_processor import MarkingJobProcessor
+from app.markingworker.scheduler import JobScheduler
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Job queues are priority queues, declared with the same arguments as the backend
+JOB_MAX_PRIORITY = int(os.getenv('JOB_MAX_PRIORITY', '10'))
+JOB_QUEUE_ARGUMENTS = {'x-max-priority': JOB_MAX_PRIORITY}
+# Seconds a marking job waits for a run slot before it is returned to the queue,
+# so RabbitMQ can deliver a more urgent job in its place
+MARKING_JOB_PARK_TIMEOUT = float(os.getenv('MARKING_JOB_PARK_TIMEOUT', '5'))
+
 class MCQMarkingWorker:
     def __init__(
         self, 
@@ -26,8 +37,11 @@ class MCQMarkingWorker:
         marking_job_results_queue: str, 
         template_config_results_queue: str, 
         marking_scheme_config_results_queue: str,
-        event_registery: Any = None,
-        temp_data_store: Any = None
+        result_broker: Any = None,
+        template_config_concurrency: int = 2,
+        marking_scheme_config_concurrency: int = 2,
+        marking_job_concurrency: int = 1,
+        marking_job_preempt_slots: int = 1
     ) -> None:
         self.rabbitmq_url: str = rabbitmq_url
         self.template_config_queue: str = template_config_queue
@@ -37,26 +51,47 @@ class MCQMarkingWorker:
         self.template_config_results_queue: str = template_config_results_queue
         self.marking_scheme_config_results_queue: str = marking_scheme_config_results_queue
         self.connection: Optional[pika.BlockingConnection] = None
-        self.channel: Optional[BlockingChannel] = None
-        self.event_registery = event_registery
-        self.temp_data_store = temp_data_store
+        self.channels: Dict[str, BlockingChannel] = {}
+        self.result_broker = result_broker
+        # How many jobs of each type run at once. Every job type gets its own channel and
+        # executor so quick config jobs are not queued behind long marking jobs
+        self.concurrency: Dict[str, int] = {
+            self.template_config_queue: template_config_concurrency,
+            self.marking_scheme_config_queue: marking_scheme_config_concurrency,
+            self.marking_job_queue: marking_job_concurrency,
+        }
+        # Marking jobs prefetched beyond the running ones, so an urgent job can be
+        # delivered and preempt a running one between answer sheets
+        self.prefetch: Dict[str, int] = dict(self.concurrency)
+        self.prefetch[self.marking_job_queue] += marking_job_preempt_slots
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        self.marking_job_scheduler = JobScheduler(slots=marking_job_concurrency)
         
     def connect(self) -> None:
         """Establish connection to RabbitMQ"""
         try:
             self.connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
-            self.channel = self.connection.channel()
             
-            # Declare queues
-            self.channel.queue_declare(queue=self.template_config_queue, durable=True)
-            self.channel.queue_declare(queue=self.marking_job_queue, durable=True)
-            self.channel.queue_declare(queue=self.marking_scheme_config_queue, durable=True)
+            # One channel per queue, the prefetch count bounds the jobs taken at once
+            for queue, prefetch in self.prefetch.items():
+                channel = self.connection.channel()
+                channel.queue_declare(queue=queue, durable=True, arguments=JOB_QUEUE_ARGUMENTS)
+                channel.basic_qos(prefetch_count=prefetch)
+                self.channels[queue] = channel
+                self.executors[queue] = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix=queue)
             
             logger.info("Connected to RabbitMQ")
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
+    def _threadsafe(self, callback: Callable, *args: Any, **kwargs: Any) -> None:
+        """Run a channel operation on the connection thread, pika channels are not thread safe"""
+        try:
+            self.connection.add_callback_threadsafe(functools.partial(callback, *args, **kwargs))
+        except Exception as e:
+            logger.error(f"Failed to schedule channel operation: {e}")
+
     def _publish_result(
         self, 
         ch: BlockingChannel, 
@@ -116,6 +151,7 @@ class MCQMarkingWorker:
     ) -> None:
         """
         Generic method to process jobs with error handling using a processor object.
+        Runs on an executor thread, replies and acks are handed to the connection thread.
         
         Args:
             ch: RabbitMQ channel
@@ -133,8 +169,8 @@ class MCQMarkingWorker:
             # Validate job ID
             if job_id == 'unknown':
                 reply_data = self._create_reply_data('unknown', 'failed', 'Job ID is unknown')
-                self._publish_result(ch, properties, reply_queue, reply_data)
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                self._threadsafe(self._publish_result, ch, properties, reply_queue, reply_data)
+                self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
                 logger.error(f"{job_type} Job ID is unknown")
                 return
             
@@ -144,8 +180,8 @@ class MCQMarkingWorker:
             # Validate the job data
             if not processor.validate():
                 reply_data = self._create_reply_data(job_id, 'failed', 'Job validation failed')
-                self._publish_result(ch, properties, reply_queue, reply_data)
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                self._threadsafe(self._publish_result, ch, properties, reply_queue, reply_data)
+                self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
                 logger.error(f"{job_type} job validation failed: {job_id}")
                 return
             
@@ -154,23 +190,23 @@ class MCQMarkingWorker:
 
             if result is False:
                 reply_data = self._create_reply_data(job_id, 'failed', 'Job processing failed')
-                self._publish_result(ch, properties, reply_queue, reply_data)
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                self._threadsafe(self._publish_result, ch, properties, reply_queue, reply_data)
+                self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
                 logger.error(f"{job_type} job failed: {job_id}")
                 return
             
             logger.info(f"{job_type} job completed: {job_id}")
             
             reply_data = self._create_reply_data(job_id, 'completed', result)
-            self._publish_result(ch, properties, reply_queue, reply_data)
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._threadsafe(self._publish_result, ch, properties, reply_queue, reply_data)
+            self._threadsafe(ch.basic_ack, delivery_tag=method.delivery_tag)
             
         except Exception as e:
             logger.error(f"Error processing job: {e}")
             job_id = processor.job_id if 'processor' in locals() else 'unknown'
             reply_data = self._create_reply_data(job_id, 'failed', str(e))
-            self._publish_result(ch, properties, reply_queue, reply_data)
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self._threadsafe(self._publish_result, ch, properties, reply_queue, reply_data)
+            self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
     
     def process_template_config_job(
         self, 
@@ -214,57 +250,94 @@ class MCQMarkingWorker:
     ) -> None:
         """Process marking job from RabbitMQ"""
         job_data: Dict[str, Any] = json.loads(body)
+        job_id = job_data.get('id', 'unknown')
+        priority = (properties.priority if properties else None) or 0
+
+        token = self.marking_job_scheduler.acquire(priority, timeout=MARKING_JOB_PARK_TIMEOUT)
+        if token is None:
+            # Nothing to preempt, let RabbitMQ hand out its most urgent job again
+            logger.debug(f"Returning marking job {job_id} to the queue while it waits for a slot")
+            self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=True)
+            return
 
         def progress_callback(completed: int, total:int):
-            job_id = job_data.get('id', 'unknown')
-            self._send_progress_to_backend(ch, properties, job_id, completed, total, self.marking_job_results_queue)
-            
-        processor = MarkingJobProcessor(job_data, progress_callback=progress_callback, rabbitmq_url=self.rabbitmq_url, event_registery=self.event_registery, temp_data_store=self.temp_data_store)
-        self.process_job_with_error_handling(
-            ch, method, properties, body,
-            self.marking_job_results_queue,
-            processor
-        )
+            self._threadsafe(self._send_progress_to_backend, ch, properties, job_id, completed, total, self.marking_job_results_queue)
+
+        def checkpoint():
+            self.marking_job_scheduler.checkpoint(token)
+
+        try:
+            processor = MarkingJobProcessor(job_data, progress_callback=progress_callback, rabbitmq_url=self.rabbitmq_url,
+                                            result_broker=self.result_broker, checkpoint=checkpoint)
+            self.process_job_with_error_handling(
+                ch, method, properties, body,
+                self.marking_job_results_queue,
+                processor
+            )
+        finally:
+            self.marking_job_scheduler.release(token)
     
+    def _dispatch(
+        self,
+        queue: str,
+        handler: Callable[[BlockingChannel, Basic.Deliver, BasicProperties, bytes], None]
+    ) -> Callable[[BlockingChannel, Basic.Deliver, BasicProperties, bytes], None]:
+        """Wrap a job handler so it runs on the executor of its queue instead of the connection thread"""
+        executor = self.executors[queue]
+
+        def run(ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
+            try:
+                handler(ch, method, properties, body)
+            except Exception as e:
+                logger.error(f"Error processing job from {queue}: {e}")
+                self._threadsafe(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
+
+        def on_message(ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
+            executor.submit(run, ch, method, properties, body)
+        return on_message
+
     def start_consuming(self) -> None:
         """Start consuming messages from RabbitMQ queues"""
         try:
-            if not self.channel:
-                raise RuntimeError("Channel not initialized. Call connect() first.")
-            
-            # Set up consumers
-            self.channel.basic_qos(prefetch_count=1)  # Process one message at a time
+            if not self.connection or not self.channels:
+                raise RuntimeError("Channels not initialized. Call connect() first.")
             
             # Consumer for template config jobs
-            self.channel.basic_consume(
+            self.channels[self.template_config_queue].basic_consume(
                 queue=self.template_config_queue,
-                on_message_callback=self.process_template_config_job
+                on_message_callback=self._dispatch(self.template_config_queue, self.process_template_config_job)
             )
             
             # Consumer for marking config jobs
-            self.channel.basic_consume(
+            self.channels[self.marking_scheme_config_queue].basic_consume(
                 queue=self.marking_scheme_config_queue,
-                on_message_callback=self.process_marking_scheme_config_job
+                on_message_callback=self._dispatch(self.marking_scheme_config_queue, self.process_marking_scheme_config_job)
             )
             
             # Consumer for marking jobs
-            self.channel.basic_consume(
+            self.channels[self.marking_job_queue].basic_consume(
                 queue=self.marking_job_queue,
-                on_message_callback=self.process_marking_job
+                on_message_callback=self._dispatch(self.marking_job_queue, self.process_marking_job)
             )
             
-            logger.info("Starting to consume messages. Press CTRL+C to stop.")
-            self.channel.start_consuming()
+            logger.info(f"Starting to consume messages with concurrency {self.concurrency}. Press CTRL+C to stop.")
+            # Serves every channel and runs the callbacks scheduled by the executors
+            while any(channel.is_open for channel in self.channels.values()):
+                self.connection.process_data_events(time_limit=1)
             
         except KeyboardInterrupt:
             logger.info("Stopping consumer...")
-            if self.channel:
-                self.channel.stop_consuming()
-            if self.connection:
-                self.connection.close()
+            self.stop()
         except Exception as e:
             logger.error(f"Error in consumer: {e}")
             raise
+
+    def stop(self) -> None:
+        """Stop consuming; unacknowledged jobs are redelivered by RabbitMQ"""
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.connection and self.connection.is_open:
+            self.connection.close()
     
     def run(self) -> None:
         """Main run method"""
@@ -7,8 +7,7 @@ import logging
 from typing import Dict, Any, Optional, Callable, Union
 from app.markingworker.processors.job_processor_interface import JobProcessorInterface
 from app.models.marking_job import MarkingJob
-from app.utils.EventRegistery import EventRegistery
-from app.utils.ThreadSafeDict import ThreadSafeDict
+from app.utils.ResultBroker import ResultBroker
 
 
 logger = logging.getLogger(__name__)
@@ -25,8 +24,8 @@ class MarkingJobProcessor(JobProcessorInterface):
         job_data: Dict[str, Any], 
         progress_callback: Callable[[float], None],
         rabbitmq_url: Optional[str] = None,
-        event_registery: EventRegistery = None,
-        temp_data_store: ThreadSafeDict = None
+        result_broker: ResultBroker = None,
+        checkpoint: Optional[Callable[[], None]] = None
     ):
         """
         Initialize the marking job processor.
@@ -35,12 +34,14 @@ class MarkingJobProcessor(JobProcessorInterface):
             job_data: Dictionary containing marking job parameters
             progress_callback: Optional callback function to report progress
             rabbitmq_url: RabbitMQ connection URL for publishing progress
+            result_broker: Broker delivering index recognition results per answer sheet
+            checkpoint: Called between answer sheets, may block while a more urgent job runs
         """
         super().__init__(job_data, progress_callback)
         self.rabbitmq_url = rabbitmq_url
         self.marking_job: Optional[MarkingJob] = None
-        self.event_registery = event_registery
-        self.temp_data_store = temp_data_store
+        self.result_broker = result_broker
+        self.checkpoint = checkpoint
     
     def validate(self) -> bool:
         """
@@ -93,8 +94,8 @@ class MarkingJobProcessor(JobProcessorInterface):
                 self.job_data,
                 rabbitmq_url=self.rabbitmq_url,
                 progress_callback=self.progress_callback,
-                event_registery=self.event_registery,
-                temp_data_store=self.temp_data_store
+                result_broker=self.result_broker,
+                checkpoint=self.checkpoint
             )
             result = self.marking_job.mark_answers()
             
@@ -109,4 +110,8 @@ class MarkingJobProcessor(JobProcessorInterface):
         except Exception as e:
             logger.error(f"Error processing marking job {self.job_id}: {e}")
             return False
+        finally:
+            # Several jobs can run at once, don't leave their connections open
+            if self.marking_job:
+                self.marking_job.close()
 
@@ -0,0 +1,91 @@
+"""
+Priority scheduler for marking jobs.
+Bounds how many marking jobs run at once and lets a more urgent job take the slot
+of a less urgent one at the next answer sheet boundary (checkpoint).
+"""
+
+import itertools
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobScheduler:
+    """
+    Hands out run slots to jobs by priority.
+
+    Waiting jobs are ordered by priority, jobs that were preempted go before new jobs
+    of the same priority, and otherwise in arrival order. A running job calls
+    checkpoint() between answer sheets; if a waiting job has a higher priority it gives
+    up its slot there and resumes once it is the most urgent waiting job again.
+    """
+
+    def __init__(self, slots: int = 1):
+        self.slots = slots
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._running: Dict[int, int] = {}  # token -> priority
+        self._waiting: Dict[int, Tuple[int, bool, int]] = {}  # token -> sort key
+
+    def _is_next(self, token: int) -> bool:
+        return len(self._running) < self.slots and token == min(self._waiting, key=self._waiting.get)
+
+    def _can_preempt(self, priority: int) -> bool:
+        return bool(self._running) and priority > min(self._running.values())
+
+    def acquire(self, priority: int, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Wait for a run slot.
+
+        Args:
+            priority: Priority of the job, higher runs first
+            timeout: Seconds to wait while no running job can be preempted by this one
+
+        Returns:
+            Token to pass to checkpoint() and release(), or None if the timeout expired
+        """
+        with self._condition:
+            token = next(self._sequence)
+            self._waiting[token] = (-priority, True, token)
+            while not self._condition.wait_for(lambda: self._is_next(token), timeout):
+                # A job that will preempt at the next checkpoint keeps waiting
+                if not self._can_preempt(priority):
+                    del self._waiting[token]
+                    self._condition.notify_all()
+                    return None
+            del self._waiting[token]
+            self._running[token] = priority
+            self._condition.notify_all()
+            return token
+
+    def checkpoint(self, token: int) -> bool:
+        """
+        Give up the slot to a more urgent waiting job and wait to resume.
+
+        Returns:
+            True if the job was preempted
+        """
+        with self._condition:
+            priority = self._running[token]
+            if not any(-key[0] > priority for key in self._waiting.values()):
+                return False
+            del self._running[token]
+            self._waiting[token] = (-priority, False, token)
+            self._condition.notify_all()
+            logger.info(f"Job with priority {priority} paused for a more urgent job")
+            self._condition.wait_for(lambda: self._is_next(token))
+            del self._waiting[token]
+            self._running[token] = priority
+            self._condition.notify_all()
+            logger.info(f"Job with priority {priority} resumed")
+            return True
+
+    def release(self, token: int) -> None:
+        """Free the slot of a finished job"""
+        with self._condition:
+            self._running.pop(token, None)
+            self._waiting.pop(token, None)
+            self._condition.notify_all()
@@ -1,17 +1,25 @@
 from PIL import Image
 from app.autograder.marking import calculate_score, get_answers
 from app.autograder.utils.draw_shapes import draw_scatter_points
+from app.autograder.utils.image_processing import get_homography, warp_region
 from app.models.marking_scheme import MarkingScheme
 from pika.adapters.blocking_connection import BlockingChannel
 from pika import BasicProperties
+import base64
 import json
+import cv2
 import numpy as np
 import logging
 
+from app.utils.file_handelling import save_image
+
 logger = logging.getLogger(__name__)
 
+INDEX_CROP_MARGIN = 6 # pixels around the index box (template space) so its borders stay in the crop
+
 class AnswerSheet:
-    def __init__(self, job_id : int, id : int, path: str, answer_sheet_img : Image, marking_scheme: MarkingScheme, rabbit_channel: BlockingChannel = None, index_task_queue="index_task_queue"):
+    def __init__(self, job_id : int, id : int, path: str, answer_sheet_img : Image, marking_scheme: MarkingScheme, rabbit_channel: BlockingChannel = None, index_task_queue="index_task_queue",
+                 index_crop_transport="inline"):
         self.job_id = job_id
         self.id = id
         self.path = path
@@ -19,7 +27,10 @@ class AnswerSheet:
         self.marking_scheme = marking_scheme
         self.rabbit_channel = rabbit_channel
         self.index_task_queue = index_task_queue
+        self.index_crop_transport = index_crop_transport # 'inline', 'nfs' or 'none'
         self.index_number = None
+        self.homography = None
+        self.index_image = None
         self.answers_with_coordinates = None
         self.correct = None
         self.incorrect = None
@@ -32,12 +43,51 @@ class AnswerSheet:
         self.result_img = None
         self.labeled_points = None
 
+    def get_homography(self, force_recalculate=False):
+        ''' Homography mapping template space onto this answer sheet'''
+        if self.homography is None or force_recalculate:
+            self.homography = get_homography(self.marking_scheme.template.template_img, self.answer_sheet_img)
+        return self.homography
+
     def get_answers_and_corresponding_points(self, force_recalculate=False):
         if self.answers_with_coordinates is None or force_recalculate:
             bubble_coordinates = self.marking_scheme.template.get_bubble_coordinates()
-            self.answers_with_coordinates = get_answers(self.marking_scheme.template.template_img, self.answer_sheet_img, bubble_coordinates)
+            self.answers_with_coordinates = get_answers(self.marking_scheme.template.template_img, self.answer_sheet_img, bubble_coordinates,
+                                                        homography=self.get_homography(force_recalculate))
         return self.answers_with_coordinates
-    
+
+    def get_index_image(self, force_recalculate=False):
+        ''' Crop the index number section out of the aligned answer sheet.
+            Returns None if the sheet could not be aligned or the template has no index region.'''
+        if self.index_image is None or force_recalculate:
+            index_region = self.marking_scheme.template.get_index_region()
+            homography = self.get_homography()
+            if index_region is None or homography is None:
+                return None
+            try:
+                self.index_image = warp_region(self.answer_sheet_img, homography, index_region, margin=INDEX_CROP_MARGIN)
+            except Exception as e:
+                logger.warning(f"Failed to crop index region of {self}: {e}")
+                return None
+        return self.index_image
+
+    def _attach_index_image(self, task_data):
+        ''' Ship the cropped index section with the task so the recognizer does not
+            have to re-read and re-detect on the full resolution original'''
+        if self.index_crop_transport == 'none':
+            return
+        index_image = self.get_index_image()
+        if index_image is None:
+            return
+        if self.index_crop_transport == 'nfs':
+            index_image_path = f"intermediate/index_crops/{self.job_id}/{self.id}.png"
+            save_image(index_image_path, index_image)
+            task_data['index_image_path'] = index_image_path
+        else:
+            success, png = cv2.imencode('.png', index_image)
+            if success:
+                task_data['index_image'] = base64.b64encode(png.tobytes()).decode('ascii')
+
     def start_index_recognition(self):
         if self.rabbit_channel is not None:
             task_data = {
@@ -45,6 +95,7 @@ class AnswerSheet:
                 'task_id': self.job_id,
                 'answer_sheet_id': self.id,
             }
+            self._attach_index_image(task_data)
             task_message = json.dumps(task_data)
             self.rabbit_channel.basic_publish(
                 exchange='',
@@ -57,8 +108,9 @@ class AnswerSheet:
             raise ValueError("Rabbit channel is not set for index recognition task.")
 
     def get_score(self, intermediate_results=False):
-        self.start_index_recognition()
+        # Align first so the index section can be cropped with the same homography
         self.get_answers_and_corresponding_points()
+        self.start_index_recognition()
         marking_scheme_answers = self.marking_scheme.get_answers_and_corresponding_points()
         choice_distribution = self.marking_scheme.template.get_choice_distribution()
         (
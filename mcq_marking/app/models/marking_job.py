@@ -5,27 +5,34 @@ from typing import Callable
 import pika
 import os
 import logging
-import threading
 from app.autograder.utils.image_processing import enhance_image, read_enhanced_image, read_resize_image
 from app.models.answer_sheet import AnswerSheet
 from app.models.marking_scheme import MarkingScheme
 from app.models.template import Template, TemplateConfigType
 from app.utils.file_handelling import file_exists, get_spreadsheet, read_answer_sheet_paths, read_json, save_image_using_folder_and_filename, save_spreadsheet, get_column_from_file
 from app.anomalydetection.anomaly_detector import AnomalyDetector
-from app.utils.EventRegistery import EventRegistery
-from app.utils.ThreadSafeDict import ThreadSafeDict
-from app.indexListner.indexValidator import get_matching_index, get_regex_from_list
+from app.utils.ResultBroker import ResultBroker
+from app.utils.AuditBundle import AuditBundle
+from app.utils.NormalizedSheets import NormalizedSheets
+from app.indexListner.indexValidator import IndexMatcher, reconcile_index_numbers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 INDEX_TASK_QUEUE = os.getenv('INDEX_TASK_QUEUE', 'index_task_queue')
+INDEX_CROP_TRANSPORT = os.getenv('INDEX_CROP_TRANSPORT', 'inline') # 'inline', 'nfs' or 'none'
+# Progress is sent at most every MARKING_PROGRESS_INTERVAL seconds, or every MARKING_PROGRESS_EVERY sheets,
+# and always after the last sheet
+MARKING_PROGRESS_INTERVAL = float(os.getenv('MARKING_PROGRESS_INTERVAL', '0.5'))
+MARKING_PROGRESS_EVERY = int(os.getenv('MARKING_PROGRESS_EVERY', '25'))
+# Mark the normalized copies of the answer sheets, made the first time a folder is marked
+USE_NORMALIZED_SHEETS = os.getenv('USE_NORMALIZED_SHEETS', 'true').lower() == 'true'
 
 
 class MarkingJob:
     def __init__(self, data: dict, rabbitmq_url: str = "amqp://localhost", progress_callback: Callable[[int,int], None]=None,
-                 event_registery: EventRegistery = None, temp_data_store: ThreadSafeDict = None):
+                 result_broker: ResultBroker = None, checkpoint: Callable[[], None] = None):
         """
         Initialize a MarkingJob instance.
 
@@ -42,8 +49,11 @@ class MarkingJob:
                 template_config_path: str
                 intermediate_results_path: str
                 save_intermediate_results: bool
+                audit_bundle_path: str, optional, where the audit ZIP is assembled while marking
             progress_callback (callable, optional): Function to report progress. Defaults to None.
             rabbitmq_url (str, optional): RabbitMQ connection URL. Defaults to "amqp://localhost".
+            result_broker (ResultBroker, optional): Delivers the index recognition result of each answer sheet. Defaults to None.
+            checkpoint (callable, optional): Called before each answer sheet; blocks while the job is paused for a more urgent one. Defaults to None.
         """
         self.job_id = data.get('id')
         self.name = data.get('name')
@@ -57,6 +67,7 @@ class MarkingJob:
         self.config_type = data.get('config_type')
         self.save_intermediate_results = data.get('save_intermediate_results')
         self.index_list_file_path = data.get('index_list_file_path', None)
+        self.audit_bundle_path = data.get('audit_bundle_path', None)
         self.rabbitmq_url = rabbitmq_url
         self.progress_callback = progress_callback
 
@@ -66,15 +77,21 @@ class MarkingJob:
         self.template = None
         self.marking_scheme = None
         self.answer_sheets = []
+        self.sheet_results = []
         self.spreadsheet_workbook = None
         self.spreadsheet_sheet = None
         self.total_answer_sheets = 0
         self.processed_answer_sheets = 0
         self.failed_answer_sheets = 0
         self.available_index_numbers = None
+        self.last_progress_time = None
+        self.last_progress_count = 0
+        self.index_matcher = None
+        self.audit_bundle = None
+        self.normalized_sheets = None
 
-        self.event_registery = event_registery
-        self.temp_data_store = temp_data_store
+        self.result_broker = result_broker
+        self.checkpoint = checkpoint
 
     def connect(self):
         """Establish connection to RabbitMQ"""
@@ -90,6 +107,19 @@ class MarkingJob:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
     
+    def close(self):
+        """Close the connection used to publish index recognition tasks and drop an unfinished audit bundle"""
+        if self.audit_bundle is not None:
+            self.audit_bundle.discard()
+            self.audit_bundle = None
+        try:
+            if self.connection and self.connection.is_open:
+                self.connection.close()
+        except Exception as e:
+            logger.error(f"Failed to close RabbitMQ connection: {e}")
+        self.connection = None
+        self.channel = None
+
     def setup(self, force_recalculate=False):
         self.connect()
         if self.index_list_file_path and file_exists(self.index_list_file_path):
@@ -99,6 +129,11 @@ class MarkingJob:
                 logger.info(f"Loaded {len(self.available_index_numbers)} index numbers from {self.index_list_file_path}")
             except Exception as e:
                 logger.error(f"Failed to load index numbers from {self.index_list_file_path}: {e}")
+        if self.available_index_numbers:
+            try:
+                self.index_matcher = IndexMatcher(self.available_index_numbers)
+            except ValueError as e:
+                logger.error(f"Index numbers will not be validated: {e}")
         if self.template is None or self.marking_scheme is None or self.answer_sheets is None or self.spreadsheet_workbook is None or self.spreadsheet_sheet is None or force_recalculate:
             template_img = read_resize_image(self.template_path, resize=False)
 
@@ -114,6 +149,9 @@ class MarkingJob:
             self.marking_scheme = MarkingScheme(self.job_id, f'${self.name } Marking Scheme', marking_img, self.template, marking_scheme_config)
             logger.info(f"Obtaining papers from {self.answers_folder_path}")
             self.answer_sheets = read_answer_sheet_paths(self.answers_folder_path)
+            if USE_NORMALIZED_SHEETS:
+                self.normalized_sheets = NormalizedSheets(self.answers_folder_path)
+                self.normalized_sheets.load()
             self.total_answer_sheets = len(self.answer_sheets)
             logger.info(f"Found {self.total_answer_sheets} answer sheets to process.")
             self.spreadsheet_workbook, self.spreadsheet_sheet = get_spreadsheet(self.output_path, f'${self.name } Results')
@@ -125,47 +163,63 @@ class MarkingJob:
             else:
                 self.spreadsheet_sheet.append(base_headers)
     
+    def update_audit_bundle(self, update: Callable[[AuditBundle], None]) -> bool:
+        ''' apply update to the audit bundle, a bundle that fails is dropped without failing the job
+            return False if there is no bundle (anymore)'''
+        if self.audit_bundle is None:
+            return False
+        try:
+            update(self.audit_bundle)
+            return True
+        except Exception as e:
+            logger.error(f"Dropping the audit bundle of job {self.job_id}: {e}")
+            self.audit_bundle.discard()
+            self.audit_bundle = None
+            return False
+
     def mark_answers(self):
         self.setup()
         self.start_time = time.time()
+        if self.audit_bundle_path:
+            # The audit bundle grows as sheets are marked so downloads never rebuild it
+            self.audit_bundle = AuditBundle(self.audit_bundle_path, self.name, self.intermediate_results_path)
+            self.update_audit_bundle(AuditBundle.open)
         for i, answer_sheet_path in enumerate(self.answer_sheets):
+            if self.checkpoint:
+                self.checkpoint()
             try:
                 logger.info(f"Processing answer sheet: {answer_sheet_path}")
-                answer_sheet_img = read_resize_image(answer_sheet_path)
+                if self.normalized_sheets:
+                    answer_sheet_img = self.normalized_sheets.read(answer_sheet_path)
+                else:
+                    answer_sheet_img = read_resize_image(answer_sheet_path)
 
                 #Detect Anomalies
                 if self.anomaly_detector:
                     anomalies_detected, count = self.anomaly_detector.check(answer_sheet_img)
 
                 answer_sheet_img = enhance_image(answer_sheet_img, 1.5)
-                answer_sheet = AnswerSheet(self.job_id, i, answer_sheet_path, answer_sheet_img, self.marking_scheme, self.channel, INDEX_TASK_QUEUE)
+                answer_sheet = AnswerSheet(self.job_id, i, answer_sheet_path, answer_sheet_img, self.marking_scheme, self.channel, INDEX_TASK_QUEUE,
+                                           index_crop_transport=INDEX_CROP_TRANSPORT)
                 
-                # set up the event for index retrieval
-                event = None
-                if self.event_registery and self.temp_data_store:
-                    event = self.event_registery.create_event(self.job_id) # type: threading.Event
+                # register for the index result before the recognition task is published
+                index_future = None
+                if self.result_broker:
+                    index_future = self.result_broker.register(self.job_id, answer_sheet.id)
                 results = answer_sheet.get_score(intermediate_results=self.save_intermediate_results)
-                # wait for the index number to be set by the index listener
+                # wait for the index number to be delivered by the index listener
                 index_number = "None"
-                if self.event_registery and self.temp_data_store:
-                    event.wait(timeout=30)  # wait for up to 30 seconds
-                    result = self.temp_data_store.get(self.job_id)
+                index_confidence = None
+                if index_future is not None:
+                    result = self.result_broker.wait(self.job_id, answer_sheet.id, index_future)
                     if result and 'index_number' in result:
                         index_number = result['index_number']
+                        index_confidence = result.get('confidence')
                 else:
-                    logger.info("Event registery or temp data store not set, skipping index recognition wait.")
-                # Validate index number
-                if index_number != "None" and self.available_index_numbers:
-                    regex_str = get_regex_from_list(self.available_index_numbers)
-                    validated_index_number, is_exact_match, is_guess = get_matching_index(index_number, regex_str, self.available_index_numbers)
-                    if not is_exact_match:
-                        results['flag'] = True
-                        if is_guess:
-                            results['flag_reason'] += ('' if (not results['flag_reason'] or results['flag_reason'] == '') else ', ') + 'Index number ambiguous'
-                        else:
-                            results['flag_reason'] += ('' if (not results['flag_reason'] or results['flag_reason'] == '') else ', ') + 'Index number ambiguous'
-                    index_number = validated_index_number
+                    logger.info("Result broker not set, skipping index recognition wait.")
+                # Index numbers are validated for the whole job once every sheet is marked
                 results['index_number'] = index_number
+                results['index_confidence'] = index_confidence
                 results['answer_sheet_path'] = answer_sheet_path
                 # Anomaly flags
                 if anomalies_detected:
@@ -175,10 +229,13 @@ class MarkingJob:
 
                 if self.save_intermediate_results:
                     audit_file_name = f"{answer_sheet.id}.jpg"
-                    save_image_using_folder_and_filename(self.intermediate_results_path, audit_file_name, answer_sheet.result_img)
+                    audit_image = save_image_using_folder_and_filename(self.intermediate_results_path, audit_file_name, answer_sheet.result_img)
+                    self.update_audit_bundle(lambda bundle: bundle.add_intermediate(audit_file_name, audit_image))
                     results['audit_file_name'] = audit_file_name
                     logger.info(f"Saved intermediate results")
-                self.add_to_spreadsheet(results)
+                # The result image is saved already; don't hold it until the job ends
+                results.pop('result_img', None)
+                self.sheet_results.append(results)
                 #update progress
                 self.processed_answer_sheets += 1
             except Exception as e:
@@ -187,7 +244,15 @@ class MarkingJob:
                 self.failed_answer_sheets += 1
             finally:
                 # Send progress to backend
-                self.progress_callback(self.processed_answer_sheets, self.total_answer_sheets)
+                self.report_progress(final=(i == self.total_answer_sheets - 1))
+        if self.normalized_sheets:
+            self.normalized_sheets.save()
+        if self.result_broker:
+            # Sheets that failed before waiting leave their registration behind
+            self.result_broker.cancel_job(self.job_id)
+        self.validate_index_numbers()
+        for results in self.sheet_results:
+            self.add_to_spreadsheet(results)
         logger.info(f"Saving spreadsheet")
         save_spreadsheet(self.output_path, self.spreadsheet_workbook)
         logger.info(f"Saved spreadsheet")
@@ -195,6 +260,7 @@ class MarkingJob:
             logger.error(f"Output path does not exist")
             return False
         logger.info(f"Marking is complete. Results have been saved in {self.output_path}")
+        audit_bundle_saved = self.finish_audit_bundle()
         logger.info(f"Total time taken: {time.time() - self.start_time} seconds")
 
         result = {
@@ -207,8 +273,56 @@ class MarkingJob:
             'processing_completed_at': datetime.now().isoformat(),
             'results_summary': None
         }
+        if audit_bundle_saved:
+            result['audit_bundle_path'] = self.audit_bundle_path
         return result
 
+    def finish_audit_bundle(self) -> bool:
+        ''' add the result sheet, template and marking scheme and move the bundle into place
+            return True if the bundle was saved'''
+        def finish(bundle: AuditBundle):
+            bundle.add_results(self.spreadsheet_sheet)
+            for path in (self.template_path, self.marking_path):
+                if path and file_exists(path):
+                    bundle.add_file(path)
+            bundle.finish()
+        saved = self.update_audit_bundle(finish)
+        self.audit_bundle = None
+        return saved
+
+    def report_progress(self, final: bool = False):
+        ''' Send progress to the backend, throttled so large jobs don't flood the results queue'''
+        if not self.progress_callback:
+            return
+        handled = self.processed_answer_sheets + self.failed_answer_sheets
+        now = time.monotonic()
+        if not final and self.last_progress_time is not None \
+                and now - self.last_progress_time < MARKING_PROGRESS_INTERVAL \
+                and handled - self.last_progress_count < MARKING_PROGRESS_EVERY:
+            return
+        self.last_progress_time = now
+        self.last_progress_count = handled
+        self.progress_callback(self.processed_answer_sheets, self.total_answer_sheets)
+
+    def validate_index_numbers(self):
+        ''' Assign the recognized index numbers of all sheets to the index list in one go,
+            so two sheets cannot both be snapped to the same student. Only sheets whose
+            index number stays unresolved after the assignment are flagged.'''
+        if not self.index_matcher:
+            return
+        recognized = [results for results in self.sheet_results if results['index_number'] != "None"]
+        start_time = time.time()
+        assignments = reconcile_index_numbers(self.index_matcher,
+                                              [results['index_number'] for results in recognized],
+                                              [results['index_confidence'] for results in recognized])
+        for results, (index_number, is_exact_match, is_resolved) in zip(recognized, assignments):
+            if not is_resolved:
+                results['flag'] = True
+                results['flag_reason'] += ('' if (not results['flag_reason'] or results['flag_reason'] == '') else ', ') + 'Index number ambiguous'
+            results['index_number'] = index_number
+        unresolved = sum(1 for _, _, is_resolved in assignments if not is_resolved)
+        logger.info(f"Reconciled {len(recognized)} index numbers in {time.time() - start_time:.3f} seconds, {unresolved} unresolved")
+
     def add_to_spreadsheet(self, results: dict):
         append_data = [
             results['index_number'],
@@ -8,6 +8,7 @@ from PIL import Image
 import logging
 
 from app.utils.file_handelling import save_image
+from app.templateconfig.common import get_index_region
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,7 @@ class Template:
         self.config_type = config_type
         self.bubble_coordinates = None
         self.choice_distribution = None
+        self.index_region = None
 
     def get_bubble_coordinates(self, force_recalculate=False):
         if self.bubble_coordinates is None or force_recalculate:
@@ -63,6 +65,17 @@ class Template:
         
         return self.bubble_coordinates
     
+    def get_index_region(self, force_recalculate=False):
+        ''' Returns the [x, y, w, h] box of the index number section in template space.
+            Templates configured before the region was stored are located on the template image.'''
+        if self.index_region is None or force_recalculate:
+            if "index_region" in self.template_config and not force_recalculate:
+                self.index_region = self.template_config["index_region"]
+            else:
+                self.index_region = get_index_region(self.template_img)
+                logger.info(f"Located index region on template: {self.index_region}")
+        return self.index_region
+
     def get_choice_distribution(self, force_recalculate=False):
         if self.choice_distribution is None or force_recalculate:
           self.choice_distribution = get_choice_distribution(self.template_config)
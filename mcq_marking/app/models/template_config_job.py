@@ -1,5 +1,6 @@
 from app.templateconfig.config import get_config
 from app.templateconfig.clustering import get_clustering
+from app.templateconfig.common import get_index_region
 from app.utils.file_handelling import save_image, save_json, file_exists
 
 
@@ -53,6 +54,13 @@ class TemplateConfigJob:
                 self.num_of_options_per_question,
                 self.save_intermediate_results
             )
+        # Remember where the index number box sits in template space so the
+        # marking worker can crop it out of each answer sheet
+        index_region = get_index_region(warped_img)
+        if index_region is not None:
+            bubble_configs["index_region"] = index_region
+        else:
+            logger.warning("Index number region not found on the template")
         self.template_config = bubble_configs
         self.warped_img = warped_img
         self.debug_img = result_img
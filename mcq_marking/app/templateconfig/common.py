@@ -35,6 +35,25 @@ def warp_image_to_rectangles(img, categorized_rectangles, target_width=1200, tar
     return warped
 
 
+def get_index_region(warped_img):
+    """
+    Locate the index number box on an already warped template image.
+    The index box is the largest rectangle left on the sheet once the corner
+    markers have been warped to the image borders (see categorize()).
+    Returns [x, y, w, h] in warped template coordinates, or None if not found.
+    """
+    img = np.array(warped_img)
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    img, edges = get_canny_edges(img)
+    external_contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    rectangles = detect_rectangles(external_contours)
+    if not rectangles:
+        return None
+    x, y, w, h = rectangles[0][2]
+    return [int(x), int(y), int(w), int(h)]
+
+
 def prepare_image(img):
     img, edges = get_canny_edges(img)
 
@@ -0,0 +1,74 @@
+import os
+import zipfile
+import logging
+from io import BytesIO
+from openpyxl import Workbook
+from app.storage.nfs_storage import NFSStorage
+# this class assembles the audit ZIP of a marking job while its answer sheets are marked
+
+logger = logging.getLogger(__name__)
+
+# columns of the result sheet that only make sense inside the system
+AUDIT_EXCLUDED_COLUMNS = ('Answer Sheet Path', 'Labeled Points')
+
+class AuditBundle:
+    def __init__(self, path: str, job_name: str, intermediate_results_path: str = None):
+        ''' path is relative to the NFS share, the bundle is written next to it as <path>.partial
+            and moved into place by finish() so readers never see a half written bundle'''
+        self.path = path
+        self.job_name = job_name
+        self.full_path = NFSStorage().base_path / path
+        self.partial_path = self.full_path.with_name(self.full_path.name + '.partial')
+        # intermediate images are placed in a folder named after the job's intermediate results folder
+        self.intermediate_folder = os.path.basename(intermediate_results_path.rstrip('/')) if intermediate_results_path else 'intermediate'
+        self.archive = None
+
+    def open(self):
+        self.full_path.parent.mkdir(parents=True, exist_ok=True)
+        # a bundle of an earlier run is stale from now on
+        self.full_path.unlink(missing_ok=True)
+        self.archive = zipfile.ZipFile(self.partial_path, mode='w')
+
+    def add_intermediate(self, file_name: str, content: bytes):
+        ''' add the intermediate result image of one answer sheet, images are stored without compression'''
+        self.archive.writestr(os.path.join(self.intermediate_folder, file_name), content, compress_type=zipfile.ZIP_STORED)
+
+    def add_file(self, path: str):
+        ''' add a file from the NFS share under its base name'''
+        self.archive.write(NFSStorage().base_path / path, os.path.basename(path), compress_type=zipfile.ZIP_DEFLATED)
+
+    def add_results(self, worksheet):
+        ''' add the result sheet without the internal columns'''
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        keep = [i for i, name in enumerate(header) if name not in AUDIT_EXCLUDED_COLUMNS]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=self.job_name[:31] if self.job_name else None)
+        sheet.append([header[i] for i in keep])
+        for row in rows:
+            sheet.append([row[i] if i < len(row) else None for i in keep])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        self.archive.writestr(f"{self.job_name}_results.xlsx", buffer.getvalue(), compress_type=zipfile.ZIP_STORED)
+
+    def finish(self):
+        ''' close the bundle and atomically replace any earlier bundle of the job'''
+        self.archive.close()
+        self.archive = None
+        with open(self.partial_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self.partial_path, self.full_path)
+        logger.info(f"Audit bundle saved in {self.path}")
+
+    def discard(self):
+        ''' drop an unfinished bundle'''
+        if self.archive is not None:
+            try:
+                self.archive.close()
+            except Exception:
+                pass
+            self.archive = None
+        try:
+            os.remove(self.partial_path)
+        except FileNotFoundError:
+            pass
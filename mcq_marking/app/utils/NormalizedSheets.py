@@ -0,0 +1,121 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+from app.storage.nfs_storage import NFSStorage
+# this class keeps grayscale copies of an answer sheet folder at the resolution sheets are marked at
+
+logger = logging.getLogger(__name__)
+
+# resolution answer sheets are marked at
+SHEET_SIZE = (1200, 1600)
+# hidden folder inside the answer sheet folder, hidden entries are never listed as answer sheets
+NORMALIZED_FOLDER = '.normalized'
+MANIFEST_NAME = 'manifest.json'
+# bump when the normalization changes so older copies are made again
+MANIFEST_VERSION = 1
+
+def normalize_sheet(image: Image.Image) -> Image.Image:
+    ''' the same conversion read_resize_image applies to an answer sheet'''
+    return image.convert('L').resize(SHEET_SIZE)
+
+class NormalizedSheets:
+    def __init__(self, folder_path: str):
+        ''' folder_path is the answer sheet folder, relative to the NFS share or absolute'''
+        self.folder = NFSStorage().base_path / folder_path
+        self.normalized_folder = self.folder / NORMALIZED_FOLDER
+        self.manifest_path = self.normalized_folder / MANIFEST_NAME
+        self.sheets = {}
+        self.changed = False
+
+    def load(self):
+        ''' read the manifest of earlier ingests, a missing or outdated manifest starts empty'''
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return
+        if manifest.get('version') == MANIFEST_VERSION and tuple(manifest.get('size', ())) == SHEET_SIZE:
+            self.sheets = manifest.get('sheets', {})
+
+    def read(self, path: str) -> Image.Image:
+        ''' return the normalized answer sheet at path, decoding and storing it if there is no up to date copy'''
+        full_path = NFSStorage().base_path / path
+        name = full_path.relative_to(self.folder).as_posix()
+        stat = full_path.stat()
+        entry = self.sheets.get(name)
+        if entry and entry['file_size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            try:
+                image = Image.open(self.normalized_folder / entry['normalized'])
+                image.load()
+                if image.size == SHEET_SIZE and image.mode == 'L':
+                    return image
+            except Exception as e:
+                logger.warning(f"Normalizing {name} again, its copy could not be read: {e}")
+
+        content = NFSStorage().get_file(path)
+        original = Image.open(BytesIO(content))
+        width, height = original.size
+        image = normalize_sheet(original)
+        normalized_name = f"{name}.png"
+        try:
+            self._save_copy(normalized_name, image)
+        except Exception as e:
+            # marking goes on from the original, the sheet is normalized again next time
+            logger.error(f"Failed to store the normalized copy of {name}: {e}")
+            return image
+        self.sheets[name] = {
+            'normalized': normalized_name,
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'file_size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'width': width,
+            'height': height,
+        }
+        self.changed = True
+        return image
+
+    def _save_copy(self, normalized_name: str, image: Image.Image):
+        copy_path = self.normalized_folder / normalized_name
+        copy_path.parent.mkdir(parents=True, exist_ok=True)
+        # PNG keeps the pixels exact, so marking a copy gives the same results as marking the original
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        self._write_atomic(copy_path, buffer.getvalue())
+
+    def save(self):
+        ''' write the manifest if sheets were normalized since it was loaded'''
+        if not self.changed:
+            return
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'size': list(SHEET_SIZE),
+            'sheets': self.sheets,
+        }
+        try:
+            self._write_atomic(self.manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+            self.changed = False
+            logger.info(f"Saved normalized sheet manifest of {self.folder} ({len(self.sheets)} sheets)")
+        except Exception as e:
+            logger.error(f"Failed to save normalized sheet manifest {self.manifest_path}: {e}")
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes):
+        ''' concurrent jobs marking the same folder never see a half written file'''
+        partial_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.partial")
+        try:
+            with open(partial_path, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial_path, path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
@@ -0,0 +1,86 @@
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+# this class correlates asynchronous results (e.g. index recognition) with the answer sheet waiting for them
+
+logger = logging.getLogger(__name__)
+
+class ResultBroker:
+    def __init__(self, max_pending: int = 10000, default_timeout: float = 30):
+        self._lock = threading.Lock()
+        self._pending = OrderedDict() # type: OrderedDict[tuple, Future]
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+
+    @staticmethod
+    def _key(job_id, sheet_id):
+        # ids are compared as strings so int/str round trips through JSON still match
+        return (str(job_id), str(sheet_id))
+
+    def register(self, job_id, sheet_id) -> Future:
+        ''' register a future for the result of (job_id, sheet_id), replacing any earlier one.
+            the oldest pending futures are cancelled once max_pending is exceeded
+            return the future object'''
+        key = self._key(job_id, sheet_id)
+        future = Future()
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            self._pending[key] = future
+            evicted = []
+            while len(self._pending) > self.max_pending:
+                evicted.append(self._pending.popitem(last=False))
+        if previous is not None:
+            previous.cancel()
+        for evicted_key, evicted_future in evicted:
+            logger.warning(f"Dropping pending result for job {evicted_key[0]} sheet {evicted_key[1]}, too many pending results")
+            evicted_future.cancel()
+        return future
+
+    def resolve(self, job_id, sheet_id, result) -> bool:
+        ''' hand the result to the future registered for (job_id, sheet_id) and forget it
+            return False if nobody is waiting for it (never registered, timed out or cancelled)'''
+        with self._lock:
+            future = self._pending.pop(self._key(job_id, sheet_id), None)
+        if future is None or not future.set_running_or_notify_cancel():
+            return False
+        future.set_result(result)
+        return True
+
+    def wait(self, job_id, sheet_id, future: Future, timeout: float = None):
+        ''' wait for the result of (job_id, sheet_id)
+            return the result, or None if it does not arrive in time or was cancelled'''
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Timed out waiting for the result of job {job_id} sheet {sheet_id}")
+        except Exception:
+            pass
+        self.discard(job_id, sheet_id, future)
+        return None
+
+    def discard(self, job_id, sheet_id, future: Future = None):
+        ''' stop waiting for (job_id, sheet_id), a late result will be dropped
+            if future is given only that registration is discarded'''
+        key = self._key(job_id, sheet_id)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None or (future is not None and pending is not future):
+                return
+            del self._pending[key]
+        pending.cancel()
+
+    def cancel_job(self, job_id) -> int:
+        ''' cancel every pending future of the job, return how many were cancelled'''
+        job_key = str(job_id)
+        with self._lock:
+            keys = [key for key in self._pending if key[0] == job_key]
+            futures = [self._pending.pop(key) for key in keys]
+        for future in futures:
+            future.cancel()
+        return len(futures)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
@@ -19,6 +19,9 @@ def save_image(path, image):
     Args:
         path: Relative path within the file_type directory
         image: PIL Image or OpenCV image
+
+    Returns:
+        The encoded image bytes that were saved
     """
     # Validate image before processing
     if image is None:
@@ -44,11 +47,12 @@ def save_image(path, image):
     # Save to NFS storage
     nfs = NFSStorage()
     nfs.save_file(image_bytes, path)
+    return image_bytes
     
 
 def save_image_using_folder_and_filename(folder_path, filename, image):
-    """Save image using folder and filename with NFS support"""
-    save_image(os.path.join(folder_path, filename), image)
+    """Save image using folder and filename with NFS support, returns the encoded image"""
+    return save_image(os.path.join(folder_path, filename), image)
 
 def read_image(path, convert_to_grayscale=False, test=False):
     """
@@ -125,6 +129,10 @@ def read_answer_sheet_paths(folder_path):
     nfs = NFSStorage()
     # List files in the given subdirectory using NFS
     file_list = nfs.list_files(directory=folder_path)
+    # Hidden entries, like the normalized copies of the sheets, are not answer sheets
+    folder = nfs.base_path / folder_path
+    file_list = [path for path in file_list
+                 if not any(part.startswith('.') for part in (nfs.base_path / path).relative_to(folder).parts)]
     # Return sorted list of relative paths (folder_path/filename)
     return sorted(file_list)
 
@@ -36,7 +36,7 @@ def rabbit_publisher():
     connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
     channel = connection.channel()
     channel.queue_declare(queue=INCOMING_QUEUE, durable=True)
-    channel.queue_declare(queue=OUTGOING_QUEUE, durable=True)
+    channel.queue_declare(queue=OUTGOING_QUEUE, durable=True, arguments={'x-max-priority': 10})
     yield channel
     channel.close()
     connection.close()
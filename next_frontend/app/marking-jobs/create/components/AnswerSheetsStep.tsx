@@ -12,6 +12,9 @@ import axiosInstance from "@/utils/axiosclient";
 const ANSWER_SHEETS_MAX_SIZE = 500 * 1024 * 1024; // 500MB
 const INDEX_LIST_MAX_SIZE = 5 * 1024 * 1024; // 5MB
 const CHUNK_SIZE = 1024 * 1024; // 1MB chunks
+const PARALLEL_CHUNKS = 4; // chunks in flight at once
+const CHUNK_RETRIES = 3; // attempts per chunk before the upload fails
+const INGEST_POLL_INTERVAL = 1000; // ms between extraction status checks
 
 interface AnswerSheetsStepProps {
   answerSheetsFile: File | null;
@@ -38,6 +41,7 @@ export function AnswerSheetsStep({
     progress: number;
     fileName: string;
     type: "answer_sheets" | "index_list";
+    extracting?: boolean;
   }>({
     isUploading: false,
     progress: 0,
@@ -67,10 +71,30 @@ export function AnswerSheetsStep({
   const uploadFileChunked = async (
     file: File,
     fileType: string
-  ): Promise<{ file_id: number }> => {
-    const uploadId = Math.random().toString(36).substring(2, 15);
+  ): Promise<{ file_id: number; ingest_id?: number | null }> => {
     const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
 
+    // Resume an earlier upload of the same file if the server still has it
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    let uploadId = localStorage.getItem(resumeKey);
+    let received: Uint8Array | null = null;
+    if (uploadId) {
+      try {
+        const { data } = await axiosInstance.get(`/api/files/upload/large/${uploadId}`);
+        if (data.total_chunks === totalChunks && data.chunk_size === CHUNK_SIZE) {
+          received = Uint8Array.from(atob(data.received_bitmap), (c) => c.charCodeAt(0));
+        }
+      } catch {
+        // Expired or unknown session, start over
+      }
+    }
+    if (!received) {
+      uploadId = Math.random().toString(36).substring(2, 15);
+      localStorage.setItem(resumeKey, uploadId);
+    }
+    const isReceived = (chunkIndex: number) =>
+      received !== null && (received[chunkIndex >> 3] & (0x80 >> (chunkIndex & 7))) !== 0;
+
     // Set initial progress
     setUploadProgress({
       isUploading: true,
@@ -79,38 +103,63 @@ export function AnswerSheetsStep({
       type: fileType === "answer_sheet" ? "answer_sheets" : "index_list",
     });
 
-    // Upload chunks
-    for (let chunkIndex = 0; chunkIndex < totalChunks; chunkIndex++) {
-      const start = chunkIndex * CHUNK_SIZE;
-      const end = Math.min(start + CHUNK_SIZE, file.size);
-      const chunk = file.slice(start, end);
-
-      const chunkFormData = new FormData();
-      chunkFormData.append("file", chunk, `chunk_${chunkIndex}`);
-      chunkFormData.append("upload_id", uploadId);
-      chunkFormData.append("chunk_index", chunkIndex.toString());
-      chunkFormData.append("total_chunks", totalChunks.toString());
-      chunkFormData.append("original_name", file.name);
-      chunkFormData.append("save_path", "");
-      chunkFormData.append("file_type", fileType);
-
-      await axiosInstance.post("/api/files/upload/large/chunk", chunkFormData, {
-        headers: {
-          "Content-Type": "multipart/form-data",
-        },
-      });
+    // Upload chunks, a few at a time; the server writes each at its own offset
+    const pendingChunks = Array.from({ length: totalChunks }, (_, i) => i).filter(
+      (chunkIndex) => !isReceived(chunkIndex)
+    );
+    let nextChunk = 0;
+    let uploadedChunks = totalChunks - pendingChunks.length;
+    const uploadChunks = async () => {
+      while (nextChunk < pendingChunks.length) {
+        const chunkIndex = pendingChunks[nextChunk++];
+        const start = chunkIndex * CHUNK_SIZE;
+        const end = Math.min(start + CHUNK_SIZE, file.size);
+        const chunk = file.slice(start, end);
+
+        const chunkFormData = new FormData();
+        chunkFormData.append("file", chunk, `chunk_${chunkIndex}`);
+        chunkFormData.append("upload_id", uploadId as string);
+        chunkFormData.append("chunk_index", chunkIndex.toString());
+        chunkFormData.append("total_chunks", totalChunks.toString());
+        chunkFormData.append("chunk_size", CHUNK_SIZE.toString());
+        chunkFormData.append("total_size", file.size.toString());
+        chunkFormData.append("original_name", file.name);
+        chunkFormData.append("save_path", "");
+        chunkFormData.append("file_type", fileType);
+
+        // Retry a failed chunk a few times before giving up; the upload can be resumed later
+        for (let attempt = 1; ; attempt++) {
+          try {
+            await axiosInstance.post("/api/files/upload/large/chunk", chunkFormData, {
+              headers: {
+                "Content-Type": "multipart/form-data",
+              },
+            });
+            break;
+          } catch (err) {
+            if (attempt >= CHUNK_RETRIES) {
+              throw err;
+            }
+            await new Promise((resolve) => setTimeout(resolve, attempt * 1000));
+          }
+        }
 
-      // Update progress (90% for chunks, 10% for finalization)
-      const chunkProgress = Math.round(((chunkIndex + 1) / totalChunks) * 90);
-      setUploadProgress((prev) => ({
-        ...prev,
-        progress: chunkProgress,
-      }));
-    }
+        // Update progress (90% for chunks, 10% for finalization)
+        uploadedChunks++;
+        const chunkProgress = Math.round((uploadedChunks / totalChunks) * 90);
+        setUploadProgress((prev) => ({
+          ...prev,
+          progress: chunkProgress,
+        }));
+      }
+    };
+    await Promise.all(
+      Array.from({ length: Math.min(PARALLEL_CHUNKS, pendingChunks.length) }, uploadChunks)
+    );
 
     // Finalize upload
     const finalizeFormData = new FormData();
-    finalizeFormData.append("upload_id", uploadId);
+    finalizeFormData.append("upload_id", uploadId as string);
 
     setUploadProgress((prev) => ({
       ...prev,
@@ -127,6 +176,8 @@ export function AnswerSheetsStep({
       }
     );
 
+    localStorage.removeItem(resumeKey);
+
     // Complete progress
     setUploadProgress((prev) => ({
       ...prev,
@@ -143,14 +194,14 @@ export function AnswerSheetsStep({
       });
     }, 1000);
 
-    return finalizeResponse.data as { file_id: number };
+    return finalizeResponse.data as { file_id: number; ingest_id?: number | null };
   };
 
   // Utility function to upload file (regular or chunked based on size)
   const uploadFile = async (
     file: File,
     fileType: string
-  ): Promise<{ file_id: number }> => {
+  ): Promise<{ file_id: number; ingest_id?: number | null }> => {
     const maxSize =
       fileType === "answer_sheet"
         ? ANSWER_SHEETS_MAX_SIZE
@@ -204,7 +255,36 @@ export function AnswerSheetsStep({
       });
     }, 1000);
 
-    return uploadResponse.data as { file_id: number };
+    return uploadResponse.data as { file_id: number; ingest_id?: number | null };
+  };
+
+  // ZIP uploads are extracted on the server after the upload returns; wait until the folder is ready
+  const waitForIngest = async (ingestId: number, fileName: string) => {
+    for (;;) {
+      const { data } = await axiosInstance.get(`/api/files/${ingestId}/ingest`);
+      if (data.status === "uploaded") {
+        break;
+      }
+      if (data.status === "failed") {
+        throw new Error(data.error || "Failed to extract answer sheets");
+      }
+      setUploadProgress({
+        isUploading: true,
+        progress: data.total_files
+          ? Math.round((data.extracted_files / data.total_files) * 100)
+          : 0,
+        fileName,
+        type: "answer_sheets",
+        extracting: true,
+      });
+      await new Promise((resolve) => setTimeout(resolve, INGEST_POLL_INTERVAL));
+    }
+    setUploadProgress({
+      isUploading: false,
+      progress: 0,
+      fileName: "",
+      type: "answer_sheets",
+    });
   };
 
   // Handle file change with validation
@@ -241,6 +321,9 @@ export function AnswerSheetsStep({
       // Upload answer sheets file using new utility
       showToast("Uploading answer sheets...", "info");
       const uploadData = await uploadFile(answerSheetsFile, "answer_sheet");
+      if (uploadData.ingest_id) {
+        await waitForIngest(uploadData.ingest_id, answerSheetsFile.name);
+      }
 
       setMarkingJob((prev: MarkingJob) => ({
         ...prev,
@@ -379,7 +462,7 @@ export function AnswerSheetsStep({
               </div>
               <div className="ml-3 flex-1">
                 <h3 className="text-sm font-medium text-blue-800">
-                  Uploading{" "}
+                  {uploadProgress.extracting ? "Extracting" : "Uploading"}{" "}
                   {uploadProgress.type === "answer_sheets"
                     ? "Answer Sheets"
                     : "Index List"}
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useCallback } from "react";
 import { Input } from "../../../../components/UI/Input";
 import { Select } from "../../../../components/UI/Select";
 import { Card } from "../../../../components/UI/Card";
-import { Template } from "@/models/template";
+import { Template, TemplatesPage } from "@/models/template";
 import {
   MarkingJobForm,
   JobPriority,
@@ -44,13 +44,12 @@ export function MetadataStep({
         setTemplatesError(null);
 
         const params = new URLSearchParams({
-          skip: "0",
-          limit: "20",
+          limit: "200",
         });
 
         const response = await axiosInstance.get(`/api/templates?${params}`);
 
-        const data = response.data as Template[];
+        const data = (response.data as TemplatesPage).items;
         setTemplates(data);
 
         // Set default template if available
@@ -7,13 +7,16 @@ import { useToast } from "../../hooks/useToast";
 import axiosInstance from "@/utils/axiosclient";
 import { createAuthenticatedWebSocket } from "@/utils/websocketClient";
 
-import { MarkingJobBasic, MarkingJobStatus } from "./types/types";
+import { MarkingJobBasic, MarkingJobsPage, MarkingJobStatus } from "./types/types";
+import { Button } from "../../components/UI/Button";
 import { PageHeader } from "./components/PageHeader";
 import { StatsOverview } from "./components/StatsOverview";
 import { FiltersSection } from "./components/FiltersSection";
 import { JobsTable } from "./components/EnhancedJobsTable";
 import { RecentActivity } from "./components/RecentActivity";
 
+const MARKING_JOBS_PAGE_SIZE = 50;
+
 export default function MarkingJobs() {
   const router = useRouter();
   const [selectedJob, setSelectedJob] = useState<number | null>(null);
@@ -25,6 +28,8 @@ export default function MarkingJobs() {
 
   const [loading, setLoading] = useState(true);
   const [markingJobs, setMarkingJobs] = useState<MarkingJobBasic[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { showToast } = useToast();
 
   const filteredJobs = markingJobs.filter((job) => {
@@ -90,6 +95,26 @@ export default function MarkingJobs() {
     router.push(`/marking-jobs/results/${job.id}`);
   };
 
+  // Older jobs are fetched page by page on request; queued and processing
+  // jobs are recent, so the first page holds the ones that report progress
+  const loadMoreJobs = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axiosInstance.get("/api/markings", {
+        params: { limit: MARKING_JOBS_PAGE_SIZE, cursor: nextCursor },
+      });
+      const page = response.data as MarkingJobsPage;
+      setMarkingJobs((prevJobs) => [...prevJobs, ...page.items]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch (error) {
+      console.error("Failed to fetch marking jobs:", error);
+      showToast("Failed to load more marking jobs", "error");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     const progressWebsocket = async (markingJobIds: number[]) => {
       try {
@@ -159,10 +184,13 @@ export default function MarkingJobs() {
     const fetchMarkingJobs = async () => {
       setLoading(true);
       try {
-        const response = await axiosInstance.get("/api/markings");
-        const markingJobs: MarkingJobBasic[] =
-          response.data as MarkingJobBasic[];
+        const response = await axiosInstance.get("/api/markings", {
+          params: { limit: MARKING_JOBS_PAGE_SIZE },
+        });
+        const page = response.data as MarkingJobsPage;
+        const markingJobs: MarkingJobBasic[] = page.items;
         setMarkingJobs(markingJobs);
+        setNextCursor(page.next_cursor ?? null);
         progressWebsocket(
           markingJobs
             .map((job) =>
@@ -219,6 +247,17 @@ export default function MarkingJobs() {
               onDeleteJob={confirmDelete}
             />
           )}
+          {!loading && nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button
+                variant="secondary"
+                onClick={loadMoreJobs}
+                disabled={loadingMore}
+              >
+                {loadingMore ? "Loading..." : "Load older jobs"}
+              </Button>
+            </div>
+          )}
         </div>
 
         <div>
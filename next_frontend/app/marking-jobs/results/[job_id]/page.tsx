@@ -17,7 +17,7 @@ import {
   StudentResult,
 } from "@/app/marking-jobs/types/types";
 import {
-  _convertBlobToStudentResults,
+  getStudentResults,
   getMarkingSchemeBubbleData,
 } from "../../../utils/results";
 import AnswerSheetModal from "./components/AnswerSheetModal";
@@ -50,21 +50,7 @@ const ResultsPage = () => {
         );
         const jobInfo: JobInfo = jobResponse.data as JobInfo;
 
-        const backendUrl =
-          process.env.NEXT_PUBLIC_BACKEND_URL ||
-          "https://edumark.vihangamunasinghe.com";
-        const resultsResponse = await fetch(
-          `${backendUrl}/api/files/download?method=file_id&file_id=${jobInfo.result_sheet_file_id}`,
-          {
-            credentials: "include",
-          }
-        );
-        if (!resultsResponse.ok) {
-          throw new Error("Failed to fetch results");
-        }
-        const resultsBlob = await resultsResponse.blob();
-
-        const results = await _convertBlobToStudentResults(resultsBlob);
+        const results = await getStudentResults(job_id);
 
         const markingScheme = await getMarkingSchemeBubbleData(
           jobInfo.marking_config_id
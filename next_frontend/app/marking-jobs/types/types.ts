@@ -117,6 +117,13 @@ export interface MarkingJobBasic {
   created_by: number;
 }
 
+// A page of marking jobs, newest first; pass next_cursor as cursor for the next one
+export interface MarkingJobsPage {
+  items: MarkingJobBasic[];
+  limit: number;
+  next_cursor?: string | null;
+}
+
 export interface ReviewQuestion {
   id: number;
   question: string;
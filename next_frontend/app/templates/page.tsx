@@ -10,13 +10,15 @@ import {
   ExclamationTriangleIcon,
   ArrowPathIcon,
 } from "@heroicons/react/24/outline";
-import { Template } from "@/models/template";
+import { Template, TemplatesPage } from "@/models/template";
 import TemplateCard from "./components/template_card";
 import { EditTemplateModal } from "./components/EditTemplateModal";
 import ViewTemplateModal from "./components/ViewTemplateModal";
 import axiosInstance from "@/utils/axiosclient";
 import { useRouter } from "next/navigation";
 
+const TEMPLATES_PAGE_SIZE = 24;
+
 export default function Templates() {
   const router = useRouter();
   const [isDeleteModalOpen, setIsDeleteModalOpen] = useState(false);
@@ -27,6 +29,8 @@ export default function Templates() {
   const [templates, setTemplates] = useState<Template[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { showToast } = useToast();
 
   // Fetch templates from API
@@ -36,13 +40,14 @@ export default function Templates() {
       setError(null);
 
       const params = new URLSearchParams({
-        skip: "0",
-        limit: "20",
+        limit: String(TEMPLATES_PAGE_SIZE),
       });
 
       // Make sure the API endpoint matches your backend route
       const response = await axiosInstance.get(`/api/templates?${params}`);
-      setTemplates(response.data as Template[]);
+      const page = response.data as TemplatesPage;
+      setTemplates(page.items);
+      setNextCursor(page.next_cursor ?? null);
     } catch (err) {
       console.error("Error fetching templates:", err);
       setError(
@@ -54,6 +59,27 @@ export default function Templates() {
     }
   }, [showToast]);
 
+  // Older templates are fetched page by page on request
+  const loadMoreTemplates = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const params = new URLSearchParams({
+        limit: String(TEMPLATES_PAGE_SIZE),
+        cursor: nextCursor,
+      });
+      const response = await axiosInstance.get(`/api/templates?${params}`);
+      const page = response.data as TemplatesPage;
+      setTemplates((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch (err) {
+      console.error("Error fetching templates:", err);
+      showToast("Failed to load more templates", "error");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Fetch templates on component mount
   useEffect(() => {
     fetchTemplates();
@@ -216,6 +242,17 @@ export default function Templates() {
                   />
                 ))}
               </div>
+              {nextCursor && (
+                <div className="flex justify-center mt-6">
+                  <Button
+                    variant="secondary"
+                    onClick={loadMoreTemplates}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? "Loading..." : "Load more templates"}
+                  </Button>
+                </div>
+              )}
             </>
           ) : (
             <div className="text-center py-16">
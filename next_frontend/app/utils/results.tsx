@@ -1,98 +1,52 @@
-import * as XLSX from "xlsx";
 import { Bubble, StudentResult } from "@/app/marking-jobs/types/types";
 import { BubbleStyle } from "@/components/UI/AnswerSheetBubble";
 import axiosInstance from "@/utils/axiosclient";
 
-export const _convertBlobToStudentResults = async (
-  blob: Blob
-): Promise<StudentResult[]> => {
-  try {
-    // 1. Convert blob to array buffer and load workbook
-    const arrayBuffer = await blob.arrayBuffer();
-    const workbook = XLSX.read(arrayBuffer, { type: "buffer" });
-
-    // 2. Get the first worksheet
-    const worksheet = workbook.Sheets[workbook.SheetNames[0]];
-    if (!worksheet) {
-      throw new Error("No worksheet found");
-    }
-
-    // 3. Convert rows to StudentResult format
-    const results: StudentResult[] = [];
-
-    // Convert worksheet to JSON array, skipping header row
-    const rows = XLSX.utils.sheet_to_json(worksheet, { header: 1 }) as (
-      | string
-      | number
-      | boolean
-      | undefined
-    )[][];
-    rows.forEach((row, rowNumber) => {
-      if (rowNumber === 0) return; // Skip header (first row)
-      if (row && row[1]) {
-        // Check if row has data (ExcelJS uses 1-based indexing)
-        const parseNumberArray = (str: string): number[] => {
-          if (!str || str === "-") return [];
-          return str
-            .split(",")
-            .map((s) => parseInt(s.trim()))
-            .filter((n) => !isNaN(n));
-        };
+interface StudentResultsPage {
+  items: StudentResult[];
+  total: number;
+  limit: number;
+  next_cursor?: string | null;
+}
 
-        try {
-          const labeledPoints: Bubble[][] = row[9]
-            ? JSON.parse(String(row[9]))
-            : [];
+const STUDENT_RESULTS_PAGE_SIZE = 1000;
+const STUDENT_RESULT_FIELDS = [
+  "row_number",
+  "index_number",
+  "correct",
+  "incorrect",
+  "more_than_one_marked",
+  "not_marked",
+  "score",
+  "flag",
+  "flag_reason",
+  "answer_sheet_path",
+  "labeled_points",
+  "is_resolved",
+].join(",");
 
-          // Column K (row[10]) is "Resolved" on new sheets but may legacy-hold
-          // "Audit File Name" on older jobs run with save_intermediate_results=true.
-          // Only treat as resolved if the cell is an actual boolean — anything else
-          // (string, undefined, number) defaults to unresolved.
-          const isResolved =
-            typeof row[10] === "boolean" ? row[10] : false;
-
-          results.push({
-            row_number: rowNumber,
-            index_number: String(row[0] || ""),
-            correct: String(row[1] || "")
-              .split(",")
-              .filter((s) => s.trim() !== "" && s.trim() !== "-")
-              .map((s) => Number(s.trim()))
-              .filter((n) => !isNaN(n)),
-            incorrect: String(row[2] || "")
-              .split(",")
-              .filter((s) => s.trim() !== "" && s.trim() !== "-")
-              .map((s) => Number(s.trim()))
-              .filter((n) => !isNaN(n)),
-            more_than_one_marked: String(row[3] || "")
-              .split(",")
-              .filter((s) => s.trim() !== "" && s.trim() !== "-")
-              .map((s) => Number(s.trim()))
-              .filter((n) => !isNaN(n)),
-            not_marked: String(row[4] || "")
-              .split(",")
-              .filter((s) => s.trim() !== "" && s.trim() !== "-")
-              .map((s) => Number(s.trim()))
-              .filter((n) => !isNaN(n)),
-            // columnwise_total: parseNumberArray(String(row[5] || "")),
-            score: Number(row[5]) || 0,
-            flag: Boolean(row[6] || false),
-            flag_reason: String(row[7] || ""),
-            answer_sheet_path: String(row[8] || ""),
-            labeled_points: labeledPoints,
-            is_resolved: isResolved,
-          });
-        } catch (parseError) {
-          console.warn(`Error parsing row ${rowNumber}:`, parseError);
-        }
+export const getStudentResults = async (
+  jobId: number | string
+): Promise<StudentResult[]> => {
+  // Results are stored per student on the backend, follow the cursor until the last page
+  const results: StudentResult[] = [];
+  let cursor: string | null | undefined = undefined;
+  do {
+    const response = await axiosInstance.get(
+      `/api/markings/${jobId}/results/rows`,
+      {
+        params: {
+          limit: STUDENT_RESULTS_PAGE_SIZE,
+          fields: STUDENT_RESULT_FIELDS,
+          ...(cursor ? { cursor } : {}),
+        },
       }
-    });
-
-    return results;
-  } catch (error) {
-    console.error("Error converting blob to student results:", error);
-    throw error;
-  }
+    );
+    const page = response.data as StudentResultsPage;
+    results.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return results;
 };
 
 export const getMarkingSchemeBubbleData = async (markingConfigId: number) => {
@@ -21,4 +21,11 @@ interface Template {
   created_by: number;
 }
 
-export type { Template, TemplateStatus, ConfigType };
\ No newline at end of file
+// A page of templates, newest first; pass next_cursor as cursor for the next one
+interface TemplatesPage {
+  items: Template[];
+  limit: number;
+  next_cursor?: string | null;
+}
+
+export type { Template, TemplatesPage, TemplateStatus, ConfigType };
\ No newline at end of file